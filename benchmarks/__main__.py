@@ -0,0 +1,128 @@
+"""Run the parser benchmarks and compare them against a saved baseline
+
+Run with: python -m benchmarks [--parser NAME ...] [--corpus NAME ...]
+                               [--save FILE] [--compare FILE]
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from typing import (  # pylint:disable=unused-import
+    Dict,
+    List,
+)
+
+from benchmarks.corpus import (
+    CORPORA,
+)
+from benchmarks.parsers import (
+    PARSERS,
+)
+
+
+def measure(
+    parser,
+    texts: 'List[str]',
+    repeat: 'int',
+) -> 'Dict[str, float]':
+    """Measure throughput of the best run and peak memory of one run"""
+    size = sum(len(text.encode('utf-8')) for text in texts)
+    best = float('inf')
+    segments = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        segments = 0
+        for text in texts:
+            for _ in parser.parse(text):
+                segments += 1
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        for text in texts:
+            for _ in parser.parse(text):
+                pass
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'segments_per_sec': segments / best,
+        'mb_per_sec': size / best / 1e6,
+        'peak_memory_kb': peak / 1024,
+    }
+
+
+def compare(
+    results: 'Dict[str, Dict[str, float]]',
+    baseline: 'Dict[str, Dict[str, float]]',
+    tolerance: 'float',
+) -> 'List[str]':
+    """Return descriptions of the results which regressed"""
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        for key in ('segments_per_sec', 'mb_per_sec'):
+            if result[key] < old[key] * (1 - tolerance):
+                regressions.append('{} {}: {:.1f} < {:.1f}'.format(
+                    name, key, result[key], old[key],
+                ))
+        key = 'peak_memory_kb'
+        if result[key] > old[key] * (1 + tolerance):
+            regressions.append('{} {}: {:.1f} > {:.1f}'.format(
+                name, key, result[key], old[key],
+            ))
+    return regressions
+
+
+def main():
+    """Run the selected benchmarks"""
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--parser', nargs='+', choices=sorted(PARSERS),
+                      default=sorted(PARSERS))
+    args.add_argument('--corpus', nargs='+', choices=sorted(CORPORA),
+                      default=sorted(CORPORA))
+    args.add_argument('--repeat', type=int, default=3)
+    args.add_argument('--save', metavar='FILE',
+                      help='store the results as baseline JSON')
+    args.add_argument('--compare', metavar='FILE',
+                      help='compare the results against a baseline JSON')
+    args.add_argument('--tolerance', type=float, default=0.1,
+                      help='relative slowdown accepted by --compare')
+    options = args.parse_args()
+
+    results = {}
+    print('{:<32} {:>12} {:>10} {:>12}'.format(
+        'benchmark', 'segments/s', 'MB/s', 'peak KiB',
+    ))
+    for corpus in options.corpus:
+        texts = CORPORA[corpus]()
+        for parser_name in options.parser:
+            name = '{}/{}'.format(parser_name, corpus)
+            result = measure(PARSERS[parser_name](), texts, options.repeat)
+            results[name] = result
+            print('{:<32} {:>12.0f} {:>10.2f} {:>12.1f}'.format(
+                name, result['segments_per_sec'], result['mb_per_sec'],
+                result['peak_memory_kb'],
+            ))
+
+    if options.save:
+        with open(options.save, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+    if options.compare:
+        with open(options.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, options.tolerance)
+        for regression in regressions:
+            print('REGRESSION', regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
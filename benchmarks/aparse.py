@@ -0,0 +1,83 @@
+"""Benchmark the event loop latency while parsing a large text
+
+A ticker task measures the delay of its wakeups while a large message is
+parsed with parse, aparse and aparse offloaded to a thread.
+
+Run with: python -m benchmarks.aparse [--length N] [--code]
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.corpus import (
+    CorpusConfig,
+    generate,
+)
+from benchmarks.parsers import (
+    PARSERS,
+)
+from reparser.aio import (
+    aparse,
+)
+
+
+INTERVAL = 0.001
+
+
+async def ticker(delays, done):
+    """Record how late every wakeup of the loop is"""
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(INTERVAL)
+        delays.append(time.perf_counter() - start - INTERVAL)
+
+
+async def measure(parse):
+    """Return the p99 and max delay of the ticker while parse runs"""
+    delays = []
+    done = asyncio.Event()
+    task = asyncio.ensure_future(ticker(delays, done))
+    await asyncio.sleep(INTERVAL * 2)
+    await parse()
+    done.set()
+    await task
+    delays.sort()
+    return delays[int(len(delays) * 0.99)], delays[-1]
+
+
+def main():
+    """Print ticker delays per parse mode"""
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--parser', choices=sorted(PARSERS), default='markdown')
+    args.add_argument('--length', type=int, default=1000000)
+    args.add_argument('--code', action='store_true',
+                      help='wrap the text into a single code block')
+    options = args.parse_args()
+
+    parser = PARSERS[options.parser]()
+    text, = generate(CorpusConfig(length=options.length, count=1))
+    if options.code:
+        text = '```' + text.replace('`', "'") + '```'
+
+    async def blocking():
+        list(parser.parse(text))
+
+    modes = (
+        ('parse', blocking),
+        ('aparse', lambda: aparse(parser, text, time_slice=INTERVAL)),
+        ('aparse offload', lambda: aparse(parser, text, offload_size=0)),
+    )
+    loop = asyncio.new_event_loop()
+    try:
+        for name, parse in modes:
+            p99, worst = loop.run_until_complete(measure(parse))
+            print('{:<16} p99 delay {:>8.1f}ms  max delay {:>8.1f}ms'.format(
+                name, p99 * 1000, worst * 1000,
+            ))
+    finally:
+        loop.close()
+
+
+if __name__ == '__main__':
+    main()
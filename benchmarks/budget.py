@@ -0,0 +1,50 @@
+"""Benchmark the latency of adversarial inputs with and without a Budget
+
+Run with: python -m benchmarks.budget [--max-time SECONDS]
+"""
+
+import argparse
+import time
+
+from benchmarks.corpus import (
+    CORPORA,
+)
+from benchmarks.parsers import (
+    PARSERS,
+)
+from reparser.budget import (
+    Budget,
+)
+
+
+def main():
+    """Print the worst latency per corpus without and with a budget"""
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--parser', choices=sorted(PARSERS), default='markdown')
+    args.add_argument('--max-time', type=float, default=0.005)
+    args.add_argument('--max-depth', type=int, default=64)
+    args.add_argument('--max-length', type=int, default=1 << 20)
+    options = args.parse_args()
+
+    unlimited = PARSERS[options.parser]()
+    budgeted = type(unlimited)(unlimited.tokens, budget=Budget(
+        max_length=options.max_length,
+        max_depth=options.max_depth,
+        max_time=options.max_time,
+    ))
+    for corpus in ('chat', 'adversarial-unclosed', 'adversarial-nesting'):
+        texts = CORPORA[corpus]()
+        for name, parser in (('unlimited', unlimited), ('budget', budgeted)):
+            worst = 0.0
+            for text in texts:
+                start = time.perf_counter()
+                for _ in parser.parse(text):
+                    pass
+                worst = max(worst, time.perf_counter() - start)
+            print('{:<22} {:<10} worst {:8.2f} ms'.format(
+                corpus, name, worst * 1000,
+            ))
+
+
+if __name__ == '__main__':
+    main()
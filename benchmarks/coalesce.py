@@ -0,0 +1,56 @@
+"""Benchmark coalesced Segments: counts, parse and render time
+
+Run with: python -m benchmarks.coalesce [--corpus NAME ...]
+"""
+
+import argparse
+import time
+
+from benchmarks.corpus import (
+    CORPORA,
+)
+from benchmarks.parsers import (
+    PARSERS,
+)
+from reparser.sinks import (
+    HtmlSink,
+)
+
+
+def measure(parser, texts, coalesce):
+    """Return the number of Segments, parse and render time"""
+    start = time.perf_counter()
+    results = [list(parser.parse(text, coalesce=coalesce)) for text in texts]
+    parse_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for segments in results:
+        HtmlSink([]).write_segments(segments)
+    render_time = time.perf_counter() - start
+    return sum(map(len, results)), parse_time, render_time
+
+
+def main():
+    """Print Segments and times without and with coalescing"""
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--parser', choices=sorted(PARSERS), nargs='+',
+                      default=sorted(PARSERS))
+    args.add_argument('--corpus', choices=sorted(CORPORA), nargs='+',
+                      default=['chat', 'dense', 'unclosed'])
+    options = args.parse_args()
+
+    for corpus in options.corpus:
+        texts = CORPORA[corpus]()
+        for name in options.parser:
+            parser = PARSERS[name]()
+            for coalesce in (False, True):
+                count, parse_time, render_time = measure(
+                    parser, texts, coalesce,
+                )
+                print('{:<10} {:<10} coalesce={:<5} {:>8} segments parse '
+                      '{:7.1f} ms render {:6.1f} ms'.format(
+                          name, corpus, str(coalesce), count,
+                          parse_time * 1000, render_time * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Synthetic corpus generator for the benchmarks"""
+
+import random
+from typing import (  # pylint:disable=unused-import
+    Dict,
+    List,
+)
+
+
+WORDS = (
+    'the quick brown fox jumps over lazy dog lorem ipsum dolor sit amet '
+    'parser token segment markup message chat hello world python regex '
+    'stack group match text bold italic code link note review'
+).split()
+TAGS = ('***', '**', '*', '___', '__', '_', '~~', '==', '`', '``')
+LINK = '[{}](www.example.org/{})'
+
+
+class CorpusConfig:
+    """Parameters of a synthetic corpus"""
+    def __init__(
+        self,
+        length: 'int' = 200,
+        count: 'int' = 1000,
+        density: 'float' = 0.2,
+        depth: 'int' = 2,
+        unclosed: 'float' = 0.0,
+        links: 'float' = 0.02,
+        newlines: 'float' = 0.02,
+        seed: 'int' = 0,
+    ):
+        self.length = length
+        self.count = count
+        self.density = density
+        self.depth = depth
+        self.unclosed = unclosed
+        self.links = links
+        self.newlines = newlines
+        self.seed = seed
+
+    def as_dict(self) -> 'Dict':
+        """Return the parameters as dict"""
+        return dict(
+            length=self.length,
+            count=self.count,
+            density=self.density,
+            depth=self.depth,
+            unclosed=self.unclosed,
+            links=self.links,
+            newlines=self.newlines,
+            seed=self.seed,
+        )
+
+
+def markup(
+    rand: 'random.Random',
+    config: 'CorpusConfig',
+    depth: 'int',
+) -> 'str':
+    """Build a run of words, nested into tags up to depth"""
+    words = ' '.join(rand.choice(WORDS) for _ in range(rand.randint(1, 4)))
+    if depth and rand.random() < config.density:
+        words = '{} {} {}'.format(
+            rand.choice(WORDS),
+            markup(rand, config, depth - 1),
+            rand.choice(WORDS),
+        )
+    tag = rand.choice(TAGS)
+    if rand.random() < config.unclosed:
+        return tag + words
+    return tag + words + tag
+
+
+def generate_message(
+    rand: 'random.Random',
+    config: 'CorpusConfig',
+) -> 'str':
+    """Generate a single message of about config.length chars"""
+    parts = []
+    size = 0
+    while size < config.length:
+        choice = rand.random()
+        if choice < config.density:
+            part = markup(rand, config, config.depth - 1)
+        elif choice < config.density + config.links:
+            part = LINK.format(rand.choice(WORDS), rand.choice(WORDS))
+        elif choice < config.density + config.links + config.newlines:
+            part = '\n'
+        else:
+            part = rand.choice(WORDS)
+        parts.append(part)
+        size += len(part) + 1
+    return ' '.join(parts)
+
+
+def generate(
+    config: 'CorpusConfig',
+) -> 'List[str]':
+    """Generate a reproducible list of messages"""
+    rand = random.Random(config.seed)
+    return [generate_message(rand, config) for _ in range(config.count)]
+
+
+def adversarial_unclosed(
+    length: 'int',
+) -> 'List[str]':
+    """A single message of unclosed opening tags"""
+    return [('*a `b _c ' * length)[:length]]
+
+
+def adversarial_nesting(
+    length: 'int',
+) -> 'List[str]':
+    """A single message of deeply nested tags"""
+    tags = ('**', '_', '~~', '==')
+    depth = length // 12
+    opening = ' '.join(tags[i % 4] + 'x' for i in range(depth))
+    closing = ' '.join('x' + tags[i % 4] for i in reversed(range(depth)))
+    return [opening + ' ' + closing]
+
+
+CORPORA = {
+    'chat': lambda: generate(CorpusConfig()),
+    'plain': lambda: generate(CorpusConfig(density=0, links=0, newlines=0)),
+    'dense': lambda: generate(CorpusConfig(density=0.6, depth=3)),
+    'long': lambda: generate(CorpusConfig(length=65536, count=4)),
+    'unclosed': lambda: generate(CorpusConfig(unclosed=0.5, count=500)),
+    'links': lambda: generate(CorpusConfig(density=0.05, links=0.6)),
+    'adversarial-unclosed': lambda: adversarial_unclosed(65536),
+    'adversarial-nesting': lambda: adversarial_nesting(65536),
+}
@@ -0,0 +1,70 @@
+"""Benchmark the per char dispatch against the compound regex
+
+Both variants try the regex at the chars found by the prefilter only, the
+dispatch tries the alternatives which can start with the char.
+
+Run with: python -m benchmarks.dispatch [--repeat N]
+"""
+
+import argparse
+import time
+
+from benchmarks.corpus import (
+    CORPORA,
+)
+from benchmarks.parsers import (
+    PARSERS,
+)
+from reparser.prefilter import (
+    get_alternation_cost,
+)
+
+
+def without_dispatch(parser):
+    """Build the parser without the dispatch"""
+    parser_class = type(
+        type(parser).__name__, (type(parser),),
+        {'build_dispatch': staticmethod(lambda regex, patterns: None)},
+    )
+    return parser_class(parser.tokens)
+
+
+def run(parser, texts, repeat):
+    """Return the best duration of parsing all texts"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            for _ in parser.parse(text):
+                pass
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Print the alternation cost and the durations per parser and corpus"""
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--repeat', type=int, default=5)
+    options = args.parse_args()
+
+    parsers = {}
+    for name, get_parser in sorted(PARSERS.items()):
+        parser = get_parser()
+        parsers[name] = (without_dispatch(parser), parser)
+        print('{:<8} alternatives {before} -> {after:.2f} (max {max})'.format(
+            name, **get_alternation_cost(parser)
+        ))
+
+    print('{:<24} {:>10} {:>10}'.format('benchmark', 'compound', 'dispatch'))
+    for corpus in ('chat', 'plain', 'dense', 'unclosed'):
+        texts = CORPORA[corpus]()
+        for name, (plain, parser) in sorted(parsers.items()):
+            print('{:<24} {:>9.3f}s {:>9.3f}s'.format(
+                '{}/{}'.format(name, corpus),
+                run(plain, texts, options.repeat),
+                run(parser, texts, options.repeat),
+            ))
+
+
+if __name__ == '__main__':
+    main()
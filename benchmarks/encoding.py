@@ -0,0 +1,86 @@
+"""Benchmark the compact encodings of parse results against pickle
+
+Run with: python -m benchmarks.encoding [--corpus NAME] [--repeat N]
+"""
+
+import argparse
+import pickle
+import time
+
+from benchmarks.corpus import (
+    CORPORA,
+)
+from benchmarks.parsers import (
+    PARSERS,
+)
+from reparser.encoding import (
+    decode_binary,
+    decode_json,
+    encode_binary,
+    encode_json,
+)
+
+
+def pickle_decode(payload):
+    """Decode pickled Segments"""
+    return pickle.loads(payload)
+
+
+def pickle_encode(segments):
+    """Pickle Segments"""
+    return pickle.dumps(segments, pickle.HIGHEST_PROTOCOL)
+
+
+def binary_decode(payload):
+    """Decode binary payload to Segments"""
+    return decode_binary(payload).to_segments()
+
+
+def json_decode(payload):
+    """Decode JSON payload to Segments"""
+    return decode_json(payload).to_segments()
+
+
+FORMATS = (
+    ('pickle', pickle_encode, pickle_decode),
+    ('binary', encode_binary, binary_decode),
+    ('json', encode_json, json_decode),
+)
+
+
+def measure(func, items, repeat):
+    """Return the results of func and its best duration over all items"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [func(item) for item in items]
+        best = min(best, time.perf_counter() - start)
+    return results, best
+
+
+def main():
+    """Print payload size and encode/decode time per format"""
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--parser', choices=sorted(PARSERS), default='markdown')
+    args.add_argument('--corpus', choices=sorted(CORPORA), default='chat')
+    args.add_argument('--repeat', type=int, default=5)
+    options = args.parse_args()
+
+    parser = PARSERS[options.parser]()
+    results = [list(parser.parse(text)) for text in CORPORA[options.corpus]()]
+    count = sum(map(len, results))
+    for name, encode, decode in FORMATS:
+        payloads, encode_time = measure(encode, results, options.repeat)
+        _, decode_time = measure(decode, payloads, options.repeat)
+        size = sum(
+            len(payload if isinstance(payload, bytes) else payload.encode())
+            for payload in payloads
+        )
+        print('{:<8} {:>8.1f} B/segment encode {:>6.2f} us/segment decode '
+              '{:>6.2f} us/segment'.format(
+                  name, size / count, encode_time / count * 1e6,
+                  decode_time / count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
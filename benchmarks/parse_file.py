@@ -0,0 +1,72 @@
+"""Benchmark parsing a memory-mapped file against reading it into a str
+
+Run with: python -m benchmarks.parse_file [--megabytes N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.corpus import (
+    CORPORA,
+)
+from benchmarks.parsers import (
+    PARSERS,
+)
+from reparser.stream import (
+    parse_file,
+)
+
+
+def read_and_parse(parser, path):
+    """Parse the whole file read into a str"""
+    with open(path, encoding='utf-8') as file:
+        yield from parser.parse(file.read())
+
+
+def measure(segments):
+    """Measure the first Segment, total time and peak of allocations"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in segments:
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, first, total, peak
+
+
+def main():
+    """Print latency, duration and peak memory of both ways"""
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--parser', choices=sorted(PARSERS), default='markdown')
+    args.add_argument('--megabytes', type=int, default=20)
+    options = args.parse_args()
+
+    parser = PARSERS[options.parser]()
+    text = '\n'.join(CORPORA['chat']()) + ' Grüße € 😀\n'
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'corpus.md')
+        with open(path, 'w', encoding='utf-8') as file:
+            size = 0
+            while size < options.megabytes << 20:
+                size += file.write(text)
+        for name, segments in (
+            ('read+parse', read_and_parse(parser, path)),
+            ('parse_file', parse_file(parser, path)),
+        ):
+            count, first, total, peak = measure(segments)
+            print('{:<12} {:>9} segments  first {:8.2f} ms  total {:7.2f} s'
+                  '  peak {:8.1f} MiB'.format(
+                      name, count, first * 1000, total, peak / (1 << 20),
+                  ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Benchmark reparser.pool.parse_many with an increasing number of workers
+
+Run with: python -m benchmarks.parse_many [--texts N] [--workers N ...]
+"""
+
+import argparse
+import multiprocessing
+import time
+
+from benchmarks.parsers import (
+    PARSERS,
+)
+from reparser.pool import (
+    parse_many,
+)
+
+
+MESSAGE = (
+    'Hello **bold** world!\nYou can **try *this* awesome** [link](www.eff.org).'
+    ' Some `code *here*` and ~~strike~~ with ==underline== and _more_ text.'
+)
+
+
+def run(parser, texts, workers, chunksize):
+    """Parse all texts, return the number of segments and the duration"""
+    start = time.perf_counter()
+    segments = 0
+    for result in parse_many(parser, texts, workers=workers,
+                             chunksize=chunksize):
+        segments += len(result)
+    return segments, time.perf_counter() - start
+
+
+def main():
+    """Print throughput and speedup per number of workers"""
+    cpus = multiprocessing.cpu_count()
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--parser', choices=sorted(PARSERS), default='markdown')
+    args.add_argument('--texts', type=int, default=50000)
+    args.add_argument('--chunksize', type=int, default=256)
+    args.add_argument('--workers', type=int, nargs='+',
+                      default=sorted({1, 2, max(cpus // 2, 1), cpus}))
+    options = args.parse_args()
+
+    parser = PARSERS[options.parser]()
+    texts = [MESSAGE] * options.texts
+    baseline = None
+    for workers in options.workers:
+        segments, duration = run(parser, texts, workers, options.chunksize)
+        baseline = baseline or duration
+        print('workers={:<3} {:>10.0f} texts/s {:>10.0f} segments/s '
+              'speedup={:.2f}'.format(workers, len(texts) / duration,
+                                      segments / duration,
+                                      baseline / duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Token sets of the README Parser and of the MarkdownParser tests"""
+
+import re
+
+from reparser import (
+    MatchGroup,
+    Parser,
+    Token,
+)
+from reparser.markdown import (
+    MarkdownParser,
+    MarkdownTag,
+)
+
+
+MARKDOWN_LINK = r'(?<!\\)\[(?P<link>.+?)\]\((?P<url>.+?)\)'
+NEWLINE = r'\n|\r\n'
+URL_PROTO_REGEX = re.compile(r'(?i)^[a-z][\w-]+:/{1,3}')
+
+
+def url_complete(url):
+    """If URL doesn't start with protocol, prepend it with http://"""
+    return url if URL_PROTO_REGEX.search(url) else 'http://' + url
+
+
+def get_readme_parser() -> 'Parser':
+    """Build the Parser of the README example"""
+    boundary_chars = r'\s`!()\[\]{{}};:\'".,<>?«»“”‘’*_~='
+    b_left = r'(?:(?<=[' + boundary_chars + r'])|(?<=^))'
+    b_right = r'(?:(?=[' + boundary_chars + r'])|(?=$))'
+
+    markdown_start = b_left + r'(?<!\\){tag}(?!\s)(?!{tag})'
+    markdown_end = r'(?<!{tag})(?<!\s)(?<!\\){tag}' + b_right
+
+    def markdown(tag):
+        """Return sequence of start and end regex patterns for a tag"""
+        return markdown_start.format(tag=tag), markdown_end.format(tag=tag)
+
+    return Parser([
+        Token('bi1', *markdown(r'\*\*\*'), is_bold=True, is_italic=True),
+        Token('bi2', *markdown(r'___'), is_bold=True, is_italic=True),
+        Token('b1', *markdown(r'\*\*'), is_bold=True),
+        Token('b2', *markdown(r'__'), is_bold=True),
+        Token('i1', *markdown(r'\*'), is_italic=True),
+        Token('i2', *markdown(r'_'), is_italic=True),
+        Token('s', *markdown(r'~~'), is_strikethrough=True),
+        Token('u', *markdown(r'=='), is_underline=True),
+        Token('link', MARKDOWN_LINK, text=MatchGroup('link'),
+              link_target=MatchGroup('url', func=url_complete)),
+        Token('br', NEWLINE, text='\n', segment_type='LINE_BREAK'),
+    ])
+
+
+def get_markdown_parser() -> 'MarkdownParser':
+    """Build the MarkdownParser of the test-suite"""
+    return MarkdownParser([
+        MarkdownTag(r'\*\*\*', is_bold=True, is_italic=True),
+        MarkdownTag(r'___', is_bold=True, is_italic=True),
+        MarkdownTag(r'\*\*', is_bold=True),
+        MarkdownTag(r'__', is_bold=True),
+        MarkdownTag(r'\*', is_italic=True),
+        MarkdownTag(r'_', is_italic=True),
+        MarkdownTag(r'```', skip=True),
+        MarkdownTag(r'``', skip=True),
+        MarkdownTag(r'`', skip=True),
+        MarkdownTag(r'~~', is_strikethrough=True),
+        MarkdownTag(r'==', is_underline=True),
+        Token('link', MARKDOWN_LINK, text=MatchGroup('link'),
+              link_target=MatchGroup('url', func=url_complete)),
+        Token('br', NEWLINE, text='\n', segment_type='LINE_BREAK'),
+    ])
+
+
+PARSERS = {
+    'readme': get_readme_parser,
+    'markdown': get_markdown_parser,
+}
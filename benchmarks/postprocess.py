@@ -0,0 +1,51 @@
+"""Benchmark postprocessing the whole text in one pass against per slice
+
+Run with: python -m benchmarks.postprocess [--repeat N]
+"""
+
+import argparse
+import time
+
+from benchmarks.corpus import (
+    CORPORA,
+)
+from benchmarks.parsers import (
+    PARSERS,
+)
+
+
+def main():
+    """Print the best parse time per corpus with and without batching"""
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--repeat', type=int, default=7)
+    options = args.parse_args()
+
+    batched = PARSERS['markdown']()
+
+    class SlicedParser(type(batched)):
+        batch_postprocess = None
+
+    sliced = SlicedParser(batched.tokens)
+    for corpus in ('chat', 'dense', 'plain', 'long'):
+        texts = CORPORA[corpus]()
+        # runs of spaces which are collapsed
+        spaced = [text.replace('a ', 'a  ') for text in texts]
+        for name, variant in ((corpus, texts), (corpus + '+spaces', spaced)):
+            timings = {}
+            for mode, parser in (('sliced', sliced), ('batched', batched)):
+                best = float('inf')
+                for _ in range(options.repeat):
+                    start = time.perf_counter()
+                    for text in variant:
+                        for _ in parser.parse(text):
+                            pass
+                    best = min(best, time.perf_counter() - start)
+                timings[mode] = best
+            print('{:<16} sliced {:8.2f} ms  batched {:8.2f} ms  {:.2f}x'.format(
+                name, timings['sliced'] * 1000, timings['batched'] * 1000,
+                timings['sliced'] / timings['batched'],
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Benchmark reparser.reparse.reparse against parsing the whole edited document
+
+Run with: python -m benchmarks.reparse [--length N] [--edits N]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks.corpus import (
+    CorpusConfig,
+    generate,
+)
+from benchmarks.parsers import (
+    PARSERS,
+)
+from reparser.reparse import (
+    Edit,
+    parse_result,
+    reparse,
+)
+
+
+def run(parser, text, edits, lookaround):
+    """Apply edits, return the seconds per edit for parse and reparse
+
+For reparse the mean and the median are returned.
+"""
+    start = time.perf_counter()
+    edited = text
+    for offset, deleted, inserted in edits:
+        edited = edited[:offset] + inserted + edited[offset + deleted:]
+        list(parser.parse(edited))
+    full = (time.perf_counter() - start) / len(edits)
+
+    result = parse_result(parser, text)
+    durations = []
+    for offset, deleted, inserted in edits:
+        start = time.perf_counter()
+        result = reparse(
+            parser, result, Edit(offset, deleted, inserted),
+            lookaround=lookaround,
+        )
+        durations.append(time.perf_counter() - start)
+
+    assert [(s.text, s.params) for s in result] == [
+        (s.text, s.params) for s in parser.parse(edited)
+    ]
+    return full, statistics.mean(durations), statistics.median(durations)
+
+
+def main():
+    """Print the time per keystroke for a full parse and for reparse
+
+    Unbalanced markup like a single backtick changes how the rest of the
+    document pairs up, such edits re-parse up to the end.
+    """
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--parser', choices=sorted(PARSERS), default='markdown')
+    args.add_argument('--length', type=int, default=200000)
+    args.add_argument('--edits', type=int, default=50)
+    args.add_argument('--lookaround', type=int, default=256)
+    args.add_argument('--chars', default='a *`')
+    options = args.parse_args()
+
+    parser = PARSERS[options.parser]()
+    text = '\n'.join(generate(CorpusConfig(
+        length=options.length // 10, count=10,
+    )))
+    for char in options.chars:
+        rand = random.Random(0)
+        edits = [
+            (rand.randint(0, len(text)), 0, char)
+            for _ in range(options.edits)
+        ]
+        full, mean, median = run(parser, text, edits, options.lookaround)
+        print('insert {!r:5} {} chars: parse {:7.3f} ms/edit, reparse '
+              'mean {:7.3f} median {:7.3f} ms/edit, speedup={:.1f}'.format(
+                  char, len(text), full * 1000, mean * 1000, median * 1000,
+                  full / mean))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Benchmark the memory held by parsed Segments with tracemalloc
+
+Run with: python -m benchmarks.segment_memory [--repeat N]
+"""
+
+import argparse
+import tracemalloc
+
+from benchmarks.parsers import (
+    PARSERS,
+)
+
+
+MESSAGE = 'Hello **bold** world! `code` and *it* [l](x.org)\n'
+
+
+def measure(parser, text):
+    """Return the number of Segments and the bytes allocated for them"""
+    tracemalloc.start()
+    try:
+        segments = list(parser.parse(text))
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return len(segments), size
+
+
+def main():
+    """Print the bytes per Segment for every parser"""
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--repeat', type=int, default=20000)
+    options = args.parse_args()
+
+    text = MESSAGE * options.repeat
+    for name, get_parser in sorted(PARSERS.items()):
+        count, size = measure(get_parser(), text)
+        print('{:<10} {:>8} segments {:>8.1f} B/segment'.format(
+            name, count, size / count,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark BaseParser.parse_into against parse followed by rendering
+
+Run with: python -m benchmarks.sinks [--corpus NAME] [--repeat N]
+"""
+
+import argparse
+import time
+
+from benchmarks.corpus import (
+    CORPORA,
+)
+from benchmarks.parsers import (
+    PARSERS,
+)
+from reparser.sinks import (
+    HtmlSink,
+    PlainTextSink,
+)
+
+
+def fused(parser, texts, sink_type):
+    """Render texts with parse_into"""
+    output = []
+    for text in texts:
+        sink = sink_type([])
+        parser.parse_into(text, sink)
+        output.append(sink.getvalue())
+    return output
+
+
+def rendered(parser, texts, sink_type):
+    """Render the Segments of texts"""
+    output = []
+    for text in texts:
+        sink = sink_type([])
+        sink.write_segments(parser.parse(text))
+        output.append(sink.getvalue())
+    return output
+
+
+def measure(repeat, func, *args):
+    """Return the result and the best duration of repeat runs of func"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    """Print the throughput of both ways per sink and parser"""
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--corpus', choices=sorted(CORPORA), default='chat')
+    args.add_argument('--repeat', type=int, default=7)
+    options = args.parse_args()
+
+    texts = CORPORA[options.corpus]()
+    size = sum(map(len, texts)) / 2 ** 20
+    for name, get_parser in sorted(PARSERS.items()):
+        parser = get_parser()
+        for sink_type in (HtmlSink, PlainTextSink):
+            expected, before = measure(
+                options.repeat, rendered, parser, texts, sink_type,
+            )
+            actual, after = measure(
+                options.repeat, fused, parser, texts, sink_type,
+            )
+            assert expected == actual
+            print('{:<10} {:<14} parse+render {:6.2f} MB/s parse_into '
+                  '{:6.2f} MB/s speedup={:.2f}'.format(
+                      name, sink_type.__name__, size / before, size / after,
+                      before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Benchmark the cold start of parsers built from tokens and from snapshots
+
+Run with: python -m benchmarks.snapshot [--repeat N]
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import time
+
+from benchmarks.parsers import (
+    PARSERS,
+)
+from reparser.snapshot import (
+    load_parser,
+    warm_up,
+)
+
+
+def main():
+    """Print the best build and load time per parser"""
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--repeat', type=int, default=20)
+    options = args.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, build in sorted(PARSERS.items()):
+            parser = build()
+            parser_type, tokens = type(parser), parser.tokens
+            path = os.path.join(directory, name)
+            load_parser(path, parser_type, tokens)
+
+            timings = {'build': [], 'load': []}
+            for _ in range(options.repeat):
+                # the re module caches compiled patterns
+                re.purge()
+                start = time.perf_counter()
+                warm_up(parser_type(tokens))
+                timings['build'].append(time.perf_counter() - start)
+                re.purge()
+                start = time.perf_counter()
+                load_parser(path, parser_type, tokens)
+                timings['load'].append(time.perf_counter() - start)
+            print('{:<10} build {:7.2f} ms  load {:7.2f} ms  {:>7} bytes'.format(
+                name, min(timings['build']) * 1000,
+                min(timings['load']) * 1000, os.path.getsize(path),
+            ))
+
+
+if __name__ == '__main__':
+    main()
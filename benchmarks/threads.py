@@ -0,0 +1,74 @@
+"""Benchmark one parser shared by an increasing number of threads
+
+Run with: python -m benchmarks.threads [--texts N] [--threads N ...]
+
+Threads only scale on free-threaded builds of CPython, with the GIL the
+numbers show the overhead of sharing the parser.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+from benchmarks.corpus import (
+    CORPORA,
+)
+from benchmarks.parsers import (
+    PARSERS,
+)
+
+
+def run(parser, texts, threads):
+    """Parse texts split among threads, return segments and duration"""
+    counts = [0] * threads
+    barrier = threading.Barrier(threads + 1)
+
+    def work(index):
+        barrier.wait()
+        segments = 0
+        for text in texts[index::threads]:
+            for _ in parser.parse(text):
+                segments += 1
+        counts[index] = segments
+
+    workers = [threading.Thread(target=work, args=(index,))
+               for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return sum(counts), time.perf_counter() - start
+
+
+def main():
+    """Print throughput and speedup per number of threads"""
+    cpus = os.cpu_count() or 1
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--parser', choices=sorted(PARSERS), default='markdown')
+    args.add_argument('--corpus', choices=sorted(CORPORA), default='chat')
+    args.add_argument('--repeat', type=int, default=5)
+    args.add_argument('--threads', type=int, nargs='+',
+                      default=sorted({1, 2, max(cpus // 2, 1), cpus}))
+    options = args.parse_args()
+
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('GIL enabled: {}, CPUs: {}'.format(is_gil_enabled, cpus))
+
+    parser = PARSERS[options.parser]()
+    texts = CORPORA[options.corpus]() * options.repeat
+    baseline = None
+    for threads in options.threads:
+        segments, duration = run(parser, texts, threads)
+        baseline = baseline or duration
+        print('threads={:<3} {:>10.0f} texts/s {:>10.0f} segments/s '
+              'speedup={:.2f}'.format(threads, len(texts) / duration,
+                                      segments / duration,
+                                      baseline / duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,22 +2,39 @@
 
 __all__ = (
     'BaseParser',
+    'BatchPostprocess',
+    'BatchedSegmentFactory',
     'MatchGroup',
     'MatchType',
+    'ObservedTokenStack',
+    'Params',
+    'ParseHooks',
+    'ParseState',
+    'ParseStats',
     'Parser',
+    'PostprocessedText',
+    'ResolutionPlan',
     'Segment',
+    'SegmentFactory',
+    'Span',
+    'SpanFactory',
     'Token',
+    'TokenSegment',
     'TokenStack',
 )
 
 
 import abc
+import bisect
+import collections
 import enum
 import re
 from typing import (
     Callable,
     Dict,
     Generator,
+    Iterable,
+    Iterator,
     List,
     Match,
     Optional,
@@ -26,49 +43,50 @@ from typing import (
     Union,
 )
 
+from reparser.hooks import (
+    ParseHooks,
+    ParseStats,
+    parse_observed,
+)
+from reparser.postprocess import (
+    BatchPostprocess,
+    PostprocessedText,
+    get_batch_postprocess,
+)
+from reparser.prefilter import (
+    build_dispatch,
+    build_prefilter,
+    iter_searched,
+)
+from reparser.segments import (
+    EMPTY_PARAMS,
+    BatchedSegmentFactory,
+    MatchGroup,
+    Params,
+    Segment,
+    PendingSinkFactory,
+    SegmentFactory,
+    SinkFactory,
+    Span,
+    SpanFactory,
+    TokenSegment,
+    get_params_key,
+    parse_coalesced,
+)
+
 
 # Precompiled regex for matching named groups in regex patterns
 GROUP_REGEX = GROUP_DEF = re.compile(r'\(\?P<(.+?)>(.+?)\)')
 GROUP_REFERENCE = re.compile(r'\(\?P=(.+?)\)')
 
 
-class Segment:
-    """Segment of parsed text"""
-    def __init__(
-        self,
-        text: 'Union[MatchGroup, str]',
-        token: 'Optional[Token]' = None,
-        match: 'Optional[Match]' = None,
-        **params
-    ):
-        self.text = text
-        self.params = params
-        if token and match:
-            self.update_text(token, match)
-            self.update_params(token, match)
-
-    def update_text(
-        self,
-        token: 'Token',
-        match: 'Match',
-    ):
-        """Update text from results of regex match"""
-        if isinstance(self.text, MatchGroup):
-            self.text = self.text.get_group_value(token, match)
-
-    def update_params(
-        self,
-        token: 'Token',
-        match: 'Match',
-    ):
-        """Update dict of params from results of regex match"""
-        for key, match_group in self.params.items():
-            if isinstance(match_group, MatchGroup):
-                self.params[key] = match_group.get_group_value(token, match)
-
-
 class Token:
     """Definition of token which should be parsed from text"""
+    __slots__ = (
+        'name', 'group_start', 'pattern_start', 'group_end', 'pattern_end',
+        'skip', 'params',
+    )
+
     def __init__(
         self,
         name: 'str',
@@ -92,6 +110,17 @@ class Token:
         self.skip = skip
         self.params = params
 
+    @property
+    def dynamic_params(
+        self,
+    ) -> 'Tuple[Tuple[str, str, Optional[Callable]], ...]':
+        """MatchGroups with the name of their group in the compound regex"""
+        return tuple(
+            (key, '{}_{}'.format(self.name, value.group), value.func)
+            for key, value in self.params.items()
+            if isinstance(value, MatchGroup)
+        )
+
     def modify_pattern(
         self,
         pattern: 'str',
@@ -109,72 +138,141 @@ class Token:
         return r'(?P<{}>{})'.format(group, pattern)
 
 
-class MatchGroup:
-    """Name of regex group which should be replaced by its value when token is parsed"""
+class MatchType(enum.Enum):
+    """Type of token matched by regex"""
+    start = 1
+    end = 2
+    single = 3
+
+
+class ResolutionPlan:
+    """Resolution of the text and params of a single token from its match
+
+    The groups of the MatchGroups are looked up by their index in the regex
+    of the match, for the regexes the plan is built for: the compound regex
+    and those of the dispatch. Matches of other regexes fall back to the
+    group names.
+    """
+    __slots__ = ('token', 'regexes', 'params', 'dynamic', 'is_text')
+
     def __init__(
         self,
-        group: 'str',
-        func: 'Optional[Callable]' = None,
+        token: 'Token',
+        regexes: 'Iterable[Pattern]',
     ):
-        self.group = group
-        self.func = func if callable(func) else None
+        self.token = token
+        self.regexes = tuple(
+            regex for regex in regexes
+            if token.group_start in regex.groupindex
+        )
+        self.params = token.params
+        # hashing a regex hashes its code, the regexes are kept alive by the
+        # plan and their ids stay unique
+        self.dynamic = {
+            id(regex): self.get_indices(regex) for regex in self.regexes
+        }
+        # the token replaces text only, its Segment has the params of the stack
+        self.is_text = set(token.params) <= {'text'}
+
+    def __reduce__(self):
+        # the ids of the regexes change when unpickled
+        return ResolutionPlan, (self.token, self.regexes)
+
+    def get_indices(
+        self,
+        regex: 'Pattern',
+    ) -> 'Tuple[Tuple[str, Optional[int], Optional[Callable]], ...]':
+        """Get the MatchGroups with the index of their group in regex"""
+        groupindex = regex.groupindex
+        return tuple(
+            # downstream error: invalid nested groups resolve to ''
+            (key, groupindex.get(group), func)
+            for key, group, func in self.token.dynamic_params
+        )
 
-    def get_group_value(
+    def resolve(
         self,
-        token: 'Token',
         match: 'Match',
-    ) -> 'str':
-        """Return value of regex match for the specified group"""
+        params: 'Params',
+    ) -> 'Tuple[Optional[str], Dict]':
+        """Resolve text and params, text is None for the whole match"""
         try:
-            value = match.group('{}_{}'.format(token.name, self.group))
-        except IndexError:
-            # downstream error: invalid nested groups
-            value = ''
-        return value if self.func is None else self.func(value)
-
-
-class MatchType(enum.Enum):
-    """Type of token matched by regex"""
-    start = 1
-    end = 2
-    single = 3
+            dynamic = self.dynamic[id(match.re)]
+        except KeyError:
+            dynamic = self.get_indices(match.re)
+        single_params = dict(params, **self.params)
+        for key, group_index, func in dynamic:
+            value = '' if group_index is None else match.group(group_index)
+            single_params[key] = value if func is None else func(value)
+        return single_params.pop('text', None), single_params
 
 
 class TokenStack:
-    """Storage for tokens during parsing"""
+    """Storage for tokens during parsing
+
+    Every depth of the stack keeps a snapshot of the merged params of all the
+    tokens up to it, the positions of open tokens are indexed by token.
+    """
     def __init__(self):
         self.__data = []
+        self.__params = [EMPTY_PARAMS]
+        self.__positions = {}
 
-    def get_params(self):
+    def __len__(self):
+        return len(self.__data)
+
+    def get_params(self) -> 'Params':
         """Get params from stack of tokens"""
-        params = {}
-        for token in self.__data:
-            params.update(token.params)
-        return params
+        return self.__params[-1]
 
     def remove_token(self, token):
-        """Remove last occurrence of token from stack"""
-        if not self.__data:
+        """Remove last occurrence of token from stack
+
+        Removing the innermost token is constant time. Removing an inner one,
+        a downstream error, merges the params of the tokens above it again
+        and shifts their positions, linear in the depth of the stack.
+        """
+        positions = self.__positions.get(id(token))
+        if not positions:
             # downstream error: start token not matched
             return False
-        if self.__data[-1] is token:
-            self.__data.pop(-1)
+        position = positions.pop()
+        if not positions:
+            del self.__positions[id(token)]
+
+        if position == len(self.__data) - 1:
+            self.__data.pop()
+            self.__params.pop()
             return True
 
         # downstream error: imbalanced start/end token
-        self.__data.reverse()
-        try:
-            self.__data.remove(token)
-        except ValueError:
-            return False
-        else:
-            return True
-        finally:
-            self.__data.reverse()
+        del self.__data[position]
+        del self.__params[position + 1:]
+        for other in self.__data[position:]:
+            self.__push_params(other)
+        for other_positions in self.__positions.values():
+            index = bisect.bisect_right(other_positions, position)
+            for index in range(index, len(other_positions)):
+                other_positions[index] -= 1
+        return True
 
     def add_token(self, token):
         """Add a token to the stack"""
+        self.__positions.setdefault(id(token), []).append(len(self.__data))
         self.__data.append(token)
+        self.__push_params(token)
+
+    def __push_params(self, token):
+        """Merge the params of token onto the last params snapshot"""
+        params = self.__params[-1]
+        if token.params:
+            params = Params(params)
+            dict.update(params, token.params)
+        self.__params.append(params)
+
+    def get_tokens(self) -> 'Tuple[Token, ...]':
+        """Get the open tokens, innermost last"""
+        return tuple(self.__data)
 
     def get_last_token(self) -> 'Token':
         """Return the last Token from the stack"""
@@ -197,15 +295,131 @@ class TokenStack:
         return False
 
 
-class BaseParser(metaclass=abc.ABCMeta):
-    """Simple regex-based lexer/parser for inline markup"""
+class ObservedTokenStack(TokenStack):
+    """TokenStack reporting matched and discarded tokens to ParseHooks"""
+    def __init__(
+        self,
+        hooks: 'ParseHooks',
+    ):
+        super().__init__()
+        self.hooks = hooks
+
+    def remove_token(self, token):
+        removed = super().remove_token(token)
+        if not removed:
+            self.hooks.on_unmatched_end(token)
+        return removed
+
+    def skip_token(
+        self,
+        token: 'Token',
+        match_type: 'MatchType',
+    ):
+        # called once per match by BaseParser.parse_matches
+        self.hooks.on_match(token, match_type)
+        skip = super().skip_token(token, match_type)
+        if skip:
+            self.hooks.on_skip(token, match_type)
+        return skip
+
+
+class ParseState:
+    """Per-call state of a parse
+
+    Parsers are immutable and shared, everything that changes while parsing
+    a text lives here: the preprocessed text, the stack of open tokens and
+    the position following the last Segment. The factory builds the
+    Segments or Spans, with a batchable postprocess of the parser from the
+    postprocessed text. A sink is told about the tokens added to and
+    removed from the stack. exceeded is the limit of the Budget which
+    ended the parse, if any.
+    """
+    __slots__ = (
+        'text', 'token_stack', 'last_pos', 'hooks', 'factory', 'sink',
+        'exceeded',
+    )
+
+    def __init__(
+        self,
+        text: 'str',
+        hooks: 'Optional[ParseHooks]' = None,
+        factory: 'Optional[SegmentFactory]' = None,
+    ):
+        self.text = text
+        self.hooks = hooks
+        if hooks is None:
+            self.token_stack = TokenStack()
+        else:
+            self.token_stack = ObservedTokenStack(hooks)
+        self.last_pos = 0
+        self.factory = factory
+        self.sink = None  # type: Optional[Sink]
+        self.exceeded = None  # type: Optional[BudgetExceeded]
+
+
+class ParserMeta(abc.ABCMeta):
+    """Metaclass freezing parsers once they are constructed"""
+    def __call__(cls, *args, **kwargs):
+        parser = super().__call__(*args, **kwargs)
+        parser.freeze()
+        return parser
+
+
+class BaseParser(metaclass=ParserMeta):
+    """Simple regex-based lexer/parser for inline markup
+
+    Parsers are immutable after construction and can be shared by threads,
+    the state of a single parse is kept in a ParseState.
+    """
+    # the regexes and tables built once per parser are read on every parse
+    # pylint:disable=too-many-instance-attributes
+
+    # Postprocess the whole text in one pass before slicing the Segments of
+    # parse, for postprocess handlers which are a regex substitution. It
+    # stands in for the handler of the class declaring it only, subclasses
+    # overriding the handler are postprocessed slice by slice.
+    batch_postprocess = None  # type: Optional[BatchPostprocess]
+
     def __init__(
         self,
         tokens: 'List[Token]',
+        cache: 'Optional[ParseCache]' = None,
+        budget: 'Optional[Budget]' = None,
     ):
         self.tokens = tokens
         self.regex = self.build_regex(tokens)
+        self.prefilter = self.build_prefilter(self.regex)
+        self.dispatch = None
+        if self.prefilter is not None:
+            self.dispatch = self.build_dispatch(
+                self.regex, self.build_patterns(tokens),
+            )
         self.groups = self.build_groups(tokens)
+        regexes = [self.regex]
+        if self.dispatch is not None:
+            regexes.extend(self.dispatch.values())
+        self.plans = self.build_plans(tokens, regexes)
+        self.batch = get_batch_postprocess(type(self))
+        self.cache = cache
+        self.budget = budget
+
+    def freeze(self):
+        """Disallow any further assignment of attributes"""
+        object.__setattr__(self, '_BaseParser__frozen', True)
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_BaseParser__frozen', False):
+            raise AttributeError(
+                '{} is immutable'.format(type(self).__name__)
+            )
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        if getattr(self, '_BaseParser__frozen', False):
+            raise AttributeError(
+                '{} is immutable'.format(type(self).__name__)
+            )
+        super().__delattr__(name)
 
     @abc.abstractmethod
     def preprocess(
@@ -229,16 +443,27 @@ class BaseParser(metaclass=abc.ABCMeta):
         """Postprocess skipped text after parsing"""
 
     @staticmethod
-    def build_regex(
+    def build_patterns(
         tokens: 'List[Token]',
-    ) -> 'Pattern':
-        """Build compound regex from list of tokens"""
+    ) -> 'List[str]':
+        """Build list of patterns, the alternatives of the compound regex"""
         patterns = []
         for token in tokens:
             patterns.append(token.pattern_start)
             if token.pattern_end:
                 patterns.append(token.pattern_end)
-        return re.compile('|'.join(patterns), re.DOTALL)
+        return patterns
+
+    @classmethod
+    def build_regex(
+        cls,
+        tokens: 'List[Token]',
+    ) -> 'Pattern':
+        """Build compound regex from list of tokens, see build_patterns"""
+        return re.compile(
+            '|'.join(cls.build_patterns(tokens)),
+            re.DOTALL,
+        )
 
     @staticmethod
     def build_groups(
@@ -254,6 +479,86 @@ class BaseParser(metaclass=abc.ABCMeta):
                 groups[token.group_start] = (token, MatchType.single)
         return groups
 
+    @staticmethod
+    def build_plans(
+        tokens: 'List[Token]',
+        regexes: 'Iterable[Pattern]',
+    ) -> 'Dict[str, ResolutionPlan]':
+        """Build dict of resolution plans of the single tokens by group"""
+        regexes = list({id(regex): regex for regex in regexes}.values())
+        return {
+            token.group_start: ResolutionPlan(token, regexes)
+            for token in tokens
+            if not token.group_end
+        }
+
+    @staticmethod
+    def build_prefilter(
+        regex: 'Pattern',
+    ) -> 'Optional[Pattern]':
+        """Build regex finding the chars a match of regex can start with"""
+        return build_prefilter(regex)
+
+    @staticmethod
+    def build_dispatch(
+        regex: 'Pattern',
+        patterns: 'List[str]',
+    ) -> 'Optional[Dict[str, Pattern]]':
+        """Build regexes of the alternatives which can start with a char"""
+        return build_dispatch(regex, patterns)
+
+    def iter_matches(
+        self,
+        text: 'str',
+        pos: 'int' = 0,
+        scan: 'Optional[StreamScan]' = None,  # pylint: disable=unused-argument
+    ) -> 'Iterator[Match]':
+        """Iterate over all matches of the compound regex in text from pos
+
+        With a scan of a stream the text may continue, implementations stop
+        before matches which depend on text following it and store them in
+        scan.blocked.
+        """
+        if self.prefilter is None:
+            return self.regex.finditer(text, pos)
+        return iter_searched(self.search, text, pos)
+
+    def search(
+        self,
+        text: 'str',
+        pos: 'int' = 0,
+    ) -> 'Optional[Match]':
+        """Search the next match of the compound regex in text from pos
+
+        The compound regex is only tried at chars found by the prefilter,
+        with the dispatch only its alternatives which can start with them.
+        """
+        if self.prefilter is None:
+            return self.regex.search(text, pos)
+        find = self.prefilter.search
+        dispatch = self.dispatch
+        regex = self.regex
+        if dispatch is None:
+            match = regex.match
+            while True:
+                candidate = find(text, pos)
+                if candidate is None:
+                    return None
+                pos = candidate.start()
+                result = match(text, pos)
+                if result is not None:
+                    return result
+                pos += 1
+        while True:
+            candidate = find(text, pos)
+            if candidate is None:
+                return None
+            pos = candidate.start()
+            result = dispatch.get(candidate.group(), regex).match(text, pos)
+            if result is not None:
+                return result
+            pos += 1
+
     def get_matched_token(
         self,
         match: 'Match',
@@ -267,14 +572,94 @@ class BaseParser(metaclass=abc.ABCMeta):
     def parse(
         self,
         text: 'str',
+        hooks: 'Optional[ParseHooks]' = None,
+        coalesce: 'bool' = False,
     ) -> 'Generator[Segment]':
-        """Parse text to obtain list of Segments"""
+        """Parse text to obtain list of Segments
+
+        With a cache, results are read-only FrozenSegments and text is parsed
+        completely on the first Segment. Results which exceeded the budget
+        are not cached. With coalesce, see reparser.segments.parse_coalesced,
+        the cache is bypassed.
+        """
+        if coalesce:
+            yield from parse_coalesced(self, self.get_state(text, hooks))
+            return
+        if self.cache is not None and hooks is None:
+            yield from self.cache.parse(self, text)
+            return
+        yield from self.parse_state(self.get_state(text, hooks))
+
+    def get_state(
+        self,
+        text: 'str',
+        hooks: 'Optional[ParseHooks]' = None,
+    ) -> 'ParseState':
+        """Preprocess text into the state for parsing it to Segments"""
         text = self.preprocess(text)
-        token_stack = TokenStack()
-        last_pos = 0
+        if self.batch is None:
+            return ParseState(text, hooks, SegmentFactory(self))
+        return ParseState(
+            text, hooks, BatchedSegmentFactory(self, self.batch.apply(text)),
+        )
+
+    def parse_spans(
+        self,
+        text: 'str',
+        hooks: 'Optional[ParseHooks]' = None,
+    ) -> 'Generator[Span]':
+        """Parse text to obtain list of Spans
+
+        Spans carry offsets into the preprocessed text, their text is only
+        sliced and postprocessed on access.
+        """
+        state = ParseState(self.preprocess(text), hooks, SpanFactory(self))
+        yield from self.parse_state(state)
+
+    def parse_state(
+        self,
+        state: 'ParseState',
+    ) -> 'Generator[Union[Segment, Span]]':
+        """Parse the preprocessed text of state with its factory"""
+        if self.budget is not None:
+            yield from self.budget.parse(self, state)
+            return
+        if state.hooks is not None:
+            yield from parse_observed(self, state)
+            return
+
+        yield from self.parse_matches(
+            state=state,
+            matches=self.iter_matches(state.text),
+        )
+
+        # Append anything that's left
+        if state.last_pos < len(state.text):
+            yield state.factory.make_tail(
+                state, state.token_stack.get_params(),
+            )
+
+    def parse_matches(
+        self,
+        state: 'ParseState',
+        matches: 'Iterable[Match]',
+    ) -> 'Generator[Union[Segment, Span]]':
+        """Parse the matches of the compound regex in text to Segments
+
+        Moves state.last_pos to the position following the last Segment
+        which has been consumed.
+        The sink of state is told about a token once the Segments preceding
+        it have been consumed.
+        """
+        make_segment = state.factory.make_segment
+        make_token_segment = state.factory.make_token_segment
+        sink = state.sink
+        text = state.text
+        token_stack = state.token_stack
+        last_pos = state.last_pos
 
         # Iterate through all matched tokens
-        for match in self.regex.finditer(text):
+        for match in matches:
             # Find which token has been matched by regex
             token, match_type, group = self.get_matched_token(
                 match=match,
@@ -297,32 +682,61 @@ class BaseParser(metaclass=abc.ABCMeta):
             # Append text preceding matched token
             start_pos = match.start(group)
             if start_pos > last_pos:
-                single_params = params.copy()
-                segment_text = text[last_pos:start_pos]
-                if token.skip:
-                    segment_text = self.postprocess_skipped(segment_text)
-                else:
-                    segment_text = self.postprocess(segment_text)
-                single_params['text'] = segment_text
-                yield Segment(**single_params)
+                yield make_segment(
+                    text, last_pos, start_pos, params, token.skip,
+                )
+                # the consumer asked for the Segment following the text
+                last_pos = state.last_pos = start_pos
 
             # Actions specific for start token or single token
             if match_type == MatchType.start:
                 token_stack.add_token(token)
+                if sink is not None:
+                    sink.open_style(token, token_stack.get_params())
             elif match_type == MatchType.single:
-                single_params = params.copy()
-                single_params['text'] = match.group(group)
-                single_params.update(token.params)
-                yield Segment(token=token, match=match, **single_params)
+                yield make_token_segment(token, match, group, params)
+            elif sink is not None:
+                sink.close_style(token, token_stack.get_params())
 
             # Move last position pointer to the end of matched token
-            last_pos = match.end(group)
+            last_pos = state.last_pos = match.end(group)
 
-        # Append anything that's left
-        if last_pos < len(text):
-            params = token_stack.get_params()
-            params['text'] = self.postprocess(text[last_pos:])
-            yield Segment(**params)
+    def parse_into(
+        self,
+        text: 'str',
+        sink: 'Sink',
+        hooks: 'Optional[ParseHooks]' = None,
+    ):
+        """Parse text and push its events into sink, skipping Segments
+
+        Sinks receive the same text and params as from parse, styles are
+        opened and closed as tokens are added to and removed from the stack.
+        The cache is bypassed, hooks observe None in place of the Segments.
+        """
+        state = self.get_state(text, hooks)
+        state.sink = sink
+        if self.budget is None or self.budget.max_segments is None:
+            state.factory = SinkFactory(state.factory, sink)
+            # consume the Nones without a Python loop
+            collections.deque(self.parse_state(state), maxlen=0)
+            return
+        # the budget drops the Segment past max_segments once it is built
+        state.factory = PendingSinkFactory(state.factory, sink)
+        for pending in self.parse_state(state):
+            pending.push()
+
+    def get_edit_bounds(
+        self,
+        old_text: 'str',
+        text: 'str',
+        edit: 'Edit',
+        lookaround: 'int',
+    ) -> 'Tuple[int, int]':
+        """Get the positions in text to restart parsing at or before and to
+        resync at or after for the edit of old_text resulting in text
+        """
+        # pylint: disable=unused-argument
+        return edit.start - lookaround, edit.new_end + lookaround
 
 
 class Parser(BaseParser):
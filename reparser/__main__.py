@@ -0,0 +1,360 @@
+"""Parse text, JSONL or NDJSON files in bulk and write the Segments
+
+Run with: python -m reparser MODULE[:NAME] [FILE ...] [--input-format FORMAT]
+                              [--output-format FORMAT] [--workers N]
+
+The parser is the attribute NAME of the Python module MODULE, a parser or
+a callable returning one, NAME defaults to parser. Files default to stdin,
+- reads stdin as well.
+
+Input formats:
+  text    every file is one text, parsed as a stream in bounded memory,
+          regular files are mapped into memory and decoded as they go
+  lines   every line is one text
+  jsonl   every line is a JSON string or an object with the text in a field
+  ndjson  same as jsonl
+
+Every text results in one record of its Segments. Texts of the text format
+result in one record per RECORD_SEGMENTS Segments or RECORD_CHARS chars,
+concatenated they are the Segments of the text.
+
+Output formats:
+  jsonl    one JSON list of [text, params] pairs per line
+  compact  reparser.encoding JSON, one per line with a shared style table
+  binary   reparser.encoding binary frames, read with ResultReader
+"""
+
+import argparse
+import codecs
+import functools
+import importlib
+import json
+import os
+import sys
+import time
+from typing import (  # pylint:disable=unused-import
+    IO,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+)
+
+from reparser import (
+    BaseParser,
+    Segment,
+)
+from reparser.encoding import (
+    JSON_SEPARATORS,
+    ResultWriter,
+)
+from reparser.pool import (
+    parse_many,
+)
+from reparser.stream import (
+    parse_file,
+    parse_stream,
+)
+
+
+# Upper bounds for the Segments of a record of the text input format and
+# the chars of their texts, a record may exceed it by its last Segment
+RECORD_SEGMENTS = 1024
+RECORD_CHARS = 1 << 20
+INPUT_FORMATS = ('text', 'lines', 'jsonl', 'ndjson')
+OUTPUT_FORMATS = ('jsonl', 'compact', 'binary')
+
+
+class InputError(ValueError):
+    """Malformed input, the message names the file and the line"""
+
+
+def load_parser(
+    path: 'str',
+) -> 'BaseParser':
+    """Load the parser at MODULE[:NAME], calling factories"""
+    module_name, _, name = path.partition(':')
+    parser = getattr(importlib.import_module(module_name), name or 'parser')
+    if not isinstance(parser, BaseParser) and callable(parser):
+        parser = parser()
+    if not isinstance(parser, BaseParser):
+        raise TypeError('{} is no parser'.format(path))
+    return parser
+
+
+def open_inputs(
+    paths: 'List[str]',
+) -> 'Iterator[TextIO]':
+    """Open the input files one after another, - is stdin"""
+    for path in paths or ['-']:
+        if path == '-':
+            yield sys.stdin
+            continue
+        with open(path, encoding='utf-8') as file:
+            yield file
+
+
+def read_lines(
+    file: 'TextIO',
+) -> 'Iterator[str]':
+    """Read every line as one text"""
+    for line in file:
+        yield line[:-1] if line.endswith('\n') else line
+
+
+def read_json_lines(
+    file: 'TextIO',
+    field: 'str',
+) -> 'Iterator[str]':
+    """Read texts from JSON strings or objects, one per line"""
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            text = record if isinstance(record, str) else record[field]
+            if not isinstance(text, str):
+                raise TypeError('the text is no string')
+        except ValueError as error:
+            raise InputError('{}:{}: invalid JSON: {}'.format(
+                file.name, number, error,
+            )) from error
+        except (KeyError, IndexError, TypeError) as error:
+            raise InputError('{}:{}: no text in field {!r}: {}'.format(
+                file.name, number, field, error,
+            )) from error
+        yield text
+
+
+def read_chunks(
+    file: 'TextIO',
+    chunk_size: 'int',
+) -> 'Iterator[str]':
+    """Read the text of file in chunks of chunk_size chars"""
+    return iter(functools.partial(file.read, chunk_size), '')
+
+
+def parse_mapped_file(
+    parser: 'BaseParser',
+    path: 'str',
+    chunk_size: 'int',
+) -> 'Iterator[Segment]':
+    """Parse a regular file mapped into memory, see parse_file"""
+    try:
+        yield from parse_file(parser, path, chunk_size=chunk_size)
+    except ValueError as error:
+        raise InputError('{}: {}, read it from stdin instead'.format(
+            path, error,
+        )) from error
+
+
+def iter_slices(
+    segments: 'Iterator[Segment]',
+    size: 'int',
+    chars: 'int',
+) -> 'Iterator[List[Segment]]':
+    """Collect the Segments into lists of up to size Segments
+
+    A list is cut short once the texts of its Segments hold chars chars.
+    """
+    record = []  # type: List[Segment]
+    length = 0
+    for segment in segments:
+        record.append(segment)
+        length += len(segment.text)
+        if len(record) >= size or length >= chars:
+            yield record
+            record = []
+            length = 0
+    if record:
+        yield record
+
+
+class Counter:
+    """Counter of texts, chars and Segments passed through it"""
+    def __init__(self):
+        self.texts = 0
+        self.chars = 0
+        self.segments = 0
+
+    def count_texts(
+        self,
+        texts: 'Iterable[str]',
+    ) -> 'Iterator[str]':
+        """Count texts and their chars"""
+        for text in texts:
+            self.texts += 1
+            self.chars += len(text)
+            yield text
+
+    def count_chunks(
+        self,
+        chunks: 'Iterable[str]',
+    ) -> 'Iterator[str]':
+        """Count the chars of the chunks of a text"""
+        self.texts += 1
+        for chunk in chunks:
+            self.chars += len(chunk)
+            yield chunk
+
+    def count_file(
+        self,
+        path: 'str',
+        segments: 'Iterable[Segment]',
+    ) -> 'Iterator[Segment]':
+        """Count the chars of a file once its Segments are parsed"""
+        self.texts += 1
+        yield from segments
+        decoder = codecs.getincrementaldecoder('utf-8')('surrogateescape')
+        with open(path, 'rb') as file:
+            for chunk in iter(functools.partial(file.read, 1 << 20), b''):
+                self.chars += len(decoder.decode(chunk))
+        self.chars += len(decoder.decode(b'', True))
+
+    def count_records(
+        self,
+        records: 'Iterable[List[Segment]]',
+    ) -> 'Iterator[List[Segment]]':
+        """Count the Segments of records"""
+        for record in records:
+            self.segments += len(record)
+            yield record
+
+
+def iter_records(
+    parser: 'BaseParser',
+    options: 'argparse.Namespace',
+    counter: 'Counter',
+) -> 'Iterator[List[Segment]]':
+    """Parse the inputs to records of Segments"""
+    if options.input_format == 'text':
+        for path in options.files or ['-']:
+            if path != '-' and os.path.isfile(path):
+                segments = counter.count_file(path, parse_mapped_file(
+                    parser, path, options.chunk_size,
+                ))
+                yield from iter_slices(
+                    segments, RECORD_SEGMENTS, RECORD_CHARS,
+                )
+                continue
+            for file in open_inputs([path]):
+                chunks = read_chunks(file, options.chunk_size)
+                segments = parse_stream(parser, counter.count_chunks(chunks))
+                yield from iter_slices(
+                    segments, RECORD_SEGMENTS, RECORD_CHARS,
+                )
+        return
+
+    def iter_texts():
+        for file in open_inputs(options.files):
+            if options.input_format == 'lines':
+                yield from read_lines(file)
+            else:
+                yield from read_json_lines(file, options.field)
+
+    yield from parse_many(
+        parser,
+        counter.count_texts(iter_texts()),
+        workers=options.workers,
+        chunksize=options.batch_size,
+    )
+
+
+def write_records(
+    records: 'Iterable[List[Segment]]',
+    output_format: 'str',
+    output: 'Optional[str]',
+):
+    """Write the records to the output file, stdout without one"""
+    binary = output_format == 'binary'
+    if output is None:
+        file = sys.stdout.buffer if binary else sys.stdout
+        try:
+            write_file(records, output_format, file)
+        finally:
+            file.flush()
+        return
+    with open(output, 'wb' if binary else 'w', encoding=(
+        None if binary else 'utf-8'
+    )) as file:
+        write_file(records, output_format, file)
+
+
+def write_file(
+    records: 'Iterable[List[Segment]]',
+    output_format: 'str',
+    file: 'IO',
+):
+    """Write the records to file in output_format"""
+    if output_format == 'jsonl':
+        for record in records:
+            file.write(json.dumps(
+                [[segment.text, segment.params] for segment in record],
+                separators=JSON_SEPARATORS, ensure_ascii=False,
+            ))
+            file.write('\n')
+    else:
+        writer = ResultWriter(file, binary=output_format == 'binary')
+        for record in records:
+            writer.write(record)
+
+
+def main(
+    argv: 'Optional[List[str]]' = None,
+):
+    """Parse the inputs, write the records and report the throughput"""
+    args = argparse.ArgumentParser(
+        prog='python -m reparser',
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    args.add_argument('parser', metavar='MODULE[:NAME]')
+    args.add_argument('files', metavar='FILE', nargs='*')
+    args.add_argument('--input-format', choices=INPUT_FORMATS,
+                      default='text')
+    args.add_argument('--field', default='text',
+                      help='field of the text in JSON objects')
+    args.add_argument('--output-format', choices=OUTPUT_FORMATS,
+                      default='jsonl')
+    args.add_argument('--output', '-o', metavar='FILE')
+    args.add_argument('--workers', type=int, default=1,
+                      help='processes parsing texts, not for text input')
+    args.add_argument('--batch-size', type=int, default=256,
+                      help='texts sent to a worker at once')
+    args.add_argument('--chunk-size', type=int, default=1 << 20,
+                      help='chars read at once with the text input format, '
+                      'bytes of regular files')
+    args.add_argument('--quiet', '-q', action='store_true',
+                      help='do not report the throughput')
+    options = args.parse_args(argv)
+
+    try:
+        parser = load_parser(options.parser)
+    except (ImportError, AttributeError, TypeError) as error:
+        args.error('cannot load parser: {}'.format(error))
+
+    counter = Counter()
+    start = time.perf_counter()
+    try:
+        write_records(
+            counter.count_records(iter_records(parser, options, counter)),
+            options.output_format,
+            options.output,
+        )
+    except InputError as error:
+        args.error(str(error))
+    duration = max(time.perf_counter() - start, 1e-9)
+    if not options.quiet:
+        print(
+            '{} texts, {} chars, {} segments in {:.2f} s: '
+            '{:.2f} M chars/s, {:.0f} segments/s'.format(
+                counter.texts, counter.chars, counter.segments, duration,
+                counter.chars / duration / 1e6, counter.segments / duration,
+            ),
+            file=sys.stderr,
+        )
+
+
+if __name__ == '__main__':
+    main()
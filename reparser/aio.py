@@ -0,0 +1,160 @@
+"""Parse without blocking the asyncio event loop"""
+
+import asyncio
+import concurrent.futures  # typing: pylint:disable=unused-import
+import time
+from typing import (  # pylint:disable=unused-import
+    Iterable,
+    Iterator,
+    List,
+    Match,
+    Optional,
+    TypeVar,
+)
+
+from reparser import (  # typing: pylint:disable=unused-import
+    BaseParser,
+    Segment,
+)
+
+T = TypeVar('T')
+
+
+def parse_list(
+    parser: 'BaseParser',
+    text: 'str',
+) -> 'List[Segment]':
+    """Parse text to a list of Segments, for running in an executor"""
+    return list(parser.parse(text))
+
+
+def iter_until_pause(
+    paced: 'Iterator[Optional[Match]]',
+    done: 'List[bool]',
+) -> 'Iterator[Match]':
+    """Iterate over the matches of paced up to its next pause
+
+    Once paced is exhausted, True is appended to done.
+    """
+    for match in paced:
+        if match is None:
+            return
+        yield match
+    done.append(True)
+
+
+class AsyncParse:
+    """Async iterator over the Segments of text
+
+    Control is handed back to the event loop every yield_every matches of
+    the compound regex and after time_slice seconds, checked between the
+    matches: the text of a single Segment can hold many skipped tokens.
+    Texts of at least offload_size chars are parsed in the executor
+    instead, the default executor of the loop for None. With a cache or a
+    Budget the parser hands back control between Segments only.
+    """
+    # the options beyond parser and text are keywords of aparse as well
+    def __init__(  # pylint:disable=too-many-arguments
+        self,
+        parser: 'BaseParser',
+        text: 'str',
+        yield_every: 'int' = 256,
+        time_slice: 'Optional[float]' = None,
+        executor: 'Optional[concurrent.futures.Executor]' = None,
+        offload_size: 'Optional[int]' = None,
+    ):
+        self.parser = parser
+        self.text = text
+        self.yield_every = yield_every
+        self.time_slice = time_slice
+        self.executor = executor
+        self.offload_size = offload_size
+        self.segments = None  # type: Optional[Iterator[Optional[Segment]]]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> 'Segment':
+        if self.segments is None:
+            await self.start()
+        for segment in self.segments:
+            if segment is not None:
+                return segment
+            await asyncio.sleep(0)
+        raise StopAsyncIteration
+
+    async def start(self):
+        """Start parsing, in the executor for large texts"""
+        if self.offload_size is not None and (
+            len(self.text) >= self.offload_size
+        ):
+            loop = asyncio.get_running_loop()
+            segments = await loop.run_in_executor(
+                self.executor, parse_list, self.parser, self.text,
+            )
+            self.segments = self.pace(segments)
+        else:
+            self.segments = self.iter_segments()
+
+    def pace(
+        self,
+        items: 'Iterable[T]',
+    ) -> 'Iterator[Optional[T]]':
+        """Pass on items, with a None wherever control is handed back"""
+        time_slice = self.time_slice
+        count = 0
+        since = time.perf_counter()
+        for item in items:
+            if count >= self.yield_every or (
+                time_slice is not None
+                and time.perf_counter() - since >= time_slice
+            ):
+                yield None
+                count = 0
+                since = time.perf_counter()
+            count += 1
+            yield item
+
+    def iter_segments(self) -> 'Iterator[Optional[Segment]]':
+        """Parse the text to Segments, None hands back control
+
+        parse_matches consumes the matches up to a pause and resumes with
+        the state of the parse on the next call.
+        """
+        parser = self.parser
+        if parser.cache is not None or parser.budget is not None:
+            # the cache parses the text at once, the Budget wraps the matches
+            yield from self.pace(parser.parse(self.text))
+            return
+        state = parser.get_state(self.text)
+        paced = self.pace(parser.iter_matches(state.text))
+        done = []  # type: List[bool]
+        while True:
+            yield from parser.parse_matches(
+                state=state,
+                matches=iter_until_pause(paced, done),
+            )
+            if done:
+                break
+            yield None
+
+        # Append anything that's left
+        if state.last_pos < len(state.text):
+            yield state.factory.make_tail(
+                state, state.token_stack.get_params(),
+            )
+
+
+async def aparse(
+    parser: 'BaseParser',
+    text: 'str',
+    **options
+) -> 'List[Segment]':
+    """Parse text to a list of Segments without blocking the event loop
+
+    See AsyncParse for the options.
+    """
+    segments = []
+    async for segment in AsyncParse(parser, text, **options):
+        segments.append(segment)
+    return segments
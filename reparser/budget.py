@@ -0,0 +1,172 @@
+"""Limits of the work spent by a parser on a single text"""
+
+import time
+from typing import (  # pylint:disable=unused-import
+    Generator,
+    Iterable,
+    Iterator,
+    Match,
+    Optional,
+    Union,
+)
+
+from reparser import (
+    EMPTY_PARAMS,
+)
+from reparser import (  # typing: pylint:disable=unused-import
+    BaseParser,
+    ParseState,
+    Segment,
+    Span,
+)
+from reparser.hooks import (
+    ParseTimer,
+)
+
+
+class BudgetExceeded(Exception):
+    """A limit of the Budget of a parser has been exceeded"""
+    def __init__(
+        self,
+        limit: 'str',
+        value: 'Union[int, float]',
+    ):
+        super().__init__('{} of {} exceeded'.format(limit, value))
+        self.limit = limit
+        self.value = value
+
+
+class Budget:
+    """Limits of the work spent by parse and parse_spans on a single text
+
+    Limits of None are unlimited. Once a limit is exceeded, the remaining
+    text becomes a single Segment without params, or BudgetExceeded is
+    raised with fallback unset. Steps count the matches of the compound
+    regex, time is checked between them: a single regex search is bounded
+    by the max_length of the text only.
+    """
+    __slots__ = (
+        'max_length', 'max_depth', 'max_segments', 'max_steps', 'max_time',
+        'fallback',
+    )
+
+    # every limit is an independent keyword, unset by default
+    def __init__(  # pylint:disable=too-many-arguments
+        self,
+        max_length: 'Optional[int]' = None,
+        max_depth: 'Optional[int]' = None,
+        max_segments: 'Optional[int]' = None,
+        max_steps: 'Optional[int]' = None,
+        max_time: 'Optional[float]' = None,
+        fallback: 'bool' = True,
+    ):
+        self.max_length = max_length
+        self.max_depth = max_depth
+        self.max_segments = max_segments
+        self.max_steps = max_steps
+        self.max_time = max_time
+        self.fallback = fallback
+
+    def parse(
+        self,
+        parser: 'BaseParser',
+        state: 'ParseState',
+    ) -> 'Generator[Union[Segment, Span]]':
+        """Parse the preprocessed text of state within the budget
+
+        Hooks observe the tokens and Segments and the parse is timed like by
+        parse_observed. The exceeded limit is stored in state.exceeded.
+        """
+        timer = ParseTimer()
+        if self.max_length is not None and (
+            len(state.text) > self.max_length
+        ):
+            state.exceeded = BudgetExceeded('max_length', self.max_length)
+        else:
+            matches = timer.time_matches(parser.iter_matches(state.text))
+            segments = parser.parse_matches(
+                state=state,
+                matches=self.limit_matches(state, matches),
+            )
+            yield from self.limit_segments(
+                state, timer.time_segments(segments),
+            )
+        yield from self.parse_tail(state, timer)
+
+    def is_too_deep(
+        self,
+        state: 'ParseState',
+    ) -> 'bool':
+        """Check whether state has more open tokens than max_depth"""
+        return self.max_depth is not None and (
+            len(state.token_stack) > self.max_depth
+        )
+
+    def limit_matches(
+        self,
+        state: 'ParseState',
+        matches: 'Iterable[Match]',
+    ) -> 'Iterator[Match]':
+        """Iterate over matches until max_depth, max_steps or max_time is
+        exceeded
+        """
+        deadline = None
+        if self.max_time is not None:
+            deadline = time.perf_counter() + self.max_time
+        for steps, match in enumerate(matches, 1):
+            # parse_matches resumes once it processed the last match
+            if self.is_too_deep(state):
+                state.exceeded = BudgetExceeded('max_depth', self.max_depth)
+            elif self.max_steps is not None and steps > self.max_steps:
+                state.exceeded = BudgetExceeded('max_steps', self.max_steps)
+            elif deadline is not None and time.perf_counter() > deadline:
+                state.exceeded = BudgetExceeded('max_time', self.max_time)
+            if state.exceeded is not None:
+                return
+            yield match
+        if self.is_too_deep(state):
+            state.exceeded = BudgetExceeded('max_depth', self.max_depth)
+
+    def limit_segments(
+        self,
+        state: 'ParseState',
+        segments: 'Iterable[Union[Segment, Span]]',
+    ) -> 'Iterator[Union[Segment, Span]]':
+        """Iterate over segments until max_segments is exceeded"""
+        for count, segment in enumerate(segments, 1):
+            if self.max_segments is not None and count > self.max_segments:
+                # the Segment starts at state.last_pos
+                state.exceeded = BudgetExceeded(
+                    'max_segments', self.max_segments,
+                )
+                return
+            if state.hooks is not None:
+                state.hooks.on_segment(segment)
+            yield segment
+
+    def parse_tail(
+        self,
+        state: 'ParseState',
+        timer: 'ParseTimer',
+    ) -> 'Iterator[Union[Segment, Span]]':
+        """Append anything that's left, as plain text once exceeded"""
+        token_stack = state.token_stack
+        params = token_stack.get_params()
+        if state.exceeded is not None:
+            if not self.fallback:
+                raise state.exceeded
+            params = EMPTY_PARAMS
+            if state.sink is not None:
+                # close the open styles, innermost first
+                while len(token_stack):
+                    token = token_stack.get_last_token()
+                    token_stack.remove_token(token)
+                    state.sink.close_style(token, token_stack.get_params())
+        hooks = state.hooks
+        if state.last_pos < len(state.text):
+            segment = timer.time_tail(state, params)
+            if hooks is not None:
+                hooks.on_segment(segment)
+            yield segment
+        if hooks is not None:
+            hooks.on_parse(timer.regex_time, timer.total_time)
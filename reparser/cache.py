@@ -0,0 +1,138 @@
+"""Thread-safe LRU cache of parse results"""
+
+import collections
+import sys
+import threading
+from typing import (  # pylint:disable=unused-import
+    Iterable,
+    Optional,
+    Tuple,
+)
+
+from reparser import (  # typing: pylint:disable=unused-import
+    BaseParser,
+    Params,
+    Segment,
+)
+
+
+class FrozenSegment(Segment):
+    """Read-only Segment, shared between the results of a ParseCache"""
+    __slots__ = ()
+
+    @classmethod
+    def freeze(
+        cls,
+        segment: 'Segment',
+    ) -> 'FrozenSegment':
+        """Build a read-only copy of segment"""
+        if isinstance(segment, cls):
+            return segment
+        params = segment.params
+        if not isinstance(params, Params):
+            params = Params(params)
+        frozen = cls.__new__(cls)
+        object.__setattr__(frozen, 'text', segment.text)
+        object.__setattr__(frozen, 'params', params)
+        return frozen
+
+    def __setattr__(self, name, value):
+        raise AttributeError('FrozenSegment is read-only')
+
+    def __delattr__(self, name):
+        raise AttributeError('FrozenSegment is read-only')
+
+
+class ParseCache:
+    """Thread-safe LRU cache of parse results
+
+    Results are tuples of FrozenSegments. The size of an entry is estimated
+    from the sizes of its text and of the text of its Segments.
+    """
+    # the counters are public statistics, updated under the lock
+    # pylint:disable=too-many-instance-attributes
+    def __init__(
+        self,
+        maxsize: 'Optional[int]' = 1024,
+        maxbytes: 'Optional[int]' = None,
+    ):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self.__data = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__data)
+
+    @property
+    def hit_rate(self) -> 'float':
+        """Share of lookups which found a result"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(
+        self,
+        text: 'str',
+    ) -> 'Optional[Tuple[FrozenSegment, ...]]':
+        """Return the cached result for text, None when missing"""
+        with self.__lock:
+            try:
+                result, _ = self.__data[text]
+            except KeyError:
+                self.misses += 1
+                return None
+            self.__data.move_to_end(text)
+            self.hits += 1
+            return result
+
+    def put(
+        self,
+        text: 'str',
+        segments: 'Iterable[Segment]',
+    ) -> 'Tuple[FrozenSegment, ...]':
+        """Store the result for text, return the stored read-only result"""
+        result = tuple(FrozenSegment.freeze(segment) for segment in segments)
+        size = sys.getsizeof(text) + sum(
+            sys.getsizeof(segment.text) for segment in result
+        )
+        with self.__lock:
+            if text in self.__data:
+                self.size -= self.__data.pop(text)[1]
+            self.__data[text] = result, size
+            self.size += size
+            while self.__data and (
+                (self.maxsize is not None and len(self.__data) > self.maxsize)
+                or (self.maxbytes is not None and self.size > self.maxbytes)
+            ):
+                _, (_, evicted_size) = self.__data.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+        return result
+
+    def parse(
+        self,
+        parser: 'BaseParser',
+        text: 'str',
+    ) -> 'Tuple[FrozenSegment, ...]':
+        """Return the result for text, parsing it with parser when missing
+
+        Fallbacks of the budget of parser are not cached, they depend on the
+        load for max_time.
+        """
+        result = self.get(text)
+        if result is None:
+            state = parser.get_state(text)
+            result = tuple(map(FrozenSegment.freeze, parser.parse_state(state)))
+            if state.exceeded is None:
+                result = self.put(text, result)
+        return result
+
+    def clear(self):
+        """Drop all results and reset the counters"""
+        with self.__lock:
+            self.__data.clear()
+            self.size = self.hits = self.misses = self.evictions = 0
@@ -0,0 +1,323 @@
+"""Compact JSON and binary encodings of parse results
+
+Every distinct params dict is stored once in a style table, segments are
+encoded column-wise as style ids and texts. Params have to be JSON
+serializable.
+"""
+
+import array
+import itertools
+import json
+import struct
+import sys
+from typing import (  # pylint:disable=unused-import
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+from reparser import (
+    Params,
+    Segment,
+    get_params_key,
+)
+
+
+MAGIC = b'RPS\x01'
+# magic, first style id, records, bytes of styles, bytes of text, typecodes
+HEADER = struct.Struct('<4sIIII2s')
+FRAME_SIZE = struct.Struct('<I')
+JSON_SEPARATORS = (',', ':')
+
+
+class StyleTable:
+    """Params dicts interned to style ids in order of appearance"""
+    def __init__(self):
+        self.styles = []  # type: List[Params]
+        self.ids = {}  # type: Dict[object, int]
+        # decoded styles are indexed on the first intern only
+        self.indexed = 0
+
+    def __len__(self):
+        return len(self.styles)
+
+    get_key = staticmethod(get_params_key)
+
+    def intern(
+        self,
+        params: 'Dict',
+    ) -> 'int':
+        """Get the style id of params, adding them if they are new"""
+        while self.indexed < len(self.styles):
+            self.ids.setdefault(
+                self.get_key(self.styles[self.indexed]), self.indexed,
+            )
+            self.indexed += 1
+        key = self.get_key(params)
+        try:
+            return self.ids[key]
+        except KeyError:
+            style_id = self.ids[key] = len(self.styles)
+            self.styles.append(Params(params))
+            self.indexed += 1
+            return style_id
+
+    def extend(
+        self,
+        first: 'int',
+        styles: 'List[Dict]',
+    ):
+        """Add decoded styles, which have to start at style id first"""
+        if first != len(self.styles):
+            raise ValueError(
+                'styles start at {}, table has {}'.format(first, len(self))
+            )
+        self.styles.extend(Params(params) for params in styles)
+
+
+class StyledSegments:
+    """Decoded parse result, segments are pairs of style id and text
+
+    Segments of the same style share one read-only Params.
+    """
+    __slots__ = ('styles', 'style_ids', 'texts')
+
+    def __init__(
+        self,
+        styles: 'List[Params]',
+        style_ids: 'List[int]',
+        texts: 'List[str]',
+    ):
+        self.styles = styles
+        self.style_ids = style_ids
+        self.texts = texts
+
+    def __iter__(self) -> 'Iterator[Tuple[int, str]]':
+        return zip(self.style_ids, self.texts)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def to_segments(self) -> 'List[Segment]':
+        """Build Segments, sharing the Params of a style"""
+        styles = self.styles
+        return [
+            Segment.from_params(text, styles[style_id])
+            for style_id, text in zip(self.style_ids, self.texts)
+        ]
+
+
+def intern_segments(
+    segments: 'Iterable[Segment]',
+    table: 'StyleTable',
+) -> 'Tuple[List[int], List[str]]':
+    """Split segments into style ids and texts"""
+    intern = table.intern
+    style_ids = []
+    texts = []
+    # Segments share the Params of the TokenStack, intern them once
+    last_params = last_id = None
+    for segment in segments:
+        params = segment.params
+        if params is not last_params:
+            last_params = params
+            last_id = intern(params)
+        style_ids.append(last_id)
+        texts.append(segment.text)
+    return style_ids, texts
+
+
+def encode_json(
+    segments: 'Iterable[Segment]',
+    table: 'Optional[StyleTable]' = None,
+) -> 'str':
+    """Encode segments as JSON
+
+    With a table shared between calls, only new styles are included.
+    """
+    if table is None:
+        table = StyleTable()
+    first = len(table)
+    style_ids, texts = intern_segments(segments, table)
+    return json.dumps({
+        'first': first,
+        'styles': table.styles[first:],
+        'ids': style_ids,
+        'texts': texts,
+    }, separators=JSON_SEPARATORS, ensure_ascii=False)
+
+
+def decode_json(
+    payload: 'Union[str, bytes]',
+    table: 'Optional[StyleTable]' = None,
+) -> 'StyledSegments':
+    """Decode segments from JSON"""
+    if table is None:
+        table = StyleTable()
+    data = json.loads(payload)
+    table.extend(data['first'], data['styles'])
+    return StyledSegments(table.styles, data['ids'], data['texts'])
+
+
+def get_typecode(
+    maximum: 'int',
+) -> 'str':
+    """Get the smallest unsigned array typecode for values up to maximum"""
+    for typecode in 'BHIQ':
+        if maximum < 1 << (8 * array.array(typecode).itemsize):
+            return typecode
+    raise OverflowError('{} does not fit into 64 bits'.format(maximum))
+
+
+def to_bytes(
+    values: 'array.array',
+) -> 'bytes':
+    """Dump array in little endian byte order"""
+    if sys.byteorder == 'big':
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def from_bytes(
+    typecode: 'str',
+    payload: 'bytes',
+    pos: 'int',
+    count: 'int',
+) -> 'Tuple[array.array, int]':
+    """Load array of count items in little endian byte order at pos
+
+    Returns the array and the position following it.
+    """
+    values = array.array(typecode)
+    end = pos + count * values.itemsize
+    values.frombytes(payload[pos:end])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values, end
+
+
+def split_text(
+    text: 'str',
+    lengths: 'Iterable[int]',
+) -> 'List[str]':
+    """Split text into consecutive pieces of lengths"""
+    ends = list(itertools.accumulate(lengths))
+    return [text[start:end] for start, end in zip([0] + ends, ends)]
+
+
+def encode_binary(
+    segments: 'Iterable[Segment]',
+    table: 'Optional[StyleTable]' = None,
+) -> 'bytes':
+    """Encode segments in the binary format
+
+    The style ids and the lengths of the texts are arrays of the smallest
+    fitting item size, followed by the joined UTF-8 encoded texts. With a
+    table shared between calls, only new styles are included.
+    """
+    if table is None:
+        table = StyleTable()
+    first = len(table)
+    style_ids, texts = intern_segments(segments, table)
+    styles = json.dumps(
+        table.styles[first:], separators=JSON_SEPARATORS,
+    ).encode()
+    lengths = [len(text) for text in texts]
+    id_typecode = get_typecode(len(table))
+    length_typecode = get_typecode(max(lengths, default=0))
+    text = ''.join(texts).encode('utf-8', 'surrogatepass')
+    return b''.join((
+        HEADER.pack(
+            MAGIC, first, len(texts), len(styles), len(text),
+            (id_typecode + length_typecode).encode(),
+        ),
+        styles,
+        to_bytes(array.array(id_typecode, style_ids)),
+        to_bytes(array.array(length_typecode, lengths)),
+        text,
+    ))
+
+
+def decode_binary(
+    payload: 'bytes',
+    table: 'Optional[StyleTable]' = None,
+) -> 'StyledSegments':
+    """Decode segments from the binary format"""
+    if table is None:
+        table = StyleTable()
+    magic, first, records, styles_size, text_size, typecodes = (
+        HEADER.unpack_from(payload)
+    )
+    if magic != MAGIC:
+        raise ValueError('payload is no encoded parse result')
+    id_typecode, length_typecode = typecodes.decode()
+
+    pos = HEADER.size
+    table.extend(first, json.loads(payload[pos:pos + styles_size].decode()))
+    pos += styles_size
+    style_ids, pos = from_bytes(id_typecode, payload, pos, records)
+    lengths, pos = from_bytes(length_typecode, payload, pos, records)
+    text = payload[pos:pos + text_size].decode('utf-8', 'surrogatepass')
+    return StyledSegments(
+        table.styles, style_ids.tolist(), split_text(text, lengths),
+    )
+
+
+class ResultWriter:
+    """Write a stream of encoded parse results, sharing one style table
+
+    Binary results are prefixed with their size, JSON results are written
+    one per line.
+    """
+    def __init__(
+        self,
+        file: 'Union[BinaryIO, TextIO]',
+        binary: 'bool' = True,
+    ):
+        self.file = file
+        self.binary = binary
+        self.table = StyleTable()
+
+    def write(
+        self,
+        segments: 'Iterable[Segment]',
+    ):
+        """Encode and write the segments of one parse result"""
+        if self.binary:
+            payload = encode_binary(segments, self.table)
+            self.file.write(FRAME_SIZE.pack(len(payload)))
+            self.file.write(payload)
+        else:
+            self.file.write(encode_json(segments, self.table))
+            self.file.write('\n')
+
+
+class ResultReader:
+    """Read a stream of parse results written by ResultWriter"""
+    def __init__(
+        self,
+        file: 'Union[BinaryIO, TextIO]',
+        binary: 'bool' = True,
+    ):
+        self.file = file
+        self.binary = binary
+        self.table = StyleTable()
+
+    def __iter__(self) -> 'Iterator[StyledSegments]':
+        if not self.binary:
+            for line in self.file:
+                yield decode_json(line, self.table)
+            return
+        while True:
+            size = self.file.read(FRAME_SIZE.size)
+            if not size:
+                return
+            size, = FRAME_SIZE.unpack(size)
+            yield decode_binary(self.file.read(size), self.table)
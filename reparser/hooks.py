@@ -0,0 +1,175 @@
+"""Callbacks observing the parser and counters built on them"""
+
+import collections
+import time
+from typing import (  # pylint:disable=unused-import
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    Match,
+    Union,
+)
+
+
+class ParseHooks:
+    """Callbacks for observing the parser, see BaseParser.parse"""
+    def on_match(
+        self,
+        token: 'Token',
+        match_type: 'MatchType',
+    ):
+        """A token has been matched"""
+
+    def on_skip(
+        self,
+        token: 'Token',
+        match_type: 'MatchType',
+    ):
+        """A matched token has been discarded inside a skip-section"""
+
+    def on_unmatched_end(
+        self,
+        token: 'Token',
+    ):
+        """A matched end token has been discarded without start token"""
+
+    def on_segment(
+        self,
+        segment: 'Union[Segment, Span]',
+    ):
+        """A Segment has been emitted"""
+
+    def on_parse(
+        self,
+        regex_time: 'float',
+        total_time: 'float',
+    ):
+        """A text has been parsed, times are in seconds"""
+
+
+class ParseStats(ParseHooks):
+    """Counters for profiling the parser, accumulated across parses
+
+    Tokens are counted by name, markdown tags by their char.
+    """
+    def __init__(self):
+        self.parses = 0
+        self.matches = collections.Counter()
+        self.skipped = collections.Counter()
+        self.unmatched_end = collections.Counter()
+        self.segments = 0
+        self.regex_time = 0.0
+        self.total_time = 0.0
+
+    @property
+    def python_time(self) -> 'float':
+        """Time spent in Python bookkeeping outside of the regex engine"""
+        return self.total_time - self.regex_time
+
+    def on_match(self, token, match_type):
+        self.matches[token.name] += 1
+
+    def on_skip(self, token, match_type):
+        self.skipped[token.name] += 1
+
+    def on_unmatched_end(self, token):
+        self.unmatched_end[token.name] += 1
+
+    def on_segment(self, segment):
+        self.segments += 1
+
+    def on_parse(self, regex_time, total_time):
+        self.parses += 1
+        self.regex_time += regex_time
+        self.total_time += total_time
+
+    def as_dict(self) -> 'Dict':
+        """Return the counters as dict"""
+        return {
+            'parses': self.parses,
+            'matches': dict(self.matches),
+            'skipped': dict(self.skipped),
+            'unmatched_end': dict(self.unmatched_end),
+            'segments': self.segments,
+            'regex_time': self.regex_time,
+            'python_time': self.python_time,
+            'total_time': self.total_time,
+        }
+
+
+class ParseTimer:
+    """Time spent by a parse in the regex engine and in total, in seconds
+
+    Time spent by the consumer of the Segments is not accounted.
+    """
+    __slots__ = ('regex_time', 'total_time')
+
+    def __init__(self):
+        self.regex_time = 0.0
+        self.total_time = 0.0
+
+    def time_matches(
+        self,
+        matches: 'Iterable[Match]',
+    ) -> 'Iterator[Match]':
+        """Iterate over matches, accounting the time of finding them"""
+        clock = time.perf_counter
+        matches = iter(matches)
+        while True:
+            start = clock()
+            match = next(matches, None)
+            self.regex_time += clock() - start
+            if match is None:
+                return
+            yield match
+
+    def time_segments(
+        self,
+        segments: 'Iterator[Union[Segment, Span]]',
+    ) -> 'Iterator[Union[Segment, Span]]':
+        """Iterate over segments, accounting the time of building them"""
+        clock = time.perf_counter
+        while True:
+            start = clock()
+            try:
+                segment = next(segments)
+            except StopIteration:
+                return
+            finally:
+                self.total_time += clock() - start
+            yield segment
+
+    def time_tail(
+        self,
+        state: 'ParseState',
+        params: 'Params',
+    ) -> 'Union[Segment, Span]':
+        """Build the Segment following the last token of state"""
+        start = time.perf_counter()
+        segment = state.factory.make_tail(state, params)
+        self.total_time += time.perf_counter() - start
+        return segment
+
+
+def parse_observed(
+    parser: 'BaseParser',
+    state: 'ParseState',
+) -> 'Generator[Union[Segment, Span]]':
+    """Parse the preprocessed text of state and report to its hooks"""
+    hooks = state.hooks
+    timer = ParseTimer()
+    segments = parser.parse_matches(
+        state=state,
+        matches=timer.time_matches(parser.iter_matches(state.text)),
+    )
+    for segment in timer.time_segments(segments):
+        hooks.on_segment(segment)
+        yield segment
+
+    # Append anything that's left
+    if state.last_pos < len(state.text):
+        segment = timer.time_tail(state, state.token_stack.get_params())
+        hooks.on_segment(segment)
+        yield segment
+    hooks.on_parse(timer.regex_time, timer.total_time)
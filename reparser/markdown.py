@@ -2,14 +2,20 @@
 
 import abc
 import re
+import string
 from typing import (  # pylint:disable=unused-import
+    Dict,
+    Iterator,
     List,
     Match,
+    Optional,
+    Pattern,
     Union,
     Tuple,
 )
 from reparser import (
     BaseParser,
+    BatchPostprocess,
     MatchType,
     Parser,
     Token,
@@ -17,30 +23,54 @@ from reparser import (
 from reparser import (  # typing: pylint:disable=unused-import
     TokenStack,
 )
+from reparser.budget import (  # typing: pylint:disable=unused-import
+    Budget,
+)
+from reparser.cache import (  # typing: pylint:disable=unused-import
+    ParseCache,
+)
+from reparser.reparse import (  # typing: pylint:disable=unused-import
+    Edit,
+)
+from reparser.stream import (  # typing: pylint:disable=unused-import
+    StreamScan,
+)
 
 
 B_LEFT = r'(?:(?<=[^a-zA-Z0-9])|(?<=^))'
 B_RIGHT = r'(?:(?=[^a-zA-Z0-9])|(?=$))'
 
 MARKDOWN_COMMON_END = r'(?<![\s\\])({tokens})' + B_RIGHT
-MARKDOWN_COMMON_START = (
+MARKDOWN_COMMON_OPEN = (
     B_LEFT +
     r'(?<!\\)(?P<tag>{tokens})'
     r'(?!\s)(?:(?!(?P=tag)))'
+)
+MARKDOWN_COMMON_START = (
+    MARKDOWN_COMMON_OPEN +
     r'(?=.+?(?:(?<![\s\\]))(?P=tag)%s)'
     % B_RIGHT
 )
 MARKDOWN_SKIP_END = r'(?<!\\)({tokens})'
-MARKDOWN_SKIP_START = (
+MARKDOWN_SKIP_OPEN = (
     r'(?<!\\)(?P<skip_tag>{tokens})'
     r'(?:(?!(?P=skip_tag)))'
+)
+MARKDOWN_SKIP_START = (
+    MARKDOWN_SKIP_OPEN +
     r'(?=.+?(?:(?<!\\))(?P=skip_tag))'
 )
+WORD_CHARS = frozenset(string.ascii_letters + string.digits)
+RE_UNESCAPE = re.compile(r'\\(.)', re.DOTALL)
 RE_CLEAN_WHITESPACE = re.compile(' +')
+# single spaces are left as they are
+RE_CLEAN_WHITESPACE_RUNS = re.compile(' {2,}')
 
 
 class MarkdownTag:
     """Container for a single markdown tag"""
+    __slots__ = ('char', 'literal', 'skip', 'params')
+
     def __init__(
         self,
         char: 'str',
@@ -48,12 +78,92 @@ class MarkdownTag:
         **params
     ):
         self.char = char
+        self.literal = RE_UNESCAPE.sub(r'\1', char)
         self.skip = skip
         self.params = params
 
+    @property
+    def name(self) -> 'str':
+        """Name of the tag, its unescaped char"""
+        return self.literal
+
+    def find_last_closer(
+        self,
+        text: 'str',
+        final: 'bool' = True,
+        start: 'int' = 0,
+    ) -> 'int':
+        """Return the position of the last valid closing tag in text or -1
+
+        Mirrors the closing tag lookahead of MARKDOWN_COMMON_START and
+        MARKDOWN_SKIP_START in a single backwards scan. With final unset the
+        text may continue, a closing tag at its very end is not yet valid.
+        Closing tags starting before start are not looked for.
+        """
+        literal = self.literal
+        size = len(literal)
+        end = len(text)
+        while True:
+            pos = text.rfind(literal, start, end)
+            if pos < 1:
+                # the lookahead requires at least one char before the tag
+                return -1
+            before = text[pos - 1]
+            if self.skip:
+                if before != '\\':
+                    return pos
+            elif not before.isspace() and before != '\\':
+                after = pos + size
+                if after < len(text):
+                    if text[after] not in WORD_CHARS:
+                        return pos
+                elif final:
+                    return pos
+            end = pos + size - 1
+
+
+class PendingOpener:
+    """Opening tag of a stream waiting for its closing tag
+
+    Positions are offsets into the text the opening tag has been found in,
+    its tail is kept to find closing tags across the text appended to it.
+    """
+    __slots__ = ('tag', 'start', 'end', 'tail', 'base')
+
+    def __init__(
+        self,
+        tag: 'MarkdownTag',
+        text: 'str',
+        start: 'int',
+        end: 'int',
+    ):
+        self.tag = tag
+        self.start = start
+        self.end = end
+        # the closing tag and the char before it
+        self.tail = text[-len(tag.literal) - 1:]
+        self.base = len(text) - len(self.tail)
+
+    def is_settled(
+        self,
+        text: 'str',
+    ) -> 'bool':
+        """Whether text appended to the text holds the closing tag"""
+        window = self.tail + text
+        pos = self.tag.find_last_closer(window, final=False)
+        if pos >= 0 and self.base + pos > self.end:
+            return True
+        self.tail = window[-len(self.tag.literal) - 1:]
+        self.base += len(window) - len(self.tail)
+        return False
+
 
 class MarkdownGroup(Token):
     """Container for a markdown tags that can be used as token for the parser"""
+    __slots__ = (
+        '__tokens', 'tags_common', 'tags_skip', 'tags_open', 'pattern_open',
+    )
+
     def __init__(
         self,
         *tokens: 'MarkdownTag',
@@ -62,50 +172,91 @@ class MarkdownGroup(Token):
     ):
         self.__tokens = {}
         for token in tokens:
-            self.__tokens[token.char.replace(r'\*', '*')] = token
+            self.__tokens[token.literal] = token
 
-        common_tokens = '|'.join(
-            token.char for token in tokens
-            if not token.skip
-        )
-        skip_tokens = '|'.join(
-            token.char for token in tokens
-            if token.skip
-        )
+        self.tags_common = [token for token in tokens if not token.skip]
+        self.tags_skip = [token for token in tokens if token.skip]
+        # order of the tags in the alternation of the opening pattern
+        self.tags_open = self.tags_common + self.tags_skip
 
-        pattern_start = []
         pattern_end = []
-
-        if common_tokens:
-            pattern_start.append(
-                MARKDOWN_COMMON_START.format(
-                    tokens=common_tokens,
-                )
-            )
+        if self.tags_common:
             pattern_end.append(
                 MARKDOWN_COMMON_END.format(
-                    tokens=common_tokens,
-                )
-            )
-
-        if skip_tokens:
-            pattern_start.append(
-                MARKDOWN_SKIP_START.format(
-                    tokens=skip_tokens,
+                    tokens=self.join_tags(self.tags_common),
                 )
             )
+        if self.tags_skip:
             pattern_end.append(
                 MARKDOWN_SKIP_END.format(
-                    tokens=skip_tokens,
+                    tokens=self.join_tags(self.tags_skip),
                 )
             )
 
         super().__init__(
             name=name,
-            pattern_start='|'.join(pattern_start),
+            pattern_start=self.build_pattern_start(
+                tags=self.tags_open,
+                lookahead=True,
+            ),
             pattern_end='|'.join(pattern_end),
             **params
         )
+        self.pattern_open = self.modify_pattern(
+            pattern=self.build_pattern_start(
+                tags=self.tags_open,
+                lookahead=False,
+            ),
+            group=self.group_start,
+        )
+
+    @staticmethod
+    def join_tags(
+        tags: 'List[MarkdownTag]',
+    ) -> 'str':
+        """Join the chars of tags into an alternation"""
+        return '|'.join(tag.char for tag in tags)
+
+    @classmethod
+    def build_pattern_start(
+        cls,
+        tags: 'List[MarkdownTag]',
+        lookahead: 'bool',
+    ) -> 'str':
+        """Build the pattern for opening tags
+
+        Without the lookahead for a closing tag the pattern can match opening
+        tags which are never closed, the parser has to check them.
+        """
+        common_tags = [tag for tag in tags if not tag.skip]
+        skip_tags = [tag for tag in tags if tag.skip]
+        pattern_start = []
+        if common_tags:
+            pattern_start.append(
+                (MARKDOWN_COMMON_START if lookahead else MARKDOWN_COMMON_OPEN)
+                .format(tokens=cls.join_tags(common_tags))
+            )
+        if skip_tags:
+            pattern_start.append(
+                (MARKDOWN_SKIP_START if lookahead else MARKDOWN_SKIP_OPEN)
+                .format(tokens=cls.join_tags(skip_tags))
+            )
+        return '|'.join(pattern_start)
+
+    def get_open_tag(
+        self,
+        match: 'Match',
+    ) -> 'MarkdownTag':
+        """Return the tag matched by the opening pattern of this group"""
+        for group in ('tag', 'skip_tag'):
+            try:
+                char = match.group('{}_{}'.format(self.name, group))
+            except IndexError:
+                # the pattern of the match has no tags of this kind
+                continue
+            if char is not None:
+                return self.__tokens[char]
+        raise ValueError('match of {} is no opening tag'.format(self.name))
 
     def get_tag(
         self,
@@ -124,6 +275,8 @@ class MarkdownBaseParser(BaseParser, metaclass=abc.ABCMeta):
     def __init__(
         self,
         tokens: 'List[Union[Token, MarkdownGroup, MarkdownTag]]',
+        cache: 'Optional[ParseCache]' = None,
+        budget: 'Optional[Budget]' = None,
     ):
         tags_to_wrap = []
         final_tokens = []
@@ -149,7 +302,177 @@ class MarkdownBaseParser(BaseParser, metaclass=abc.ABCMeta):
 
         super().__init__(
             tokens=final_tokens,
+            cache=cache,
+            budget=budget,
+        )
+        self.__openers = {
+            token.group_start: token
+            for token in final_tokens
+            if isinstance(token, MarkdownGroup)
+        }
+        # memo filled lazily, concurrent fills compile equal regexes and
+        # setdefault keeps the first one
+        self.__continuations = {}  # type: Dict[MarkdownTag, Pattern]
+
+    @staticmethod
+    def build_patterns(
+        tokens: 'List[Token]',
+    ) -> 'List[str]':
+        """Build list of patterns, markdown groups skip the closing lookahead"""
+        patterns = []
+        for token in tokens:
+            if isinstance(token, MarkdownGroup):
+                patterns.append(token.pattern_open)
+            else:
+                patterns.append(token.pattern_start)
+            if token.pattern_end:
+                patterns.append(token.pattern_end)
+        return patterns
+
+    def get_continuation(
+        self,
+        markdown_group: 'MarkdownGroup',
+        markdown_tag: 'MarkdownTag',
+    ) -> 'Pattern':
+        """Get regex for the alternatives following an opening tag
+
+        When the opening tag has no closing tag, the regex engine would have
+        backtracked into the remaining alternatives at the same position.
+        """
+        try:
+            return self.__continuations[markdown_tag]
+        except KeyError:
+            pass
+
+        position = self.tokens.index(markdown_group)
+        tags = markdown_group.tags_open
+        tags = tags[tags.index(markdown_tag) + 1:]
+        patterns = []
+        if tags:
+            patterns.append(markdown_group.modify_pattern(
+                pattern=markdown_group.build_pattern_start(
+                    tags=tags,
+                    lookahead=False,
+                ),
+                group=markdown_group.group_start,
+            ))
+        patterns.append(markdown_group.pattern_end)
+        patterns.extend(self.build_patterns(self.tokens[position + 1:]))
+        regex = re.compile('|'.join(patterns), re.DOTALL)
+        return self.__continuations.setdefault(markdown_tag, regex)
+
+    def iter_matches(
+        self,
+        text: 'str',
+        pos: 'int' = 0,
+        scan: 'Optional[StreamScan]' = None,
+    ) -> 'Iterator[Match]':
+        """Iterate over all matches of the compound regex in text from pos
+
+        Opening tags are checked against the position of the last closing
+        tag in text, which is looked up once per tag and call. With a scan
+        of a stream the iteration stops at opening tags without a closing
+        tag yet, unless they are followed by more than scan.max_pending
+        chars: those are never closed.
+        """
+        last_closers = {}  # type: Dict[MarkdownTag, int]
+        while True:
+            match = self.search(text, pos)
+            if match is None:
+                return
+            start = match.start()
+
+            while match is not None:
+                markdown_group = self.__openers.get(match.lastgroup)
+                if markdown_group is None:
+                    break
+                markdown_tag = markdown_group.get_open_tag(match)
+                try:
+                    last_closer = last_closers[markdown_tag]
+                except KeyError:
+                    if scan is None:
+                        last_closer = markdown_tag.find_last_closer(text)
+                    else:
+                        last_closer = self.find_stream_closer(
+                            markdown_tag, text, scan,
+                        )
+                    last_closers[markdown_tag] = last_closer
+                if last_closer > match.end():
+                    break
+                if scan is not None and (
+                    scan.max_pending is None
+                    or len(text) - start <= scan.max_pending
+                ):
+                    # the closing tag may follow in the continued text
+                    scan.blocked = PendingOpener(
+                        markdown_tag, text, start, match.end(),
+                    )
+                    return
+                # downstream error: opening tag is never closed
+                match = self.get_continuation(
+                    markdown_group=markdown_group,
+                    markdown_tag=markdown_tag,
+                ).match(text, start)
+
+            if match is None:
+                pos = start + 1
+                continue
+            yield match
+            # no markdown pattern can match the empty string
+            pos = max(match.end(), start + 1)
+
+    @staticmethod
+    def find_stream_closer(
+        markdown_tag: 'MarkdownTag',
+        text: 'str',
+        scan: 'StreamScan',
+    ) -> 'int':
+        """Return the position of the last closing tag in the text of scan
+
+        The text scanned for the tag by the previous scans is skipped, but
+        for the closing tags at its end which were not valid yet.
+        """
+        scanned, closer = scan.memo.get(markdown_tag, (scan.offset, -1))
+        start = scanned - scan.offset - len(markdown_tag.literal) - 1
+        pos = markdown_tag.find_last_closer(text, False, max(start, 0))
+        if pos >= 0:
+            closer = scan.offset + pos
+        scan.memo[markdown_tag] = (scan.offset + len(text), closer)
+        return closer - scan.offset
+
+    def get_edit_bounds(
+        self,
+        old_text: 'str',
+        text: 'str',
+        edit: 'Edit',
+        lookaround: 'int',
+    ) -> 'Tuple[int, int]':
+        """Widen the bounds of an edit by the opening tags whose check
+        against the last closing tag in text changes
+        """
+        restart, resync = super().get_edit_bounds(
+            old_text=old_text,
+            text=text,
+            edit=edit,
+            lookaround=lookaround,
         )
+        for markdown_group in self.__openers.values():
+            for markdown_tag in markdown_group.tags_open:
+                old_closer = markdown_tag.find_last_closer(old_text)
+                closer = markdown_tag.find_last_closer(text)
+                if old_closer >= edit.old_end:
+                    low = high = old_closer + edit.new_end - edit.old_end
+                elif old_closer < edit.start:
+                    low = high = old_closer
+                else:
+                    # the old closing tag has been replaced by the edit
+                    low, high = edit.start, edit.new_end
+                if low == high == closer:
+                    continue
+                # openers ending in between flip from valid to never closed
+                restart = min(restart, low - 1, closer - 1)
+                resync = max(resync, high, closer)
+        return restart, resync
 
     def get_matched_token(
         self,
@@ -183,6 +506,8 @@ class MarkdownBaseParser(BaseParser, metaclass=abc.ABCMeta):
 class MarkdownParser(Parser, MarkdownBaseParser):
     """Markdown parser with postprocessing"""
 
+    batch_postprocess = BatchPostprocess(RE_CLEAN_WHITESPACE_RUNS, ' ')
+
     def postprocess(
         self,
         text: 'str',
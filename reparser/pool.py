@@ -0,0 +1,116 @@
+"""Parse many texts in a process pool"""
+
+import collections
+import itertools
+import multiprocessing
+from typing import (  # pylint:disable=unused-import
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from reparser import (
+    Segment,
+    get_params_key,
+)
+from reparser import (  # typing: pylint:disable=unused-import
+    BaseParser,
+)
+
+
+# Parser of the current pool worker process, see parse_many
+WORKER_PARSER = None
+
+
+def init_worker(
+    parser: 'BaseParser',
+):
+    """Store the parser in a pool worker process"""
+    global WORKER_PARSER  # pylint: disable=global-statement
+    WORKER_PARSER = parser
+
+
+def parse_batch(
+    texts: 'List[str]',
+) -> 'Tuple[List[Dict], List[List[Tuple[str, int]]]]':
+    """Parse a batch of texts in a pool worker process
+
+    The segments are encoded as pairs of text and index into a table of the
+    distinct params of the batch.
+    """
+    styles = []
+    style_ids = {}
+    results = []
+    for text in texts:
+        result = []
+        for segment in WORKER_PARSER.parse(text):
+            params = segment.params
+            key = get_params_key(params)
+            try:
+                style_id = style_ids[key]
+            except KeyError:
+                style_id = style_ids[key] = len(styles)
+                styles.append(params)
+            result.append((segment.text, style_id))
+        results.append(result)
+    return styles, results
+
+
+def decode_batch(
+    styles: 'List[Dict]',
+    results: 'List[List[Tuple[str, int]]]',
+) -> 'Iterator[List[Segment]]':
+    """Build the Segments of the results of parse_batch"""
+    for result in results:
+        yield [
+            Segment.from_params(text, styles[style_id])
+            for text, style_id in result
+        ]
+
+
+def parse_many(
+    parser: 'BaseParser',
+    texts: 'Iterable[str]',
+    workers: 'Optional[int]' = None,
+    chunksize: 'int' = 64,
+) -> 'Iterator[List[Segment]]':
+    """Parse many texts in a process pool, yield Segments in input order
+
+    The parser is sent to every worker once, texts are sent in batches of
+    chunksize. Texts are read ahead by two batches per worker at most.
+    Without the fork start method the parser has to be picklable,
+    including the functions of MatchGroups.
+    A single worker parses in the current process.
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers <= 1:
+        for text in texts:
+            yield list(parser.parse(text))
+        return
+
+    texts = iter(texts)
+    batches = iter(
+        lambda: list(itertools.islice(texts, chunksize)),
+        [],
+    )
+
+    # Pool.imap would consume all texts upfront
+    pending = collections.deque()
+    # an abandoned or failed iteration terminates the workers on exit
+    with multiprocessing.Pool(
+        processes=workers,
+        initializer=init_worker,
+        initargs=(parser,),
+    ) as pool:
+        for batch in batches:
+            pending.append(pool.apply_async(parse_batch, (batch,)))
+            if len(pending) >= 2 * workers:
+                yield from decode_batch(*pending.popleft().get())
+        while pending:
+            yield from decode_batch(*pending.popleft().get())
+        pool.close()
+        pool.join()
@@ -0,0 +1,117 @@
+"""Postprocess the whole text in one pass before slicing its Segments"""
+
+import bisect
+from typing import (  # pylint:disable=unused-import
+    List,
+    Optional,
+    Pattern,
+    Type,
+)
+
+
+class PostprocessedText:
+    """Text postprocessed as a whole with a map of the substituted offsets
+
+    starts and ends are the offsets of the substituted matches in the
+    preprocessed text, shifts the accumulated change of length before each
+    match and after the last one.
+    """
+    __slots__ = ('text', 'starts', 'ends', 'shifts')
+
+    def __init__(
+        self,
+        text: 'str',
+        starts: 'List[int]',
+        ends: 'List[int]',
+        shifts: 'List[int]',
+    ):
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+        self.shifts = shifts
+
+    def get_offset(
+        self,
+        pos: 'int',
+    ) -> 'Optional[int]':
+        """Map pos of the preprocessed text, None within a substitution"""
+        index = bisect.bisect_right(self.ends, pos)
+        if index < len(self.starts) and self.starts[index] < pos:
+            return None
+        return pos + self.shifts[index]
+
+    def get_slice(
+        self,
+        start: 'int',
+        end: 'int',
+    ) -> 'Optional[str]':
+        """Get the postprocessed slice of the preprocessed text
+
+        Returns None when a substitution crosses the bounds of the slice.
+        """
+        if not self.starts:
+            return self.text[start:end]
+        start = self.get_offset(start)
+        end = self.get_offset(end)
+        if start is None or end is None:
+            return None
+        return self.text[start:end]
+
+
+class BatchPostprocess:
+    """Postprocess substituting the matches of regex by repl in one pass
+
+    Parsers declare their postprocess batchable when it gives the same text
+    for a slice as the batch does, as long as no match of regex crosses
+    the bounds of the slice. regex must not match the empty string and
+    should only match where the text changes.
+    """
+    __slots__ = ('regex', 'repl')
+
+    def __init__(
+        self,
+        regex: 'Pattern',
+        repl: 'str',
+    ):
+        self.regex = regex
+        self.repl = repl
+
+    def apply(
+        self,
+        text: 'str',
+    ) -> 'PostprocessedText':
+        """Postprocess the whole text"""
+        repl = self.repl
+        pieces = []
+        starts = []
+        ends = []
+        shifts = [0]
+        shift = last_pos = 0
+        for match in self.regex.finditer(text):
+            start, end = match.span()
+            replacement = match.expand(repl)
+            pieces.append(text[last_pos:start])
+            pieces.append(replacement)
+            shift += len(replacement) - end + start
+            starts.append(start)
+            ends.append(end)
+            shifts.append(shift)
+            last_pos = end
+        if not starts:
+            return PostprocessedText(text, starts, ends, shifts)
+        pieces.append(text[last_pos:])
+        return PostprocessedText(''.join(pieces), starts, ends, shifts)
+
+
+def get_batch_postprocess(
+    parser_type: 'Type[BaseParser]',
+) -> 'Optional[BatchPostprocess]':
+    """Get the batch_postprocess if it stands in for the postprocess
+    handler of parser_type, see BaseParser.batch_postprocess
+    """
+    for cls in parser_type.__mro__:
+        if 'batch_postprocess' in vars(cls):
+            if parser_type.postprocess is not cls.postprocess:
+                return None
+            return cls.batch_postprocess
+    return None
@@ -0,0 +1,236 @@
+"""Prefilter and per char dispatch of the compound regex
+
+The compound regex is only tried at the chars a match can start with, and
+with the dispatch only its alternatives which can start with the char.
+"""
+
+import re
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse  # pylint:disable=deprecated-module
+from typing import (  # pylint:disable=unused-import
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Match,
+    Optional,
+    Pattern,
+    Set,
+    Tuple,
+)
+
+# the opcodes are set up by sre_parse at import time, unseen by pylint
+# pylint:disable=no-member
+
+
+# References to groups by number, which change in a subset of alternatives
+GROUP_NUMBER_REFERENCE = re.compile(r'\\[1-9]|\(\?\(\d')
+
+# Upper bound for the size of char ranges expanded into trigger chars
+MAX_TRIGGER_RANGE = 256
+
+# Items matching the empty string only
+ZERO_WIDTH = (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT)
+# Repeats, possessive ones are new in Python 3.11
+REPEATS = tuple(
+    opcode for opcode in (
+        sre_parse.MAX_REPEAT,
+        sre_parse.MIN_REPEAT,
+        getattr(sre_parse, 'POSSESSIVE_REPEAT', None),
+    )
+    if opcode is not None
+)
+ATOMIC_GROUP = getattr(sre_parse, 'ATOMIC_GROUP', None)
+
+
+def get_first_chars(
+    items: 'Iterable',
+) -> 'Tuple[Optional[Set[str]], bool]':
+    """Get the chars a parsed regex can start with
+
+    Returns the set of chars, None for an unbounded set, and whether the
+    regex can match the empty string. Assertions are zero-width and ignored,
+    which can only widen the set.
+    """
+    chars = set()  # type: Set[str]
+    for opcode, value in items:
+        item_chars, nullable = get_item_chars(opcode, value)
+        if item_chars is None:
+            return None, False
+        chars.update(item_chars)
+        if not nullable:
+            return chars, False
+    return chars, True
+
+
+def get_item_chars(
+    opcode: 'int',
+    value,
+) -> 'Tuple[Optional[Set[str]], bool]':
+    """Get the chars a single item of a parsed regex can start with
+
+    See get_first_chars, repeats without a minimum are nullable.
+    """
+    if opcode is sre_parse.LITERAL:
+        return {chr(value)}, False
+    if opcode is sre_parse.IN:
+        return get_set_chars(value), False
+    if opcode in ZERO_WIDTH:
+        return set(), True
+    alternatives = get_alternatives(opcode, value)
+    if alternatives is None:
+        return None, False
+
+    chars = set()  # type: Set[str]
+    nullable = opcode in REPEATS and value[0] == 0
+    for alternative in alternatives:
+        alternative_chars, alternative_nullable = get_first_chars(
+            alternative
+        )
+        if alternative_chars is None:
+            return None, False
+        chars.update(alternative_chars)
+        nullable = nullable or alternative_nullable
+    return chars, nullable
+
+
+def get_set_chars(
+    items: 'Iterable',
+) -> 'Optional[Set[str]]':
+    """Get the chars of a parsed char set, None for an unbounded set"""
+    chars = set()  # type: Set[str]
+    for opcode, value in items:
+        if opcode is sre_parse.LITERAL:
+            chars.add(chr(value))
+        elif (
+            opcode is sre_parse.RANGE
+            and value[1] - value[0] < MAX_TRIGGER_RANGE
+        ):
+            chars.update(map(chr, range(value[0], value[1] + 1)))
+        else:
+            return None
+    return chars
+
+
+def get_alternatives(
+    opcode: 'int',
+    value,
+) -> 'Optional[List]':
+    """Get the parsed alternatives of a group, branch or repeat
+
+    Returns None for items which can start with any char.
+    """
+    if opcode is sre_parse.SUBPATTERN:
+        if len(value) == 4 and value[1] & re.IGNORECASE:
+            return None
+        return [value[-1]]
+    if opcode is sre_parse.BRANCH:
+        return value[1]
+    if opcode in REPEATS:
+        return [value[2]]
+    if opcode is ATOMIC_GROUP:
+        return [value]
+    # any char, back references, conditional groups, ...
+    return None
+
+
+def build_prefilter(
+    regex: 'Pattern',
+) -> 'Optional[Pattern]':
+    """Build a regex for the chars which can start a match of regex
+
+    Returns None when any char can start a match.
+    """
+    if regex.flags & re.IGNORECASE:
+        return None
+    parsed = sre_parse.parse(regex.pattern, regex.flags)
+    flags = getattr(parsed, 'state', getattr(parsed, 'pattern', None)).flags
+    if flags & re.IGNORECASE:
+        return None
+    chars, nullable = get_first_chars(parsed)
+    if chars is None or nullable or not chars:
+        return None
+    pattern = '[{}]'.format(''.join(re.escape(char) for char in sorted(chars)))
+    return re.compile(pattern)
+
+
+def build_dispatch(
+    regex: 'Pattern',
+    patterns: 'List[str]',
+) -> 'Optional[Dict[str, Pattern]]':
+    """Build a regex per char of the alternatives which can start with it
+
+    patterns are the alternatives of regex. The regex of a char keeps the
+    order and the named groups of its alternatives, chars which start the
+    same alternatives share a regex. Returns None when any char can start a
+    match or the alternatives are not the ones of regex.
+    """
+    if '|'.join(patterns) != regex.pattern or regex.flags & re.IGNORECASE:
+        return None
+    alternatives = {}  # type: Dict[str, List[int]]
+    for index, pattern in enumerate(patterns):
+        if GROUP_NUMBER_REFERENCE.search(pattern):
+            return None
+        parsed = sre_parse.parse(pattern, regex.flags)
+        state = getattr(parsed, 'state', getattr(parsed, 'pattern', None))
+        if state.flags & re.IGNORECASE:
+            return None
+        chars, nullable = get_first_chars(parsed)
+        if chars is None or nullable:
+            return None
+        for char in chars:
+            alternatives.setdefault(char, []).append(index)
+
+    regexes = {}  # type: Dict[Tuple[int, ...], Pattern]
+    dispatch = {}
+    for char, indices in alternatives.items():
+        key = tuple(indices)
+        if key not in regexes:
+            if len(key) == len(patterns):
+                regexes[key] = regex
+            else:
+                regexes[key] = re.compile(
+                    '|'.join(patterns[index] for index in key), regex.flags,
+                )
+        dispatch[char] = regexes[key]
+    return dispatch
+
+
+def iter_searched(
+    search: 'Callable[[str, int], Optional[Match]]',
+    text: 'str',
+    pos: 'int',
+) -> 'Iterator[Match]':
+    """Iterate over all matches found by search, none may be empty"""
+    while True:
+        match = search(text, pos)
+        if match is None:
+            return
+        yield match
+        pos = match.end()
+
+
+def get_alternation_cost(
+    parser: 'BaseParser',
+) -> 'Dict[str, float]':
+    """Report the alternatives tried at a position found by the prefilter
+
+    Without dispatch every alternative of the compound regex is tried,
+    with it only the ones which can start with the char at the position.
+    after is the mean over the chars, max the most for a single char.
+    """
+    before = len(parser.groups)
+    if parser.dispatch is None:
+        return {'before': before, 'after': before, 'max': before}
+    counts = [
+        sum(1 for group in parser.groups if group in regex.groupindex)
+        for regex in parser.dispatch.values()
+    ]
+    return {
+        'before': before,
+        'after': sum(counts) / len(counts),
+        'max': max(counts),
+    }
@@ -0,0 +1,255 @@
+"""Re-parse text after an edit, reusing the Segments outside of it"""
+
+import bisect
+from typing import (  # pylint:disable=unused-import
+    Callable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from reparser import (
+    ParseState,
+    SegmentFactory,
+)
+from reparser import (  # typing: pylint:disable=unused-import
+    BaseParser,
+    Segment,
+    Token,
+)
+
+
+class ParseResult:
+    """Segments of a text with checkpoints for re-parsing after edits
+
+    Checkpoints are the positions in the preprocessed text following the
+    matches, with the number of Segments preceding them in counts and the
+    tokens open at them in stacks. Segments are shared between results of
+    edits and must not be modified.
+    """
+    __slots__ = ('text', 'segments', 'positions', 'counts', 'stacks')
+
+    def __init__(
+        self,
+        text: 'str',
+        segments: 'List[Segment]',
+        positions: 'List[int]',
+        counts: 'List[int]',
+        stacks: 'List[Tuple[Token, ...]]',
+    ):
+        self.text = text
+        self.segments = segments
+        self.positions = positions
+        self.counts = counts
+        self.stacks = stacks
+
+    def __iter__(self):
+        return iter(self.segments)
+
+    def __len__(self):
+        return len(self.segments)
+
+
+def parse_result(
+    parser: 'BaseParser',
+    text: 'str',
+) -> 'ParseResult':
+    """Parse text to a ParseResult which can be updated with reparse"""
+    state = ParseState(parser.preprocess(text), factory=SegmentFactory(parser))
+    result = ParseResult(state.text, [], [0], [0], [()])
+    parse_checkpoints(parser, state, result)
+    return result
+
+
+class Edit:
+    """Replacement of deleted chars at start of a text with inserted"""
+    __slots__ = ('start', 'deleted', 'inserted')
+
+    def __init__(
+        self,
+        start: 'int',
+        deleted: 'int',
+        inserted: 'str',
+    ):
+        self.start = start
+        self.deleted = deleted
+        self.inserted = inserted
+
+    @property
+    def old_end(self) -> 'int':
+        """Position following the deleted chars in the text"""
+        return self.start + self.deleted
+
+    @property
+    def new_end(self) -> 'int':
+        """Position following the inserted chars in the edited text"""
+        return self.start + len(self.inserted)
+
+    def apply(
+        self,
+        text: 'str',
+    ) -> 'str':
+        """Return the edited text"""
+        return text[:self.start] + self.inserted + text[self.old_end:]
+
+
+class Resync:
+    """Check for the checkpoint to continue a re-parse with the old result
+
+    The checkpoint has to be at or after resync and match one of the
+    previous result shifted by delta, with the same open tokens. Its index
+    in the previous result is stored in index.
+    """
+    __slots__ = ('result', 'resync', 'delta', 'index')
+
+    def __init__(
+        self,
+        result: 'ParseResult',
+        resync: 'int',
+        delta: 'int',
+    ):
+        self.result = result
+        self.resync = resync
+        self.delta = delta
+        self.index = None  # type: Optional[int]
+
+    def __call__(
+        self,
+        pos: 'int',
+        tokens: 'Tuple[Token, ...]',
+    ) -> 'bool':
+        if pos < self.resync:
+            return False
+        positions = self.result.positions
+        old_pos = pos - self.delta
+        index = bisect.bisect_left(positions, old_pos)
+        if index == len(positions) or positions[index] != old_pos or (
+            self.result.stacks[index] != tokens
+        ):
+            return False
+        self.index = index
+        return True
+
+
+def reparse(
+    parser: 'BaseParser',
+    result: 'ParseResult',
+    edit: 'Edit',
+    lookaround: 'int' = 4096,
+) -> 'ParseResult':
+    """Parse the text of result after an edit, reusing its Segments
+
+    The edit applies to the preprocessed text, its inserted text is
+    preprocessed on its own. Parsing restarts at the last checkpoint ahead
+    of the edit and stops at the first one after it which the previous
+    result has with the same open tokens, anything outside is reused.
+    Matches of tokens and their lookarounds must not span more than
+    lookaround chars from their start.
+    """
+    edit = Edit(edit.start, edit.deleted, parser.preprocess(edit.inserted))
+    text = edit.apply(result.text)
+    restart, resync = parser.get_edit_bounds(
+        old_text=result.text,
+        text=text,
+        edit=edit,
+        lookaround=lookaround,
+    )
+    state, updated = resume_result(parser, result, text, restart)
+    is_synced = Resync(result, resync, edit.new_end - edit.old_end)
+    if parse_checkpoints(parser, state, updated, is_synced):
+        splice_result(updated, result, is_synced.index, is_synced.delta)
+    return updated
+
+
+def resume_result(
+    parser: 'BaseParser',
+    result: 'ParseResult',
+    text: 'str',
+    restart: 'int',
+) -> 'Tuple[ParseState, ParseResult]':
+    """Restore the state at the last checkpoint of result up to restart
+
+    Returns the state for parsing text from it on and the result holding
+    the checkpoints and Segments preceding it.
+    """
+    index = max(bisect.bisect_right(result.positions, restart) - 1, 0)
+    state = ParseState(text, factory=SegmentFactory(parser))
+    state.last_pos = result.positions[index]
+    for token in result.stacks[index]:
+        state.token_stack.add_token(token)
+    updated = ParseResult(
+        text,
+        result.segments[:result.counts[index]],
+        result.positions[:index + 1],
+        result.counts[:index + 1],
+        result.stacks[:index + 1],
+    )
+    return state, updated
+
+
+def splice_result(
+    updated: 'ParseResult',
+    result: 'ParseResult',
+    index: 'int',
+    delta: 'int',
+):
+    """Append the Segments and checkpoints of result following its
+    checkpoint at index to updated, shifted by delta
+    """
+    old_count = result.counts[index]
+    shift = len(updated.segments) - old_count
+    updated.segments.extend(result.segments[old_count:])
+    updated.positions.extend(
+        pos + delta for pos in result.positions[index + 1:]
+    )
+    updated.counts.extend(
+        count + shift for count in result.counts[index + 1:]
+    )
+    updated.stacks.extend(result.stacks[index + 1:])
+
+
+def parse_checkpoints(
+    parser: 'BaseParser',
+    state: 'ParseState',
+    result: 'ParseResult',
+    is_synced: 'Optional[Callable[[int, Tuple[Token, ...]], bool]]' = (
+        None
+    ),
+) -> 'bool':
+    """Parse the text of state into result, recording checkpoints
+
+    Matches which are skipped or unmatched end tokens do not move the
+    position following the last Segment and have no checkpoint. Stops at
+    the first checkpoint accepted by is_synced and returns True,
+    otherwise the text is parsed to its end.
+    """
+    segments = result.segments
+    positions = result.positions
+    counts = result.counts
+    stacks = result.stacks
+    token_stack = state.token_stack
+    synced = False
+
+    def checkpointed_matches():
+        nonlocal synced
+        for match in parser.iter_matches(state.text, state.last_pos):
+            yield match
+            # parse_matches resumes once it processed the match
+            pos = match.end()
+            if state.last_pos != pos:
+                continue
+            tokens = token_stack.get_tokens()
+            positions.append(pos)
+            counts.append(len(segments))
+            stacks.append(tokens)
+            if is_synced is not None and is_synced(pos, tokens):
+                synced = True
+                return
+
+    for segment in parser.parse_matches(state, checkpointed_matches()):
+        segments.append(segment)
+    if not synced and state.last_pos < len(state.text):
+        segments.append(state.factory.make_tail(
+            state, token_stack.get_params(),
+        ))
+    return synced
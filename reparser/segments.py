@@ -0,0 +1,500 @@
+"""Segments of parsed text and the factories building them"""
+
+import json
+from typing import (  # pylint:disable=unused-import
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Match,
+    Optional,
+    Union,
+)
+
+
+class Params(dict):
+    """Read-only params, shared between Segments of the same style"""
+    __slots__ = ()
+
+    def __readonly(self, *args, **kwargs):
+        raise TypeError('Params are read-only, copy them before modifying')
+
+    __setitem__ = __delitem__ = __ior__ = __readonly
+    clear = pop = popitem = setdefault = update = __readonly
+
+    def __reduce__(self):
+        return Params, (dict(self),)
+
+    def copy(self) -> 'Dict':
+        """Return a modifiable copy"""
+        return dict(self)
+
+
+EMPTY_PARAMS = Params()
+
+
+def get_params_key(
+    params: 'Dict',
+) -> 'object':
+    """Get hashable key of params
+
+    Values are keyed with their type, 1 and True are equal but distinct
+    styles.
+    """
+    try:
+        return frozenset(
+            (key, type(value), value) for key, value in params.items()
+        )
+    except TypeError:
+        # unhashable param values
+        return json.dumps(params, sort_keys=True, default=repr)
+
+
+class MatchGroup:
+    """Name of regex group which should be replaced by its value when token is parsed"""
+    __slots__ = ('group', 'func')
+
+    def __init__(
+        self,
+        group: 'str',
+        func: 'Optional[Callable]' = None,
+    ):
+        self.group = group
+        self.func = func if callable(func) else None
+
+    def get_group_value(
+        self,
+        token: 'Token',
+        match: 'Match',
+    ) -> 'str':
+        """Return value of regex match for the specified group"""
+        try:
+            value = match.group('{}_{}'.format(token.name, self.group))
+        except IndexError:
+            # downstream error: invalid nested groups
+            value = ''
+        return value if self.func is None else self.func(value)
+
+
+class Segment:
+    """Segment of parsed text"""
+    __slots__ = ('text', 'params')
+
+    def __init__(
+        self,
+        text: 'Union[MatchGroup, str]',
+        token: 'Optional[Token]' = None,
+        match: 'Optional[Match]' = None,
+        **params
+    ):
+        self.text = text
+        self.params = params
+        if token and match:
+            self.update_text(token, match)
+            self.update_params(token, match)
+
+    @classmethod
+    def from_params(
+        cls,
+        text: 'str',
+        params: 'Params',
+    ) -> 'Segment':
+        """Build Segment from final text and shared params"""
+        segment = cls.__new__(cls)
+        segment.text = text
+        segment.params = params
+        return segment
+
+    def update_text(
+        self,
+        token: 'Token',
+        match: 'Match',
+    ):
+        """Update text from results of regex match"""
+        if isinstance(self.text, MatchGroup):
+            self.text = self.text.get_group_value(token, match)
+
+    def update_params(
+        self,
+        token: 'Token',
+        match: 'Match',
+    ):
+        """Update dict of params from results of regex match"""
+        for key, match_group in self.params.items():
+            if isinstance(match_group, MatchGroup):
+                self.params[key] = match_group.get_group_value(token, match)
+
+
+class TokenSegment(Segment):
+    """Segment of a single token, which keeps the token"""
+    __slots__ = ('token',)
+
+    def __init__(
+        self,
+        text: 'Union[MatchGroup, str]',
+        token: 'Optional[Token]' = None,
+        match: 'Optional[Match]' = None,
+        **params
+    ):
+        super().__init__(text, token, match, **params)
+        self.token = token
+
+    @classmethod
+    def from_token(
+        cls,
+        token: 'Token',
+        text: 'str',
+        params: 'Params',
+    ) -> 'TokenSegment':
+        """Build Segment of token from final text and params"""
+        segment = cls.from_params(text, params)
+        segment.token = token
+        return segment
+
+
+class Span:
+    """Segment of parsed text given by offsets into the preprocessed text
+
+    The text is sliced and postprocessed by the parser on first access only,
+    tokens with a text param carry it resolved. Spans share their read-only
+    Params with the TokenStack.
+    """
+    __slots__ = (
+        'source', 'start', 'end', 'params', 'parser', 'skipped', '__text',
+    )
+
+    # a Span is built per Segment, grouping its fields would add an object
+    def __init__(  # pylint:disable=too-many-arguments
+        self,
+        source: 'str',
+        start: 'int',
+        end: 'int',
+        params: 'Params',
+        text: 'Optional[str]' = None,
+        parser: 'Optional[BaseParser]' = None,
+        skipped: 'bool' = False,
+    ):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.params = params
+        self.__text = text
+        self.parser = parser
+        self.skipped = skipped
+
+    @property
+    def text(self) -> 'str':
+        """Text of the span"""
+        if self.__text is None:
+            text = self.get_source_text()
+            if self.parser is not None:
+                text = self.postprocess_text(text)
+            self.__text = text
+        return self.__text
+
+    def get_source_text(self) -> 'str':
+        """Slice the text of the span from its source"""
+        return self.source[self.start:self.end]
+
+    def postprocess_text(
+        self,
+        text: 'str',
+    ) -> 'str':
+        """Postprocess the sliced text with the handlers of the parser"""
+        if self.skipped:
+            return self.parser.postprocess_skipped(text)
+        return self.parser.postprocess(text)
+
+
+class BytesSpan(Span):
+    """Span given by byte offsets into UTF-8 encoded bytes
+
+    The text is bytes as well, postprocessed decoded by the handlers of the
+    parser.
+    """
+    __slots__ = ()
+
+    def postprocess_text(
+        self,
+        text: 'bytes',
+    ) -> 'bytes':
+        return super().postprocess_text(
+            text.decode('utf-8', 'surrogateescape')
+        ).encode('utf-8', 'surrogateescape')
+
+
+def map_byte_spans(
+    spans: 'Iterable[Span]',
+) -> 'Iterator[BytesSpan]':
+    """Map the Spans of BaseParser.parse_spans on BytesSpans
+
+    BytesSpans carry byte offsets into the UTF-8 encoded preprocessed text
+    and have the encoded text and the params of the Spans. For ASCII text
+    the offsets are the same.
+    """
+    text = source = None
+    ascii_only = True
+    char_pos = byte_pos = 0
+    for span in spans:
+        if span.source is not text:
+            text = span.source
+            source = text.encode('utf-8', 'surrogateescape')
+            ascii_only = len(source) == len(text)
+            char_pos = byte_pos = 0
+        if ascii_only:
+            start, end = span.start, span.end
+        else:
+            start = byte_pos + len(text[char_pos:span.start].encode(
+                'utf-8', 'surrogateescape',
+            ))
+            piece = text[span.start:span.end]
+            end = start + len(piece.encode('utf-8', 'surrogateescape'))
+            char_pos, byte_pos = span.end, end
+        if span.parser is None:
+            # tokens carry their resolved text
+            token_text = span.text.encode('utf-8', 'surrogateescape')
+            yield BytesSpan(source, start, end, span.params, token_text)
+        else:
+            yield BytesSpan(
+                source, start, end, span.params, None, span.parser,
+                span.skipped,
+            )
+
+
+def parse_coalesced(
+    parser: 'BaseParser',
+    state: 'ParseState',
+) -> 'Iterator[Segment]':
+    """Parse the text of state to Segments, merging neighbours with equal
+    params
+
+    The Segments of parser.parse_state are merged, hooks observe them before.
+    Single tokens are merged when they have no params but a text,
+    others like links or line breaks stay separate Segments. Params are
+    equal with the types of their values only, see get_params_key.
+    """
+    state.factory = TokenSegmentFactory(state.factory)
+    plans = parser.plans
+    run = []  # type: List[str]
+    run_params = None
+    for segment in parser.parse_state(state):
+        params = segment.params
+        if isinstance(segment, TokenSegment) and (
+            not plans[segment.token.group_start].is_text
+        ):
+            if run:
+                yield Segment.from_params(''.join(run), run_params)
+                run = []
+            yield segment
+        elif run and (params is run_params or (
+            params == run_params
+            and get_params_key(params) == get_params_key(run_params)
+        )):
+            run.append(segment.text)
+        else:
+            if run:
+                yield Segment.from_params(''.join(run), run_params)
+            run = [segment.text]
+            run_params = params
+    if run:
+        yield Segment.from_params(''.join(run), run_params)
+
+
+class SegmentFactory:
+    """Builder of the Segments of a parse, see ParseState.factory"""
+    __slots__ = ('parser', 'plans')
+
+    def __init__(
+        self,
+        parser: 'BaseParser',
+    ):
+        self.parser = parser
+        self.plans = parser.plans
+
+    def get_text(
+        self,
+        text: 'str',
+        start: 'int',
+        end: 'int',
+        skipped: 'bool',
+    ) -> 'str':
+        """Slice and postprocess the text between tokens"""
+        if skipped:
+            return self.parser.postprocess_skipped(text[start:end])
+        return self.parser.postprocess(text[start:end])
+
+    def make_segment(
+        self,
+        text: 'str',
+        start: 'int',
+        end: 'int',
+        params: 'Params',
+        skipped: 'bool',
+    ) -> 'Segment':
+        """Build Segment for the text between tokens"""
+        return Segment.from_params(
+            self.get_text(text, start, end, skipped), params,
+        )
+
+    def make_tail(
+        self,
+        state: 'ParseState',
+        params: 'Params',
+    ) -> 'Segment':
+        """Build Segment for the text following the last token"""
+        return self.make_segment(
+            state.text, state.last_pos, len(state.text), params, False,
+        )
+
+    def make_token_segment(
+        self,
+        token: 'Token',
+        match: 'Match',
+        group: 'str',
+        params: 'Params',
+    ) -> 'Segment':
+        """Build Segment for a single token"""
+        # pylint: disable=unused-argument
+        text, single_params = self.plans[group].resolve(match, params)
+        if text is None:
+            text = match.group(group)
+        return Segment.from_params(text, Params(single_params))
+
+
+class BatchedSegmentFactory(SegmentFactory):
+    """SegmentFactory slicing the text between tokens from the batch
+
+    Skipped text and slices crossing a substitution are postprocessed on
+    their own.
+    """
+    __slots__ = ('postprocessed',)
+
+    def __init__(
+        self,
+        parser: 'BaseParser',
+        postprocessed: 'PostprocessedText',
+    ):
+        super().__init__(parser)
+        self.postprocessed = postprocessed
+
+    def get_text(self, text, start, end, skipped):
+        if not skipped:
+            postprocessed = self.postprocessed
+            if not postprocessed.starts:
+                # nothing substituted
+                return postprocessed.text[start:end]
+            piece = postprocessed.get_slice(start, end)
+            if piece is not None:
+                return piece
+        return super().get_text(text, start, end, skipped)
+
+
+class TokenSegmentFactory(SegmentFactory):
+    """SegmentFactory building TokenSegments for single tokens
+
+    The text between tokens is sliced by factory.
+    """
+    __slots__ = ('slice_text',)
+
+    def __init__(
+        self,
+        factory: 'SegmentFactory',
+    ):
+        super().__init__(factory.parser)
+        self.slice_text = factory.get_text
+
+    def make_segment(self, text, start, end, params, skipped):
+        return Segment.from_params(
+            self.slice_text(text, start, end, skipped), params,
+        )
+
+    def make_token_segment(self, token, match, group, params):
+        text, single_params = self.plans[group].resolve(match, params)
+        if text is None:
+            text = match.group(group)
+        return TokenSegment.from_token(token, text, Params(single_params))
+
+
+class SinkFactory(SegmentFactory):
+    """SegmentFactory pushing the text into a sink instead of building
+    Segments, see BaseParser.parse_into
+
+    The text between tokens is sliced by factory. None stands in for every
+    Segment.
+    """
+    __slots__ = ('slice_text', 'sink')
+
+    def __init__(
+        self,
+        factory: 'SegmentFactory',
+        sink: 'Sink',
+    ):
+        super().__init__(factory.parser)
+        self.slice_text = factory.get_text
+        self.sink = sink
+
+    def make_segment(self, text, start, end, params, skipped):
+        self.sink.text(self.slice_text(text, start, end, skipped))
+
+    def make_token_segment(self, token, match, group, params):
+        text, single_params = self.plans[group].resolve(match, params)
+        if text is None:
+            text = match.group(group)
+        self.sink.token(token, text, single_params)
+
+
+class PendingSinkFactory(SinkFactory):
+    """SinkFactory holding back the text of the last Segment until it is
+    pushed
+
+    The factory stands in for every Segment, a Segment which is dropped
+    after it has been built, like by a Budget, never reaches the sink.
+    """
+    __slots__ = ('text', 'token', 'params')
+
+    def __init__(
+        self,
+        factory: 'SegmentFactory',
+        sink: 'Sink',
+    ):
+        super().__init__(factory, sink)
+        self.text = ''
+        self.token = None  # type: Optional[Token]
+        self.params = None  # type: Optional[Dict]
+
+    def make_segment(self, text, start, end, params, skipped):
+        self.text = self.slice_text(text, start, end, skipped)
+        self.token = None
+        return self
+
+    def make_token_segment(self, token, match, group, params):
+        text, self.params = self.plans[group].resolve(match, params)
+        self.text = match.group(group) if text is None else text
+        self.token = token
+        return self
+
+    def push(self):
+        """Push the text of the last Segment into the sink"""
+        if self.token is None:
+            self.sink.text(self.text)
+        else:
+            self.sink.token(self.token, self.text, self.params)
+
+
+class SpanFactory(SegmentFactory):
+    """SegmentFactory building Spans"""
+    __slots__ = ()
+
+    def make_segment(self, text, start, end, params, skipped):
+        return Span(text, start, end, params, None, self.parser, skipped)
+
+    def make_token_segment(self, token, match, group, params):
+        text, single_params = self.plans[group].resolve(match, params)
+        return Span(
+            source=match.string,
+            start=match.start(group),
+            end=match.end(group),
+            params=Params(single_params),
+            text=text,
+        )
@@ -0,0 +1,186 @@
+"""Sinks rendering parse events straight into an output buffer"""
+
+import abc
+import html
+import io
+from typing import (  # pylint:disable=unused-import
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from reparser import (
+    EMPTY_PARAMS,
+    Segment,
+    Token,
+)
+
+
+class Sink(metaclass=abc.ABCMeta):
+    """Receiver of the events of BaseParser.parse_into
+
+    Every event is mapped on segment by default, subclasses implement at
+    least segment. The buffer is an io.StringIO or a list of strings.
+    """
+    def __init__(
+        self,
+        buffer: 'Optional[Union[io.StringIO, List[str]]]' = None,
+    ):
+        if buffer is None:
+            buffer = io.StringIO()
+        self.buffer = buffer
+        if isinstance(buffer, list):
+            self.write = buffer.append
+        else:
+            self.write = buffer.write
+        self.params = EMPTY_PARAMS
+
+    def getvalue(self) -> 'str':
+        """Get the output written so far"""
+        if isinstance(self.buffer, list):
+            return ''.join(self.buffer)
+        return self.buffer.getvalue()
+
+    def open_style(
+        self,
+        token: 'Token',
+        params: 'Dict',
+    ):
+        """A start token has been added, params are merged up to it"""
+        # pylint: disable=unused-argument
+        self.params = params
+
+    def close_style(
+        self,
+        token: 'Token',
+        params: 'Dict',
+    ):
+        """An end token has been removed, params are merged without it"""
+        # pylint: disable=unused-argument
+        self.params = params
+
+    def text(
+        self,
+        text: 'str',
+    ):
+        """Text between tokens in the current style"""
+        self.segment(text, self.params)
+
+    def token(
+        self,
+        token: 'Token',
+        text: 'str',
+        params: 'Dict',
+    ):
+        """A single token with its resolved text and params"""
+        # pylint: disable=unused-argument
+        self.segment(text, params)
+
+    @abc.abstractmethod
+    def segment(
+        self,
+        text: 'str',
+        params: 'Dict',
+    ):
+        """Write text with params"""
+
+    def write_segments(
+        self,
+        segments: 'Iterable[Segment]',
+    ):
+        """Write Segments from BaseParser.parse"""
+        for segment in segments:
+            self.segment(segment.text, segment.params)
+
+
+class PlainTextSink(Sink):
+    """Sink writing the text only, stripping the markup"""
+
+    def open_style(self, token, params):
+        pass
+
+    def close_style(self, token, params):
+        pass
+
+    def text(self, text):
+        self.write(text)
+
+    def token(self, token, text, params):
+        self.write(text)
+
+    def segment(self, text, params):
+        self.write(text)
+
+
+class HtmlSink(Sink):
+    """Sink writing escaped text wrapped into HTML tags for its params
+
+    styles maps params to tags, the first one is the outermost. Segments
+    with the segment_type LINE_BREAK are written as <br>.
+    """
+    STYLES = (
+        ('is_bold', 'b'),
+        ('is_italic', 'i'),
+        ('is_underline', 'u'),
+        ('is_strikethrough', 's'),
+        ('is_code', 'code'),
+    )
+
+    def __init__(
+        self,
+        buffer: 'Optional[Union[io.StringIO, List[str]]]' = None,
+        styles: 'Optional[Iterable[Tuple[str, str]]]' = None,
+    ):
+        super().__init__(buffer)
+        self.styles = tuple(self.STYLES if styles is None else styles)
+        self.wrap = ('', '')
+        self.wraps = {}  # type: Dict[frozenset, Tuple[str, str]]
+
+    def get_wrap(
+        self,
+        params: 'Dict',
+    ) -> 'Tuple[str, str]':
+        """Get the opening and closing tags for params, memoized"""
+        try:
+            key = frozenset(params.items())
+            return self.wraps[key]
+        except TypeError:
+            # unhashable param values
+            return self.build_wrap(params)
+        except KeyError:
+            wrap = self.wraps[key] = self.build_wrap(params)
+            return wrap
+
+    def build_wrap(
+        self,
+        params: 'Dict',
+    ) -> 'Tuple[str, str]':
+        """Build the opening and closing tags for params"""
+        tags = [tag for key, tag in self.styles if params.get(key)]
+        opening = ''.join('<{}>'.format(tag) for tag in tags)
+        closing = ''.join('</{}>'.format(tag) for tag in reversed(tags))
+        link_target = params.get('link_target')
+        if link_target:
+            opening += '<a href="{}">'.format(html.escape(link_target))
+            closing = '</a>' + closing
+        return opening, closing
+
+    def open_style(self, token, params):
+        self.wrap = self.get_wrap(params)
+
+    def close_style(self, token, params):
+        self.wrap = self.get_wrap(params)
+
+    def text(self, text):
+        opening, closing = self.wrap
+        self.write(opening + html.escape(text, quote=False) + closing)
+
+    def segment(self, text, params):
+        if params.get('segment_type') == 'LINE_BREAK':
+            self.write('<br>')
+            return
+        opening, closing = self.get_wrap(params)
+        self.write(opening + html.escape(text, quote=False) + closing)
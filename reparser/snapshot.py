@@ -0,0 +1,369 @@
+"""On-disk snapshots of fully built parsers for a fast cold start
+
+Pickling a compiled regex stores its pattern only and compiles it again on
+load. Snapshots store the compiled code of the sre engine instead, hence
+they are bound to the Python version. A snapshot carries a fingerprint of
+the token definitions, the parser class and the Python and re versions
+and a digest of its payload, stale and corrupt snapshots are rebuilt by
+load_parser.
+
+The token definitions themselves are not stored: the snapshot refers to
+them by their position in the list passed to load_parser, MatchGroup
+callables are re-attached by reference this way. The cache and the budget
+of the parser are passed on load as well.
+
+Snapshots are unpickled on load, which can run arbitrary code: only load
+snapshots from trusted locations which no one else can write to. The
+digest detects corrupt files, it is no authentication.
+"""
+
+import hashlib
+import io
+import os
+import pickle
+import re
+try:
+    import re._compiler as sre_compile
+    import re._constants as sre_constants
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    # pylint:disable=deprecated-module
+    import sre_compile
+    import sre_constants
+    import sre_parse
+import sys
+import warnings
+from typing import (  # pylint:disable=unused-import
+    BinaryIO,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Pattern,
+    Tuple,
+    Type,
+    Union,
+)
+
+try:
+    import _sre
+except ImportError:  # other implementations than CPython
+    _sre = None
+
+from reparser import (
+    BaseParser,
+    MatchGroup,
+    Token,
+)
+from reparser.budget import (
+    Budget,
+)
+from reparser.cache import (
+    ParseCache,
+)
+from reparser.markdown import (
+    MarkdownBaseParser,
+    MarkdownGroup,
+    MarkdownTag,
+)
+
+
+VERSION = 2
+MAGIC = b'RPSNAP'
+REGEX_TYPE = type(re.compile(''))
+
+
+def describe_value(
+    value: 'object',
+) -> 'object':
+    """Describe a param value, callables by their qualified name"""
+    if isinstance(value, MatchGroup):
+        return 'MatchGroup', value.group, describe_value(value.func)
+    if callable(value):
+        return '{}.{}'.format(
+            getattr(value, '__module__', None),
+            getattr(value, '__qualname__', repr(value)),
+        )
+    return repr(value)
+
+
+def describe_token(
+    token: 'Union[Token, MarkdownTag]',
+) -> 'Tuple':
+    """Describe the definition of a token or markdown tag"""
+    params = tuple(sorted(
+        (key, describe_value(value)) for key, value in token.params.items()
+    ))
+    if isinstance(token, MarkdownTag):
+        return 'MarkdownTag', token.char, token.skip, params
+    fields = (
+        describe_value(type(token)), token.name, token.pattern_start,
+        token.pattern_end, token.skip, params,
+    )
+    if isinstance(token, MarkdownGroup):
+        fields += tuple(describe_token(tag) for tag in token.tags_open)
+    return fields
+
+
+def get_source_stamps(
+    parser_type: 'Type[BaseParser]',
+) -> 'Tuple':
+    """Get size and mtime of the modules defining the parser"""
+    stamps = []
+    for name in sorted({
+        cls.__module__ for cls in parser_type.__mro__
+        if cls.__module__ != 'builtins'
+    }):
+        path = getattr(sys.modules.get(name), '__file__', None)
+        try:
+            stat = os.stat(path)
+        except (OSError, TypeError):
+            stamps.append((name, None))
+        else:
+            stamps.append((name, stat.st_size, stat.st_mtime_ns))
+    return tuple(stamps)
+
+
+def get_fingerprint(
+    parser_type: 'Type[BaseParser]',
+    tokens: 'List[Union[Token, MarkdownTag]]',
+) -> 'str':
+    """Get the fingerprint of a parser built from tokens"""
+    description = (
+        VERSION, sys.version, sre_constants.MAGIC,
+        describe_value(parser_type),
+        get_source_stamps(parser_type),
+        tuple(describe_token(token) for token in tokens),
+    )
+    return hashlib.sha256(repr(description).encode()).hexdigest()
+
+
+def dump_regex(
+    regex: 'Pattern',
+) -> 'Tuple':
+    """Get the arguments for compiling regex without parsing it again
+
+    Mirrors re.compile, the code is None when the sre internals differ.
+    """
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+        code = sre_compile._code(  # pylint:disable=protected-access
+            parsed, regex.flags,
+        )
+        # opcodes are named int constants, which do not pickle
+        code = [int(value) for value in code]
+    except (AttributeError, TypeError):
+        code = None
+    indexgroup = [None] * (regex.groups + 1)
+    for name, index in regex.groupindex.items():
+        indexgroup[index] = name
+    return (
+        regex.pattern, regex.flags, code, regex.groups,
+        dict(regex.groupindex), tuple(indexgroup),
+    )
+
+
+def load_regex(
+    dumped: 'Tuple',
+) -> 'Pattern':
+    """Build a regex from the arguments returned by dump_regex
+
+    Regexes without usable compiled code are compiled again, with a
+    RuntimeWarning as the snapshot does not speed up loading them.
+    """
+    pattern, flags, code, groups, groupindex, indexgroup = dumped
+    if code is None or _sre is None:
+        reason = 'the sre internals differ'
+    else:
+        try:
+            return _sre.compile(
+                pattern, flags, code, groups, groupindex, indexgroup,
+            )
+        except (TypeError, RuntimeError) as error:
+            # the signature of the sre engine changed
+            reason = 'the sre engine rejected it: {}'.format(error)
+    warnings.warn(
+        'compiling the regex of a snapshot again, {}'.format(reason),
+        RuntimeWarning,
+    )
+    return re.compile(pattern, flags)
+
+
+class SnapshotPickler(pickle.Pickler):
+    """Pickler storing regexes as compiled code and tokens as references"""
+    def __init__(
+        self,
+        file: 'BinaryIO',
+        tokens: 'List[Union[Token, MarkdownTag]]',
+    ):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.references = {id(tokens): ('tokens',)}
+        for index, token in enumerate(tokens):
+            self.references[id(token)] = ('token', index)
+            for key, _, func in getattr(token, 'dynamic_params', ()):
+                if func is not None:
+                    self.references[id(func)] = ('func', index, key)
+            if isinstance(token, MarkdownGroup):
+                for tag_index, tag in enumerate(token.tags_open):
+                    self.references[id(tag)] = ('tag', index, tag_index)
+
+    def persistent_id(self, obj):  # pylint:disable=method-hidden
+        if isinstance(obj, REGEX_TYPE):
+            return ('regex',) + dump_regex(obj)
+        if isinstance(obj, ParseCache):
+            return ('cache',)
+        if isinstance(obj, Budget):
+            return ('budget',)
+        return self.references.get(id(obj))
+
+
+class SnapshotUnpickler(pickle.Unpickler):
+    """Unpickler resolving the references of SnapshotPickler"""
+    def __init__(
+        self,
+        file: 'BinaryIO',
+        tokens: 'List[Union[Token, MarkdownTag]]',
+        cache: 'Optional[ParseCache]' = None,
+        budget: 'Optional[Budget]' = None,
+    ):
+        super().__init__(file)
+        self.tokens = tokens
+        self.cache = cache
+        self.budget = budget
+        # regexes shared between attributes, like the dispatch, stay shared
+        self.regexes = {}  # type: Dict[Tuple[str, int], Pattern]
+
+    def persistent_load(self, pid):  # pylint:disable=method-hidden
+        kind = pid[0]
+        if kind == 'regex':
+            key = pid[1], pid[2]
+            if key not in self.regexes:
+                self.regexes[key] = load_regex(pid[1:])
+            return self.regexes[key]
+        if kind in ('token', 'func', 'tag'):
+            return self.load_token_reference(pid)
+        passed = {
+            'tokens': self.tokens, 'cache': self.cache, 'budget': self.budget,
+        }
+        if kind not in passed:
+            raise pickle.UnpicklingError(
+                'unknown reference {!r}'.format(kind)
+            )
+        return passed[kind]
+
+    def load_token_reference(
+        self,
+        pid: 'Tuple',
+    ) -> 'object':
+        """Resolve the reference to a token, a tag or a MatchGroup callable"""
+        kind, index = pid[:2]
+        token = self.tokens[index]
+        if kind == 'func':
+            return token.params[pid[2]].func
+        if kind == 'tag':
+            return token.tags_open[pid[2]]
+        return token
+
+
+def warm_up(
+    parser: 'BaseParser',
+):
+    """Compile the regexes parsers build lazily, to include them"""
+    if not isinstance(parser, MarkdownBaseParser):
+        return
+    for token in parser.tokens:
+        if isinstance(token, MarkdownGroup):
+            for tag in token.tags_open:
+                parser.get_continuation(token, tag)
+
+
+def dump_parser(
+    parser: 'BaseParser',
+    tokens: 'List[Union[Token, MarkdownTag]]',
+) -> 'bytes':
+    """Dump a parser built from tokens into a snapshot"""
+    buffer = io.BytesIO()
+    SnapshotPickler(buffer, tokens).dump(parser)
+    payload = buffer.getvalue()
+    return b''.join((
+        MAGIC, get_fingerprint(type(parser), tokens).encode(),
+        hashlib.sha256(payload).digest(), payload,
+    ))
+
+
+def restore_parser(
+    snapshot: 'bytes',
+    parser_type: 'Type[BaseParser]',
+    tokens: 'List[Union[Token, MarkdownTag]]',
+    cache: 'Optional[ParseCache]' = None,
+    budget: 'Optional[Budget]' = None,
+) -> 'Optional[BaseParser]':
+    """Restore a parser from a snapshot, None if the snapshot is stale
+
+    Snapshots not matching their digest are None as well.
+    """
+    header = MAGIC + get_fingerprint(parser_type, tokens).encode()
+    if not snapshot.startswith(header):
+        return None
+    start = len(header) + hashlib.sha256().digest_size
+    payload = snapshot[start:]
+    if hashlib.sha256(payload).digest() != snapshot[len(header):start]:
+        return None
+    buffer = io.BytesIO(payload)
+    parser = SnapshotUnpickler(buffer, tokens, cache, budget).load()
+    if type(parser) is not parser_type:  # pylint:disable=unidiomatic-typecheck
+        return None
+    # the parser is frozen, snapshots of parsers without cache or budget
+    # have no reference to replace
+    vars(parser).update(cache=cache, budget=budget)
+    return parser
+
+
+def save_parser(
+    path: 'str',
+    parser: 'BaseParser',
+    tokens: 'List[Union[Token, MarkdownTag]]',
+):
+    """Write a snapshot of parser to path, replacing it atomically"""
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    try:
+        with open(tmp_path, 'wb') as file:
+            file.write(dump_parser(parser, tokens))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def load_parser(
+    path: 'str',
+    parser_type: 'Type[BaseParser]',
+    tokens: 'List[Union[Token, MarkdownTag]]',
+    cache: 'Optional[ParseCache]' = None,
+    budget: 'Optional[Budget]' = None,
+) -> 'BaseParser':
+    """Load the parser for tokens from the snapshot at path
+
+    Missing, unreadable, stale and corrupt snapshots are replaced by a
+    snapshot of a newly built parser. Failing to write it is not fatal. The
+    snapshot is unpickled, path must be trusted.
+    """
+    try:
+        with open(path, 'rb') as file:
+            parser = restore_parser(
+                file.read(), parser_type, tokens, cache, budget,
+            )
+    except Exception:  # pylint: disable=broad-except
+        # unreadable, corrupt or of a different release of the module,
+        # unpickling raises about anything for damaged data
+        parser = None
+    if parser is not None:
+        return parser
+
+    parser = parser_type(tokens, cache=cache, budget=budget)
+    warm_up(parser)
+    try:
+        save_parser(path, parser, tokens)
+    except OSError:
+        pass
+    return parser
@@ -0,0 +1,379 @@
+"""Parse streams of text and memory-mapped files incrementally"""
+
+import bisect
+import codecs
+import functools
+import mmap
+from typing import (  # pylint:disable=unused-import
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Match,
+    Optional,
+    TextIO,
+    Union,
+)
+
+from reparser import (
+    ParseState,
+    Params,
+    SegmentFactory,
+    Span,
+    SpanFactory,
+)
+from reparser import (  # typing: pylint:disable=unused-import
+    BaseParser,
+    Segment,
+)
+
+
+class StreamScan:
+    """State of the scans of a stream, kept from one scan to the next
+
+    pos is the position in the text to resume at, offset the number of
+    chars dropped ahead of the text. blocked is the match waiting for more
+    text, if any: its start is the position of the match and its method
+    is_settled(appended) tells whether the text appended since settles it.
+    Matches followed by more than max_pending chars are settled. Parsers
+    keep their lookups in memo, with positions counted from the start of
+    the stream.
+    """
+    __slots__ = ('max_pending', 'pos', 'offset', 'blocked', 'memo')
+
+    def __init__(
+        self,
+        max_pending: 'Optional[int]',
+    ):
+        self.max_pending = max_pending
+        self.pos = 0
+        self.offset = 0
+        self.blocked = None
+        self.memo = {}  # type: Dict
+
+
+class FileSpan(Span):
+    """Span given by byte offsets into a memory-mapped UTF-8 file
+
+    The text is decoded from the file on first access only, invalid bytes
+    are decoded as lone surrogates. The file stays mapped as long as any of
+    its FileSpans is alive.
+    """
+    __slots__ = ()
+
+    def get_source_text(self) -> 'str':
+        return self.source[self.start:self.end].decode(
+            'utf-8', 'surrogateescape',
+        )
+
+
+class MappedFile:
+    """UTF-8 file mapped into memory and decoded in chunks
+
+    The byte offsets of the decoded text are kept per block of chars,
+    offsets within a block are found by encoding its head again. Blocks of
+    ASCII text map chars on bytes one to one.
+    """
+    BLOCK_SIZE = 1024
+    __slots__ = ('buffer', 'char_starts', 'byte_starts', 'blocks')
+
+    def __init__(
+        self,
+        path: 'str',
+    ):
+        with open(path, 'rb') as file:
+            try:
+                self.buffer = mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ,
+                )
+            except ValueError:
+                # empty files cannot be mapped
+                self.buffer = b''
+        self.char_starts = []  # type: List[int]
+        self.byte_starts = []  # type: List[int]
+        self.blocks = []  # type: List[Optional[str]]
+
+    def iter_chunks(
+        self,
+        chunk_size: 'int',
+    ) -> 'Iterator[str]':
+        """Decode the file in chunks of up to chunk_size bytes"""
+        decoder = codecs.getincrementaldecoder('utf-8')('surrogateescape')
+        size = len(self.buffer)
+        char_pos = 0
+        for pos in range(0, size, chunk_size):
+            # bytes of an incomplete char are buffered by the decoder
+            byte_pos = pos - len(decoder.getstate()[0])
+            text = decoder.decode(
+                self.buffer[pos:pos + chunk_size], pos + chunk_size >= size,
+            )
+            self.add_blocks(text, char_pos, byte_pos)
+            char_pos += len(text)
+            yield text
+
+    def add_blocks(
+        self,
+        text: 'str',
+        char_pos: 'int',
+        byte_pos: 'int',
+    ):
+        """Add the offsets of text decoded from byte_pos"""
+        for start in range(0, len(text), self.BLOCK_SIZE):
+            block = text[start:start + self.BLOCK_SIZE]
+            size = len(block.encode('utf-8', 'surrogateescape'))
+            self.char_starts.append(char_pos + start)
+            self.byte_starts.append(byte_pos)
+            self.blocks.append(None if size == len(block) else block)
+            byte_pos += size
+
+    def drop(
+        self,
+        pos: 'int',
+        keep: 'int',
+    ):
+        """Forget the offsets of the blocks ending before pos
+
+        Of the chars before pos, the offset of keep is remembered only.
+        """
+        index = bisect.bisect_right(self.char_starts, pos) - 1
+        if index > 0 and keep < self.char_starts[index]:
+            # keep stands in for the block preceding the remaining ones
+            offset = self.get_offset(keep)
+            index -= 1
+            self.char_starts[index] = keep
+            self.byte_starts[index] = offset
+            self.blocks[index] = None
+        if index > 0:
+            del self.char_starts[:index]
+            del self.byte_starts[:index]
+            del self.blocks[:index]
+
+    def get_offset(
+        self,
+        pos: 'int',
+    ) -> 'int':
+        """Map a char offset of the decoded text on a byte offset"""
+        index = bisect.bisect_right(self.char_starts, pos) - 1
+        delta = pos - self.char_starts[index]
+        block = self.blocks[index]
+        if block is None:
+            return self.byte_starts[index] + delta
+        return self.byte_starts[index] + len(
+            block[:delta].encode('utf-8', 'surrogateescape')
+        )
+
+
+class FileSpanFactory(SpanFactory):
+    """SpanFactory building the FileSpans of a mapped file parsed by state"""
+    __slots__ = ('scan', 'mapped')
+
+    def __init__(
+        self,
+        parser: 'BaseParser',
+        scan: 'StreamScan',
+        mapped: 'MappedFile',
+    ):
+        super().__init__(parser)
+        self.scan = scan
+        self.mapped = mapped
+
+    def make_segment(self, text, start, end, params, skipped):
+        mapped = self.mapped
+        offset = self.scan.offset
+        return FileSpan(
+            mapped.buffer,
+            mapped.get_offset(offset + start),
+            mapped.get_offset(offset + end),
+            params, None, self.parser, skipped,
+        )
+
+    def make_token_segment(self, token, match, group, params):
+        text, single_params = self.plans[group].resolve(match, params)
+        mapped = self.mapped
+        offset = self.scan.offset
+        return FileSpan(
+            source=mapped.buffer,
+            start=mapped.get_offset(offset + match.start(group)),
+            end=mapped.get_offset(offset + match.end(group)),
+            params=Params(single_params),
+            text=text,
+        )
+
+
+def parse_stream(
+    parser: 'BaseParser',
+    chunks: 'Union[Iterable[str], TextIO]',
+    lookaround: 'int' = 4096,
+    chunk_size: 'int' = 65536,
+    max_pending: 'Optional[int]' = 1 << 20,
+) -> 'Generator[Segment]':
+    """Parse text from an iterable of chunks or a text file object
+
+    Segments are yielded as soon as they are final, the same Segments as
+    from parsing the joined text. Matches of tokens and their lookarounds
+    must not span more than lookaround chars from their start.
+    Each chunk is preprocessed on its own.
+
+    The text following the last final Segment is buffered: a Segment is
+    final at the next token only. A markdown opening tag holds back the
+    text until its closing tag arrives, for at most max_pending chars.
+    Opening tags which wait longer are never closed, unlike in the joined
+    text. Text without tokens is held back for at most max_pending chars
+    as well, longer runs are split into several Segments. Pass None to
+    wait for the end of the stream.
+    """
+    if hasattr(chunks, 'read'):
+        chunks = iter(functools.partial(chunks.read, chunk_size), '')
+    yield from parse_chunks(
+        parser, ParseState('', factory=SegmentFactory(parser)), chunks,
+        lookaround, StreamScan(max_pending),
+    )
+
+
+def parse_file(
+    parser: 'BaseParser',
+    path: 'str',
+    lookaround: 'int' = 4096,
+    chunk_size: 'int' = 1 << 20,
+    max_pending: 'Optional[int]' = 1 << 20,
+) -> 'Generator[FileSpan]':
+    """Parse a UTF-8 file mapped into memory to FileSpans
+
+    The file is decoded in chunks of chunk_size bytes and parsed like by
+    parse_stream. Unlike there, text without tokens is not kept decoded:
+    only the text following the scanned text and the lookaround ahead of
+    it are. FileSpans carry byte offsets into the file and decode their
+    text on access. The preprocess handler has to keep the length of the
+    text.
+    """
+    scan = StreamScan(max_pending)
+    mapped = MappedFile(path)
+    state = ParseState('', factory=FileSpanFactory(parser, scan, mapped))
+
+    def iter_chunks():
+        for chunk in mapped.iter_chunks(chunk_size):
+            mapped.drop(scan.offset, scan.offset + state.last_pos)
+            yield chunk
+
+    yield from parse_chunks(parser, state, iter_chunks(), lookaround, scan)
+
+
+def parse_chunks(
+    parser: 'BaseParser',
+    state: 'ParseState',
+    chunks: 'Iterable[str]',
+    lookaround: 'int',
+    scan: 'StreamScan',
+) -> 'Generator[Union[Segment, FileSpan]]':
+    """Parse chunks appended to the text of state, see parse_stream
+
+    Chunks are collected without copying until a scan is worth it: once
+    they hold at least lookaround chars and as many as the text held back,
+    or, while a match waits for more text, once it is settled. A scan
+    resumes where the previous one settled, the text is copied once per
+    scan and the held back text at most doubles in between.
+    FileSpans are built from offsets, their text is dropped once scanned
+    and state.last_pos may precede the text of state.
+    """
+    spans = isinstance(state.factory, FileSpanFactory)
+    max_pending = scan.max_pending
+    pieces = []  # type: List[str]
+    size = 0
+    for chunk in chunks:
+        text = parser.preprocess(chunk)
+        if spans and len(text) != len(chunk):
+            raise ValueError('preprocess changed the offsets of the file')
+        pieces.append(text)
+        size += len(text)
+        if scan.blocked is not None:
+            if not scan.blocked.is_settled(text) and (
+                max_pending is None
+                or len(state.text) + size - scan.blocked.start <= max_pending
+            ):
+                continue
+        elif size < max(lookaround, len(state.text) - (
+            scan.pos if spans else state.last_pos
+        )):
+            continue
+
+        # drop everything but the context for lookbehinds
+        if spans:
+            cut = max(scan.pos - lookaround, 0)
+        else:
+            cut = max(state.last_pos - lookaround, 0)
+        state.text = state.text[cut:] + ''.join(pieces)
+        state.last_pos -= cut
+        scan.pos -= cut
+        scan.offset += cut
+        pieces = []
+        size = 0
+
+        scan.blocked = None
+        yield from parser.parse_matches(
+            state=state,
+            matches=iter_settled_matches(
+                parser=parser,
+                text=state.text,
+                lookaround=lookaround,
+                scan=scan,
+            ),
+        )
+        if max_pending is not None and scan.pos - state.last_pos > max_pending:
+            yield make_settled_segment(state, scan.pos)
+
+    state.text += ''.join(pieces)
+    yield from parser.parse_matches(
+        state=state,
+        matches=parser.iter_matches(state.text, scan.pos),
+    )
+
+    # Append anything that's left
+    if state.last_pos < len(state.text):
+        yield state.factory.make_tail(
+            state, state.token_stack.get_params(),
+        )
+
+
+def make_settled_segment(
+    state: 'ParseState',
+    end: 'int',
+) -> 'Segment':
+    """Build the Segment of the text up to end which has no tokens
+
+    The text is cut from a longer one, it is postprocessed as skipped
+    text within a skipping token only.
+    """
+    token_stack = state.token_stack
+    segment = state.factory.make_segment(
+        state.text, state.last_pos, end, token_stack.get_params(),
+        bool(token_stack) and token_stack.get_last_token().skip,
+    )
+    state.last_pos = end
+    return segment
+
+
+def iter_settled_matches(
+    parser: 'BaseParser',
+    text: 'str',
+    lookaround: 'int',
+    scan: 'StreamScan',
+) -> 'Iterator[Match]':
+    """Iterate over the matches which stay the same when text continues
+
+    The position to resume the scan at is stored in scan.pos: following
+    the last settled match, at the start of the match the iteration is
+    blocked by, or at the end of the settled text when no further match
+    starts within it.
+    """
+    limit = len(text) - lookaround
+    for match in parser.iter_matches(text, scan.pos, scan):
+        if match.start() >= limit:
+            break
+        scan.pos = max(match.end(), match.start() + 1)
+        yield match
+    if scan.blocked is None:
+        scan.pos = max(scan.pos, limit)
+    else:
+        # the matches ahead of it have been given up on
+        scan.pos = max(scan.pos, scan.blocked.start)
@@ -1,5 +1,9 @@
+import random
 from typing import (
     Generator,
+    List,
+    Optional,
+    Sequence,
 )
 from reparser import (
     Segment,
@@ -7,9 +11,28 @@ from reparser import (
 )
 
 
+# markup and plain chars mixed into random texts
+CHARS = ['*', '**', '_', '__', '`', '~~', '==', '\\', ' ', '\n', 'a', '.',
+         '[x](y)']
+
+
 def serialize(segments: 'Generator[Segment]'):
     return [(segment.text, segment.params) for segment in segments]
 
 
 def get_segments(text: 'str', parser: 'BaseParser'):
     return serialize(parser.parse(text))
+
+
+def random_texts(
+    count: 'int',
+    chars: 'Sequence[str]' = CHARS,
+    max_length: 'int' = 30,
+    rand: 'Optional[random.Random]' = None,
+) -> 'List[str]':
+    if rand is None:
+        rand = random.Random(0)
+    return [
+        ''.join(rand.choice(chars) for _ in range(rand.randint(0, max_length)))
+        for _ in range(count)
+    ]
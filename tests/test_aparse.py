@@ -0,0 +1,93 @@
+"""Test parsing inside an asyncio event loop"""
+
+import asyncio
+import concurrent.futures
+
+from reparser.aio import (
+    AsyncParse,
+    aparse,
+)
+
+from .common import (
+    get_segments,
+    serialize,
+)
+from .test_markdown import (
+    get_parser,
+)
+
+
+TEXT = 'Hello **bold** world!\nYou can **try *this* awesome**. ' * 50
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_aparse():
+    parser = get_parser()
+    actual = serialize(run(aparse(parser, TEXT, yield_every=7)))
+    assert get_segments(TEXT, parser) == actual
+
+
+def test_async_parse_yields_to_loop():
+    parser = get_parser()
+    ticks = []
+
+    async def ticker(done):
+        while not done.is_set():
+            ticks.append(None)
+            await asyncio.sleep(0)
+
+    async def main():
+        done = asyncio.Event()
+        task = asyncio.ensure_future(ticker(done))
+        segments = []
+        async for segment in AsyncParse(parser, TEXT, yield_every=10):
+            segments.append(segment)
+        done.set()
+        await task
+        return segments
+
+    segments = serialize(run(main()))
+    assert get_segments(TEXT, parser) == segments
+    matches = list(parser.iter_matches(TEXT))
+    assert len(ticks) >= (len(matches) - 1) // 10
+
+
+def test_async_parse_yields_within_segment():
+    parser = get_parser()
+    text = '```' + 'skipped **bold** ' * 200 + '```'
+    ticks = []
+
+    async def ticker(done):
+        while not done.is_set():
+            ticks.append(None)
+            await asyncio.sleep(0)
+
+    async def main():
+        done = asyncio.Event()
+        task = asyncio.ensure_future(ticker(done))
+        segments = await aparse(parser, text, yield_every=10)
+        done.set()
+        await task
+        return segments
+
+    segments = serialize(run(main()))
+    assert get_segments(text, parser) == segments
+    assert len(segments) == 1
+    # 400 matches, most of them skipped
+    assert len(ticks) >= 399 // 10
+
+
+def test_aparse_offload():
+    parser = get_parser()
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        actual = serialize(run(aparse(
+            parser, TEXT, executor=executor, offload_size=100,
+        )))
+    assert get_segments(TEXT, parser) == actual
@@ -0,0 +1,64 @@
+"""Test postprocessing the whole text in one pass"""
+
+import re
+
+from reparser import (
+    BatchPostprocess,
+    Token,
+)
+from reparser.markdown import (
+    MarkdownParser,
+)
+
+from .common import (
+    random_texts,
+    serialize,
+)
+from .test_markdown import (
+    get_parser,
+)
+
+
+class SlicedMarkdownParser(MarkdownParser):
+    batch_postprocess = None
+
+
+class UpperMarkdownParser(MarkdownParser):
+    def postprocess(self, text):
+        return super().postprocess(text).upper()
+
+
+def test_offsets():
+    postprocessed = BatchPostprocess(re.compile(' {2,}'), ' ').apply(
+        'a  b c   d'
+    )
+    assert postprocessed.text == 'a b c d'
+    assert [postprocessed.get_offset(pos) for pos in range(11)] == [
+        0, 1, None, 2, 3, 4, 5, None, None, 6, 7,
+    ]
+    assert postprocessed.get_slice(3, 10) == 'b c d'
+    assert postprocessed.get_slice(0, 2) is None
+
+
+def test_batch_equivalence():
+    # a zero-width token splits runs of spaces
+    tokens = get_parser().tokens + [Token('mark', r'(?=#)', text='')]
+    batched = MarkdownParser(tokens)
+    sliced = SlicedMarkdownParser(tokens)
+    assert batched.batch is not None and sliced.batch is None
+    chars = ['*', '**', '_', '`', '``', '~~', ' ', '  ', '   ', 'a', '#',
+             '\n', '[x](y)', '\\']
+    for text in random_texts(2000, chars):
+        assert serialize(batched.parse(text)) == serialize(
+            sliced.parse(text)
+        ), text
+
+
+def test_overridden_postprocess():
+    parser = UpperMarkdownParser(get_parser().tokens)
+    assert parser.batch is None
+    text = 'pre  **bold**  post'
+    assert serialize(parser.parse(text)) == [
+        ('PRE ', {}), ('BOLD', {'is_bold': True}), (' POST', {}),
+    ]
+    assert serialize(parser.parse(text)) == serialize(parser.parse_spans(text))
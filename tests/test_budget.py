@@ -0,0 +1,107 @@
+"""Test the work budget of parsers"""
+
+import pytest
+
+from reparser import (
+    ParseStats,
+)
+from reparser.budget import (
+    Budget,
+    BudgetExceeded,
+)
+from reparser.markdown import (
+    MarkdownParser,
+)
+
+from .common import (
+    get_segments,
+    serialize,
+)
+from .data import (
+    MARKDOWN_TEXT_EXAMPLE,
+    MARKDOWN_SERIALIZED_SEGMENTS_EXAMPLE,
+)
+from .test_markdown import (
+    get_parser,
+)
+
+
+def get_budgeted_parser(**limits):
+    return MarkdownParser(get_parser().tokens, budget=Budget(**limits))
+
+
+def test_within_budget():
+    parser = get_budgeted_parser(
+        max_length=1000, max_depth=4, max_segments=100, max_steps=100,
+        max_time=10,
+    )
+    actual = get_segments(MARKDOWN_TEXT_EXAMPLE, parser)
+    assert MARKDOWN_SERIALIZED_SEGMENTS_EXAMPLE == actual
+
+
+def test_max_length():
+    parser = get_budgeted_parser(max_length=5)
+    assert get_segments('a  **b**', parser) == [('a **b**', {})]
+
+
+def test_max_depth():
+    parser = get_budgeted_parser(max_depth=2)
+    assert get_segments('a **b _c ~~d~~ e_ f** g', parser) == [
+        ('a ', {}),
+        ('b ', {'is_bold': True}),
+        ('c ', {'is_bold': True, 'is_italic': True}),
+        ('d~~ e_ f** g', {}),
+    ]
+
+
+def test_max_segments():
+    parser = get_budgeted_parser(max_segments=2)
+    assert get_segments('a **b** c *d*', parser) == [
+        ('a ', {}),
+        ('b', {'is_bold': True}),
+        (' c *d*', {}),
+    ]
+
+
+def test_max_segments_at_single_token():
+    parser = get_budgeted_parser(max_segments=1)
+    assert get_segments('hello [a](b) tail', parser) == [
+        ('hello ', {}),
+        ('[a](b) tail', {}),
+    ]
+
+
+def test_max_steps():
+    parser = get_budgeted_parser(max_steps=1)
+    assert get_segments('a **b** c', parser) == [
+        ('a ', {}),
+        ('b** c', {}),
+    ]
+
+
+def test_max_time():
+    parser = get_budgeted_parser(max_time=0)
+    assert get_segments('a **b** c', parser) == [('a **b** c', {})]
+
+
+def test_exception():
+    parser = get_budgeted_parser(max_steps=1, fallback=False)
+    with pytest.raises(BudgetExceeded) as info:
+        list(parser.parse('a **b** c'))
+    assert (info.value.limit, info.value.value) == ('max_steps', 1)
+
+
+def test_spans_and_hooks():
+    parser = get_budgeted_parser(max_segments=1)
+    stats = ParseStats()
+    assert serialize(parser.parse('a **b** c', stats)) == [
+        ('a ', {}),
+        ('b** c', {}),
+    ]
+    assert stats.segments == 2
+    assert stats.parses == 1
+    assert 0 <= stats.regex_time <= stats.total_time
+    assert serialize(parser.parse_spans('a **b** c')) == [
+        ('a ', {}),
+        ('b** c', {}),
+    ]
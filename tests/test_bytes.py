@@ -0,0 +1,80 @@
+"""Test mapping Spans on byte offsets into the UTF-8 encoded text"""
+
+from reparser import (
+    MatchGroup,
+    Parser,
+    Token,
+)
+from reparser.segments import (
+    BytesSpan,
+    map_byte_spans,
+)
+
+from .common import (
+    get_segments,
+    random_texts,
+)
+from .data import (
+    MARKDOWN_TEXT_EXAMPLE,
+)
+from .test_markdown import (
+    get_parser,
+)
+
+
+def get_byte_segments(text, parser):
+    return [
+        (span.text.decode('utf-8'), span.params)
+        for span in map_byte_spans(parser.parse_spans(text))
+    ]
+
+
+def test_bytes_match_str():
+    parser = get_parser()
+    text = MARKDOWN_TEXT_EXAMPLE + '\npré  `*skip  «this»*`  pöst 😀 **b**'
+    assert get_segments(text, parser) == get_byte_segments(text, parser)
+
+
+def test_random_texts_match_str():
+    parser = get_parser()
+    chars = list('ab *_`\\[]()\n.') + ['\xa0', '«', '»', 'é', '😀', '　']
+    for text in random_texts(300, chars):
+        assert get_segments(text, parser) == get_byte_segments(text, parser)
+
+
+def test_byte_offsets():
+    parser = get_parser()
+    text = 'é **bär** [«l»](www.eff.org)'
+    spans = list(map_byte_spans(parser.parse_spans(text)))
+    assert all(isinstance(span, BytesSpan) for span in spans)
+
+    data = text.encode('utf-8')
+    actual = [
+        (data[span.start:span.end], span.text, span.params) for span in spans
+    ]
+    assert [
+        (b'\xc3\xa9 ', b'\xc3\xa9 ', {}),
+        (b'b\xc3\xa4r', b'b\xc3\xa4r', {'is_bold': True}),
+        (b' ', b' ', {}),
+        (
+            '[«l»](www.eff.org)'.encode('utf-8'), '«l»'.encode('utf-8'),
+            {'link_target': 'http://www.eff.org'},
+        ),
+    ] == actual
+
+
+def test_unicode_pattern():
+    # word boundaries depend on Unicode word chars
+    parser = Parser([
+        Token('w', r'\b(?P<w>foo)\b', text=MatchGroup('w', str.upper)),
+        Token('b', r'\*', r'\*', is_bold=True),
+    ])
+    text = 'éfoo foo *bär foo*'
+    spans = list(map_byte_spans(parser.parse_spans(text)))
+
+    assert get_segments(text, parser) == [
+        (span.text.decode('utf-8'), span.params) for span in spans
+    ]
+    assert [(span.start, span.end) for span in spans] == [
+        (0, 6), (6, 9), (9, 10), (11, 16), (16, 19),
+    ]
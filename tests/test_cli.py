@@ -0,0 +1,122 @@
+"""Test the command-line bulk parser"""
+
+import io
+import json
+
+import pytest
+
+from reparser.__main__ import (
+    main,
+)
+from reparser.encoding import (
+    ResultReader,
+)
+from reparser.markdown import (
+    MarkdownParser,
+)
+
+from .common import (
+    get_segments,
+)
+from .test_markdown import (
+    get_parser,
+)
+
+
+PARSER = 'tests.test_markdown:get_parser'
+TEXTS = ['Hello **bold** world', 'some _it_ [x](y.org)', 'a `c` b']
+
+
+class TabParser(MarkdownParser):
+    def preprocess(self, text):
+        return text.replace('\t', '    ')
+
+
+def get_tab_parser():
+    return TabParser(get_parser().tokens)
+
+
+def read_jsonl(path):
+    with open(path) as file:
+        return [
+            [(text, params) for text, params in json.loads(line)]
+            for line in file
+        ]
+
+
+def test_jsonl(tmpdir):
+    source = tmpdir.join('in.jsonl')
+    source.write(
+        '\n'.join(json.dumps({'body': text}) for text in TEXTS) + '\n\n'
+    )
+    output = str(tmpdir.join('out.jsonl'))
+    main([PARSER, str(source), '--input-format', 'jsonl', '--field', 'body',
+          '-o', output, '-q'])
+    parser = get_parser()
+    assert read_jsonl(output) == [get_segments(text, parser) for text in TEXTS]
+
+
+def test_text_workers_binary(tmpdir):
+    source = tmpdir.join('in.txt')
+    source.write('\n'.join(TEXTS))
+    output = str(tmpdir.join('out.jsonl'))
+    main([PARSER, str(source), '-o', output, '--chunk-size', '7'])
+    assert read_jsonl(output) == [
+        get_segments('\n'.join(TEXTS), get_parser()),
+    ]
+
+    output = str(tmpdir.join('out.bin'))
+    main([PARSER, str(source), '--input-format', 'lines', '--workers', '2',
+          '--batch-size', '1', '--output-format', 'binary', '-o', output])
+    with open(output, 'rb') as file:
+        records = [
+            [(text, dict(params)) for text, params in zip(
+                result.texts, (result.styles[i] for i in result.style_ids),
+            )]
+            for result in ResultReader(file)
+        ]
+    assert records == [get_segments(text, get_parser()) for text in TEXTS]
+
+
+def test_invalid_parser():
+    with pytest.raises(SystemExit):
+        main(['tests.test_markdown:TEXTS_MISSING'])
+
+
+@pytest.mark.parametrize('line,message', [
+    ('{"body": ', 'invalid JSON'),
+    ('{"text": "a"}', "no text in field 'body'"),
+])
+def test_malformed_jsonl(tmpdir, capsys, line, message):
+    source = tmpdir.join('in.jsonl')
+    source.write(json.dumps({'body': TEXTS[0]}) + '\n' + line + '\n')
+    output = str(tmpdir.join('out.jsonl'))
+    with pytest.raises(SystemExit):
+        main([PARSER, str(source), '--input-format', 'jsonl', '--field',
+              'body', '-o', output, '-q'])
+    assert '{}:2: {}'.format(source, message) in capsys.readouterr().err
+
+
+def test_text_stdin_and_file(tmpdir, monkeypatch):
+    text = 'äb **c** ' * 2000
+    source = tmpdir.join('in.txt')
+    source.write_binary(text.encode())
+    expected = [get_segments(text, get_parser())]
+    output = str(tmpdir.join('out.jsonl'))
+    main([PARSER, str(source), '-o', output, '--chunk-size', '100', '-q'])
+    records = read_jsonl(output)
+    assert [sum(records, [])] == expected
+
+    monkeypatch.setattr('sys.stdin', io.StringIO(text))
+    main([PARSER, '-', '-o', output, '--chunk-size', '100', '-q'])
+    records = read_jsonl(output)
+    assert [sum(records, [])] == expected
+
+
+def test_text_file_offsets_changed(tmpdir, capsys):
+    source = tmpdir.join('in.txt')
+    source.write('a\tb')
+    with pytest.raises(SystemExit):
+        main(['tests.test_cli:get_tab_parser', str(source), '-o',
+              str(tmpdir.join('out.jsonl')), '-q'])
+    assert 'read it from stdin instead' in capsys.readouterr().err
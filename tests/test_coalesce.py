@@ -0,0 +1,101 @@
+"""Test coalescing neighbouring Segments with equal params"""
+
+from reparser import (
+    ParseStats,
+    Parser,
+    Token,
+)
+
+from .common import (
+    CHARS,
+    random_texts,
+    serialize,
+)
+from .test_example import (
+    get_parser as get_example_parser,
+)
+from .test_markdown import (
+    get_parser as get_markdown_parser,
+)
+
+
+def get_coalesced(text, parser):
+    return serialize(parser.parse(text, coalesce=True))
+
+
+def test_skip_section():
+    assert get_coalesced('a `code` b', get_markdown_parser()) == [
+        ('a code b', {}),
+    ]
+
+
+def test_equal_params():
+    assert get_coalesced('x **a**__b__ y', get_markdown_parser()) == [
+        ('x ', {}),
+        ('ab', {'is_bold': True}),
+        (' y', {}),
+    ]
+
+
+def test_tokens_with_params_stay_separate():
+    parser = get_markdown_parser()
+    assert get_coalesced('[a](x)[b](x)\n\nc', parser) == [
+        ('a', {'link_target': 'http://x'}),
+        ('b', {'link_target': 'http://x'}),
+        ('\n', {'segment_type': 'LINE_BREAK'}),
+        ('\n', {'segment_type': 'LINE_BREAK'}),
+        ('c', {}),
+    ]
+
+
+def test_text_tokens_are_merged():
+    parser = Parser([
+        Token('amp', '&amp;', text='&'),
+        Token('b', r'\*', r'\*', is_bold=True),
+    ])
+    assert get_coalesced('a &amp; b *c&amp;d*', parser) == [
+        ('a & b ', {}),
+        ('c&d', {'is_bold': True}),
+    ]
+
+
+def test_params_of_equal_values_with_distinct_types():
+    parser = Parser([
+        Token('a', r'\*', r'\*', x=1),
+        Token('b', '_', '_', x=True),
+    ])
+    segments = list(parser.parse('*a*_b_', coalesce=True))
+    assert [
+        (segment.text, segment.params['x']) for segment in segments
+    ] == [('a', 1), ('b', True)]
+    assert type(segments[1].params['x']) is bool
+
+
+def test_hooks():
+    parser = get_markdown_parser()
+    stats = ParseStats()
+    assert serialize(parser.parse('a `b` c', stats, coalesce=True)) == [
+        ('a b c', {}),
+    ]
+    assert stats.segments == 3
+    assert stats.matches == {'`': 2}
+    assert stats.parses == 1
+
+
+def test_random_texts():
+    texts = random_texts(500, CHARS + ['  '])
+    for parser in (get_example_parser(), get_markdown_parser()):
+        for text in texts:
+            segments = serialize(parser.parse(text))
+            coalesced = get_coalesced(text, parser)
+            assert ''.join(text for text, _ in segments) == ''.join(
+                text for text, _ in coalesced
+            )
+            assert len(coalesced) <= len(segments)
+            for (_, params), (_, next_params) in zip(
+                coalesced, coalesced[1:],
+            ):
+                assert params != next_params or set(params) - {
+                    'is_bold', 'is_italic', 'is_strikethrough',
+                    'is_underline',
+                }, text
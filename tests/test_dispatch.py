@@ -0,0 +1,117 @@
+"""Test the per char dispatch of the compound regex alternatives"""
+
+import re
+
+from reparser import (
+    MatchGroup,
+    Parser,
+    ResolutionPlan,
+    Token,
+)
+from reparser.prefilter import (
+    build_dispatch,
+    get_alternation_cost,
+)
+
+from .common import (
+    get_segments,
+    random_texts,
+)
+from .data import (
+    MARKDOWN_TEXT_EXAMPLE,
+)
+from .test_example import (
+    get_parser as get_example_parser,
+)
+from .test_markdown import (
+    get_parser as get_markdown_parser,
+)
+
+
+def without_dispatch(parser):
+    class PlainParser(type(parser)):
+        @staticmethod
+        def build_dispatch(regex, patterns):
+            return None
+    return PlainParser(parser.tokens)
+
+
+def get_alternatives(dispatch):
+    return {char: regex.pattern for char, regex in dispatch.items()}
+
+
+def test_alternatives_keep_order():
+    patterns = [r'(?P<a>\*\*)', r'(?P<b>_)', r'(?P<c>\*)', r'(?P<d>[_*]x)']
+    regex = re.compile('|'.join(patterns))
+    dispatch = build_dispatch(regex, patterns)
+    assert get_alternatives(dispatch) == {
+        '*': r'(?P<a>\*\*)|(?P<c>\*)|(?P<d>[_*]x)',
+        '_': r'(?P<b>_)|(?P<d>[_*]x)',
+    }
+    assert dispatch['*'].match('*x').lastgroup == 'c'
+    assert dispatch['_'].match('_x').lastgroup == 'b'
+
+
+def test_shared_regexes():
+    patterns = [r'(?P<a>[ab])', r'(?P<b>[ab]c)']
+    regex = re.compile('|'.join(patterns))
+    dispatch = build_dispatch(regex, patterns)
+    assert dispatch['a'] is dispatch['b'] is regex
+
+
+def test_no_dispatch():
+    def get_dispatch(patterns, flags=0):
+        return build_dispatch(re.compile('|'.join(patterns), flags), patterns)
+    assert get_dispatch([r'a', r'.']) is None
+    assert get_dispatch([r'a', r'b?']) is None
+    assert get_dispatch([r'a', r'b'], re.IGNORECASE) is None
+    assert get_dispatch([r'(a)', r'b\1']) is None
+    assert build_dispatch(re.compile(r'a|b'), [r'a']) is None
+
+
+def test_alternation_cost():
+    parser = get_markdown_parser()
+    assert sorted(parser.dispatch) == list('\n\r*=[_`~')
+    cost = get_alternation_cost(parser)
+    assert cost['before'] == len(parser.groups)
+    assert cost['after'] < cost['max'] < cost['before']
+    assert get_alternation_cost(without_dispatch(parser)) == {
+        'before': cost['before'], 'after': cost['before'],
+        'max': cost['before'],
+    }
+
+
+def test_dispatch_matches_compound_regex():
+    texts = [MARKDOWN_TEXT_EXAMPLE] + random_texts(
+        300, list('ab *_~=`\\[]()\n\r.'), 40,
+    )
+    for parser in (get_example_parser(), get_markdown_parser()):
+        assert parser.dispatch is not None
+        plain = without_dispatch(parser)
+        for text in texts:
+            assert get_segments(text, parser) == get_segments(text, plain)
+
+
+def test_match_groups_resolve():
+    parser = Parser([
+        Token('b', r'\*\*', r'\*\*', is_bold=True),
+        Token('i', r'\*', r'\*', is_italic=True),
+        Token('l', r'\[(?P<l>.+?)\]', text=MatchGroup('l', str.upper)),
+    ])
+    assert parser.dispatch['['] is not parser.regex
+    text = '**a [b]** [c]'
+    assert get_segments(text, parser) == get_segments(
+        text, without_dispatch(parser),
+    )
+    assert ('B', {'is_bold': True}) in get_segments(text, parser)
+
+
+def test_match_groups_use_indices(monkeypatch):
+    parser = get_markdown_parser()
+    assert parser.dispatch is not None
+    expected = get_segments('a [b](c) [«d»](e)\n', parser)
+
+    def get_indices(plan, regex):
+        raise AssertionError('no plan for {}'.format(regex.pattern))
+    monkeypatch.setattr(ResolutionPlan, 'get_indices', get_indices)
+    assert get_segments('a [b](c) [«d»](e)\n', parser) == expected
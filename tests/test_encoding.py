@@ -0,0 +1,98 @@
+"""Test the compact encodings of parse results"""
+
+import io
+import pickle
+
+import pytest
+
+from reparser.encoding import (
+    ResultReader,
+    ResultWriter,
+    StyleTable,
+    decode_binary,
+    decode_json,
+    encode_binary,
+    encode_json,
+)
+
+from .common import (
+    serialize,
+)
+from .data import (
+    MARKDOWN_TEXT_EXAMPLE,
+    MARKDOWN_SERIALIZED_SEGMENTS_EXAMPLE,
+)
+from .test_markdown import (
+    get_parser,
+)
+
+
+@pytest.mark.parametrize('encode,decode', [
+    (encode_json, decode_json),
+    (encode_binary, decode_binary),
+])
+def test_round_trip(encode, decode):
+    segments = list(get_parser().parse(MARKDOWN_TEXT_EXAMPLE + ' ü€😀'))
+    decoded = decode(encode(segments))
+    assert serialize(decoded.to_segments()) == serialize(segments)
+    assert decode(encode([])).to_segments() == []
+
+
+def test_style_ids():
+    table = StyleTable()
+    decoded = decode_binary(encode_binary(get_parser().parse(
+        'a **b** c **d**',
+    )), table)
+    assert table.intern({'is_bold': True}) == 1
+    assert len(table) == 2
+    assert list(decoded) == [(0, 'a '), (1, 'b'), (0, ' c '), (1, 'd')]
+    assert decoded.styles == [{}, {'is_bold': True}]
+    segments = decoded.to_segments()
+    assert segments[0].params is segments[2].params
+
+
+def test_equal_values_of_distinct_types():
+    table = StyleTable()
+    assert table.intern({'level': 1}) == 0
+    assert table.intern({'level': True}) == 1
+    assert table.intern({'level': 1.0}) == 2
+    assert table.intern({'level': True}) == 1
+    assert [type(style['level']) for style in table.styles] == [
+        int, bool, float,
+    ]
+
+
+def test_smaller_than_pickle():
+    segments = list(get_parser().parse(MARKDOWN_TEXT_EXAMPLE * 20))
+    size = len(pickle.dumps(segments, pickle.HIGHEST_PROTOCOL))
+    assert len(encode_binary(segments)) < size / 2
+    assert len(encode_json(segments).encode()) < size / 2
+
+
+@pytest.mark.parametrize('binary', [True, False])
+def test_stream(binary):
+    parser = get_parser()
+    texts = ['a **b**', MARKDOWN_TEXT_EXAMPLE, '', 'x *y*']
+    file = io.BytesIO() if binary else io.StringIO()
+    writer = ResultWriter(file, binary=binary)
+    for text in texts:
+        writer.write(parser.parse(text))
+    file.seek(0)
+
+    results = list(ResultReader(file, binary=binary))
+    assert [serialize(result.to_segments()) for result in results] == [
+        serialize(parser.parse(text)) for text in texts
+    ]
+    assert serialize(results[1].to_segments()) == (
+        MARKDOWN_SERIALIZED_SEGMENTS_EXAMPLE
+    )
+    # styles are written once per stream
+    assert len(writer.table) == len(results[-1].styles)
+
+
+def test_table_mismatch():
+    payload = encode_json(get_parser().parse('a'), StyleTable())
+    table = StyleTable()
+    table.intern({'x': 1})
+    with pytest.raises(ValueError):
+        decode_json(payload, table)
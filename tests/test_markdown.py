@@ -2,6 +2,7 @@
 
 import re
 from reparser import (
+    BaseParser,
     Token,
     MatchGroup,
 )
@@ -12,7 +13,10 @@ from reparser.markdown import (
 )
 
 from .common import (
+    CHARS,
     get_segments,
+    random_texts,
+    serialize,
 )
 from .data import (
     MARKDOWN_TEXT_EXAMPLE,
@@ -189,3 +193,29 @@ def test_skipping():
         ('.', {})
     ]
     assert expected == actual
+
+
+def test_unclosed_tags():
+    text = 'pre _open **bold** `tail ~~end'
+    actual = get_segments(text, get_parser())
+    expected = [
+        ('pre _open ', {}),
+        ('bold', {'is_bold': True}),
+        (' `tail ~~end', {}),
+    ]
+    assert expected == actual
+
+
+def test_closing_lookahead_equivalence():
+    parser = get_parser()
+    lookahead_regex = BaseParser.build_regex(parser.tokens)
+
+    class LookaheadParser(type(parser)):
+        def iter_matches(self, text):
+            return lookahead_regex.finditer(text)
+
+    reference = LookaheadParser(parser.tokens)
+    for text in random_texts(2000, CHARS + ['***', '``', '1'], 20):
+        assert (
+            serialize(reference.parse(text)) == serialize(parser.parse(text))
+        ), text
@@ -0,0 +1,132 @@
+"""Test the LRU cache of parse results"""
+
+import threading
+
+import pytest
+
+from reparser.budget import (
+    Budget,
+)
+from reparser.cache import (
+    ParseCache,
+)
+from reparser.markdown import (
+    MarkdownParser,
+    MarkdownTag,
+)
+
+from .common import (
+    get_segments,
+    serialize,
+)
+from .data import (
+    MARKDOWN_TEXT_EXAMPLE,
+    MARKDOWN_SERIALIZED_SEGMENTS_EXAMPLE,
+)
+from .test_markdown import (
+    get_parser,
+)
+
+
+def get_cached_parser(cache):
+    return MarkdownParser(get_parser().tokens, cache=cache)
+
+
+def test_cache_hit():
+    cache = ParseCache()
+    parser = get_cached_parser(cache)
+
+    for _ in range(3):
+        actual = get_segments(MARKDOWN_TEXT_EXAMPLE, parser)
+        assert MARKDOWN_SERIALIZED_SEGMENTS_EXAMPLE == actual
+    assert (cache.hits, cache.misses, len(cache)) == (2, 1, 1)
+    assert cache.hit_rate == pytest.approx(2 / 3)
+
+
+def test_cached_segments_are_read_only():
+    parser = get_cached_parser(ParseCache())
+    segment = next(parser.parse('pre **bold**'))
+
+    with pytest.raises(AttributeError):
+        segment.text = 'changed'
+    with pytest.raises(TypeError):
+        segment.params['is_bold'] = True
+    assert [('pre ', {}), ('bold', {'is_bold': True})] == (
+        get_segments('pre **bold**', parser)
+    )
+
+
+def test_cached_params_reject_in_place_union():
+    parser = get_cached_parser(ParseCache())
+    bold = list(parser.parse('pre **bold**'))[1]
+
+    with pytest.raises(TypeError):
+        bold.params |= {'is_italic': True}
+    assert [('pre ', {}), ('bold', {'is_bold': True})] == (
+        get_segments('pre **bold**', parser)
+    )
+
+
+def test_exceeded_budget_is_not_cached():
+    cache = ParseCache()
+    parser = MarkdownParser(
+        get_parser().tokens, cache=cache, budget=Budget(max_steps=1),
+    )
+    for _ in range(2):
+        segment = next(parser.parse('a **b** c'))
+        with pytest.raises(AttributeError):
+            segment.text = 'changed'
+        assert get_segments('a **b** c', parser) == [
+            ('a ', {}),
+            ('b** c', {}),
+        ]
+    assert len(cache) == 0
+    list(parser.parse('a **b'))
+    assert len(cache) == 1
+
+
+def test_lru_eviction():
+    cache = ParseCache(maxsize=2)
+    parser = get_cached_parser(cache)
+    for text in ('a', 'b', 'a', 'c'):
+        list(parser.parse(text))
+
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+    assert cache.get('c') is not None
+    assert cache.evictions == 1
+
+
+def test_byte_limit():
+    cache = ParseCache(maxsize=None, maxbytes=1000)
+    parser = MarkdownParser([MarkdownTag(r'\*', is_italic=True)], cache=cache)
+    for index in range(100):
+        list(parser.parse('*text* {}'.format(index)))
+
+    assert 0 < cache.size <= 1000
+    assert len(cache) < 100
+    assert cache.evictions == 100 - len(cache)
+
+
+def test_threads():
+    cache = ParseCache(maxsize=8)
+    parser = get_cached_parser(cache)
+    texts = ['**{}** *x*'.format(index) for index in range(16)]
+    expected = [serialize(get_parser().parse(text)) for text in texts]
+    errors = []
+
+    def work():
+        for _ in range(20):
+            for text, segments in zip(texts, expected):
+                if serialize(parser.parse(text)) != segments:
+                    errors.append(text)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert cache.hits + cache.misses == 4 * 20 * 16
+    assert len(cache) <= 8
@@ -0,0 +1,117 @@
+"""Test parsing memory-mapped files"""
+
+import random
+import tracemalloc
+
+from reparser.stream import (
+    parse_file,
+)
+
+from .common import (
+    serialize,
+)
+from .test_markdown import (
+    get_parser,
+)
+
+
+CHARS = ['*', '**', '_', '`', '~~', ' ', '  ', 'a', 'ä', '€', '😀', '\n',
+         '[ü](y)', '\\']
+
+
+def test_parse_file(tmpdir):
+    parser = get_parser()
+    path = tmpdir.join('text.md')
+    rand = random.Random(0)
+    for _ in range(200):
+        text = ''.join(
+            rand.choice(CHARS) for _ in range(rand.randint(0, 60))
+        )
+        data = text.encode()
+        path.write_binary(data)
+        spans = list(parse_file(parser, str(path), lookaround=64,
+                                chunk_size=rand.randint(1, 16)))
+        assert serialize(spans) == serialize(parser.parse(text)), text
+        for span in spans:
+            if 'link_target' in span.params or 'segment_type' in span.params:
+                continue
+            # text between tokens
+            postprocess = (
+                parser.postprocess_skipped if span.skipped
+                else parser.postprocess
+            )
+            assert postprocess(
+                data[span.start:span.end].decode()
+            ) == span.text
+
+
+def test_offsets(tmpdir):
+    path = tmpdir.join('text.md')
+    path.write_binary('ä **€**'.encode() + b' \xff')
+    spans = list(parse_file(get_parser(), str(path)))
+    assert [(span.start, span.end) for span in spans] == [
+        (0, 3), (5, 8), (10, 12),
+    ]
+    assert spans[2].text == ' \udcff'
+
+
+def test_empty_file(tmpdir):
+    path = tmpdir.join('text.md')
+    path.write_binary(b'')
+    assert list(parse_file(get_parser(), str(path))) == []
+
+
+def test_bounded_memory(tmpdir):
+    path = tmpdir.join('text.md')
+    # the opening tag is never closed
+    path.write_binary(b'pre `open ' + b'plain **bold** text\n' * (1 << 14))
+    spans = parse_file(
+        get_parser(), str(path), chunk_size=1 << 12, max_pending=1 << 12,
+    )
+    tracemalloc.start()
+    try:
+        assert next(spans).text.startswith('pre `open plain ')
+        count = 1 + sum(1 for _ in spans)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert count == 4 * (1 << 14)
+    # the file has 320 KiB
+    assert peak < 1 << 17
+
+
+def test_token_sparse_file(tmpdir):
+    parser = get_parser()
+    path = tmpdir.join('text.md')
+    rand = random.Random(1)
+    for _ in range(20):
+        text = ''.join(
+            rand.choice(CHARS) if rand.random() < 0.01
+            else rand.choice('aä€ ')
+            for _ in range(rand.randint(0, 2000))
+        )
+        data = text.encode()
+        path.write_binary(data)
+        spans = list(parse_file(parser, str(path), lookaround=16,
+                                chunk_size=rand.randint(1, 64)))
+        assert serialize(spans) == serialize(parser.parse(text)), text
+
+
+def test_bounded_memory_without_tokens(tmpdir):
+    path = tmpdir.join('text.md')
+    data = 'äbc '.encode() * (1 << 16) + b'**x**'
+    path.write_binary(data)
+    spans = parse_file(get_parser(), str(path), chunk_size=1 << 12)
+    tracemalloc.start()
+    try:
+        span = next(spans)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert (span.start, span.end) == (0, len(data) - 5)
+    assert [(span.start, span.end) for span in spans] == [
+        (len(data) - 3, len(data) - 2),
+    ]
+    # the file has 320 KiB, decoded 256 KiB
+    assert peak < 1 << 17
+    assert span.text == 'äbc ' * (1 << 16)
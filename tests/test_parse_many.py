@@ -0,0 +1,62 @@
+"""Test parsing many texts in a process pool"""
+
+from reparser import (
+    Parser,
+    Token,
+)
+from reparser.pool import (
+    parse_many,
+)
+
+from .common import (
+    serialize,
+)
+from .data import (
+    MARKDOWN_TEXT_EXAMPLE,
+    MARKDOWN_SERIALIZED_SEGMENTS_EXAMPLE,
+)
+from .test_markdown import (
+    get_parser,
+)
+
+
+TEXTS = [
+    MARKDOWN_TEXT_EXAMPLE,
+    '',
+    'plain',
+    'pre `*skip*` post',
+    '*mixed **formatting** demo*',
+] * 20
+
+
+def test_parse_many_serial():
+    parser = get_parser()
+    actual = [
+        serialize(segments)
+        for segments in parse_many(parser, TEXTS, workers=1)
+    ]
+    expected = [serialize(parser.parse(text)) for text in TEXTS]
+    assert expected == actual
+
+
+def test_parse_many_pool():
+    parser = get_parser()
+    actual = [
+        serialize(segments)
+        for segments in parse_many(parser, TEXTS, workers=2, chunksize=7)
+    ]
+    expected = [serialize(parser.parse(text)) for text in TEXTS]
+    assert expected == actual
+    assert MARKDOWN_SERIALIZED_SEGMENTS_EXAMPLE == actual[0]
+
+
+def test_parse_many_keeps_value_types():
+    parser = Parser([
+        Token('a', r'<', r'>', level=1),
+        Token('b', r'\[', r'\]', level=True),
+    ])
+    texts = ['<a> [b]'] * 4
+    for segments in parse_many(parser, texts, workers=2, chunksize=4):
+        assert [type(segment.params.get('level')) for segment in segments] == [
+            int, type(None), bool,
+        ]
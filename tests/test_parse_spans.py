@@ -0,0 +1,45 @@
+"""Test parsing text to Spans"""
+
+from .common import (
+    get_segments,
+)
+from .data import (
+    MARKDOWN_TEXT_EXAMPLE,
+)
+from .test_markdown import (
+    get_parser,
+)
+
+
+def test_spans_match_segments():
+    parser = get_parser()
+    text = MARKDOWN_TEXT_EXAMPLE + '\npre  `*skip  this*`  post'
+    spans = list(parser.parse_spans(text))
+
+    actual = [(span.text, span.params) for span in spans]
+    assert get_segments(text, parser) == actual
+
+
+def test_span_offsets():
+    parser = get_parser()
+    spans = list(parser.parse_spans(MARKDOWN_TEXT_EXAMPLE))
+
+    actual = [
+        (MARKDOWN_TEXT_EXAMPLE[span.start:span.end], span.params)
+        for span in spans
+    ]
+    assert ('Hello ', {}) == actual[0]
+    assert ('bold', {'is_bold': True}) == actual[1]
+    assert (
+        '[link](www.eff.org)', {'link_target': 'http://www.eff.org'}
+    ) == actual[-2]
+    assert spans[-2].text == 'link'
+
+
+def test_span_text_is_lazy():
+    parser = get_parser()
+    span = next(parser.parse_spans('pre  **bold**'))
+
+    assert (span.start, span.end) == (0, 5)
+    assert span.source == 'pre  **bold**'
+    assert span.text == 'pre '
@@ -0,0 +1,72 @@
+"""Test the instrumentation of the parser"""
+
+import time
+
+from reparser import (
+    ParseHooks,
+    ParseStats,
+    Parser,
+    Token,
+)
+
+from .common import (
+    get_segments,
+    serialize,
+)
+from .test_markdown import (
+    get_parser,
+)
+
+
+TEXT = 'pre **bold** `*skip*` end** [link](www.eff.org)\n'
+
+
+def test_stats():
+    parser = get_parser()
+    stats = ParseStats()
+    actual = serialize(parser.parse(TEXT, hooks=stats))
+
+    assert get_segments(TEXT, parser) == actual
+    assert stats.parses == 1
+    assert stats.segments == len(actual)
+    assert stats.matches == {'**': 3, '`': 2, '*': 2, 'link': 1, 'br': 1}
+    assert stats.skipped == {'*': 2}
+    assert stats.unmatched_end == {'**': 1}
+    assert 0 <= stats.regex_time <= stats.total_time
+    assert stats.python_time >= 0
+
+
+def test_tail_is_timed():
+    class SlowParser(Parser):
+        def postprocess(self, text):
+            time.sleep(0.05)
+            return text
+
+    parser = SlowParser([Token('b', '<', '>')])
+    stats = ParseStats()
+    assert serialize(parser.parse('tail', hooks=stats)) == [('tail', {})]
+    assert stats.total_time >= 0.05
+
+
+def test_stats_accumulate():
+    parser = get_parser()
+    stats = ParseStats()
+    for _ in range(3):
+        list(parser.parse_spans(TEXT, hooks=stats))
+
+    assert stats.parses == 3
+    assert stats.as_dict()['matches']['link'] == 3
+
+
+def test_custom_hooks():
+    class SegmentHooks(ParseHooks):
+        def __init__(self):
+            self.segments = []
+
+        def on_segment(self, segment):
+            self.segments.append(segment.text)
+
+    parser = get_parser()
+    hooks = SegmentHooks()
+    texts = [segment.text for segment in parser.parse(TEXT, hooks=hooks)]
+    assert texts == hooks.segments
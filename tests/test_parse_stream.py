@@ -0,0 +1,134 @@
+"""Test parsing text from a stream of chunks"""
+
+import io
+import random
+
+from reparser.stream import (
+    parse_stream,
+)
+
+from .common import (
+    CHARS,
+    get_segments,
+    random_texts,
+    serialize,
+)
+from .data import (
+    MARKDOWN_TEXT_EXAMPLE,
+    MARKDOWN_SERIALIZED_SEGMENTS_EXAMPLE,
+)
+from .test_example import (
+    get_parser as get_example_parser,
+)
+from .test_markdown import (
+    get_parser as get_markdown_parser,
+)
+
+
+def split(text, positions):
+    positions = [0] + sorted(positions) + [len(text)]
+    return [text[start:end] for start, end in zip(positions, positions[1:])]
+
+
+def join_runs(serialized):
+    """Join the texts of consecutive Segments with the same params"""
+    joined = []
+    for text, params in serialized:
+        if joined and joined[-1][1] == params:
+            text = joined.pop()[0] + text
+        joined.append((text, params))
+    return joined
+
+
+def test_file_object():
+    for parser in (get_example_parser(), get_markdown_parser()):
+        actual = serialize(parse_stream(
+            parser,
+            io.StringIO(MARKDOWN_TEXT_EXAMPLE),
+            lookaround=32,
+            chunk_size=5,
+        ))
+        assert MARKDOWN_SERIALIZED_SEGMENTS_EXAMPLE == actual
+
+
+def test_unclosed_tag_across_chunks():
+    parser = get_markdown_parser()
+    text = 'pre *open ' + 'plain ' * 50 + 'close* `skip ' + 'tail ' * 50
+    chunks = split(text, range(7, len(text), 7))
+    actual = serialize(parse_stream(parser, chunks, lookaround=8))
+    assert get_segments(text, parser) == actual
+
+
+def test_random_chunks():
+    chars = CHARS + ['***', '``', '  ', '1']
+    rand = random.Random(0)
+    for parser in (get_example_parser(), get_markdown_parser()):
+        for text in random_texts(500, chars, 40, rand):
+            chunks = split(
+                text,
+                rand.sample(range(len(text) + 1), min(len(text), 6)),
+            )
+            actual = serialize(parse_stream(parser, chunks, lookaround=8))
+            assert get_segments(text, parser) == actual, chunks
+
+
+def test_max_pending():
+    parser = get_markdown_parser()
+    text = 'pre `open ' + 'plain **bold** ' * 300
+    chunks = split(text, range(7, len(text), 7))
+    consumed = []
+
+    def iter_chunks():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    segments = parse_stream(
+        parser, iter_chunks(), lookaround=8, max_pending=64,
+    )
+    assert next(segments).text.startswith('pre `open plain ')
+    # the opening tag is never closed, the text following it is not held back
+    assert len(''.join(consumed)) < 100
+    actual = serialize(parse_stream(
+        parser, chunks, lookaround=8, max_pending=64,
+    ))
+    assert get_segments(text, parser) == actual
+
+
+def test_closing_tag_beyond_max_pending():
+    parser = get_markdown_parser()
+    text = 'pre *open ' + 'plain ' * 50 + 'close* after **bold**'
+    chunks = split(text, range(7, len(text), 7))
+    actual = serialize(parse_stream(
+        parser, chunks, lookaround=8, max_pending=64,
+    ))
+    # the run without tokens is split once it exceeds max_pending
+    assert all(len(text) > 64 for text, _ in actual[:-2])
+    assert [
+        ('pre *open ' + 'plain ' * 50 + 'close* after ', {}),
+        ('bold', {'is_bold': True}),
+    ] == join_runs(actual)
+    actual = serialize(parse_stream(parser, chunks, lookaround=8))
+    assert get_segments(text, parser) == actual
+
+
+def test_split_text_without_tokens():
+    parser = get_markdown_parser()
+    text = 'pre `open ' + 'plain a ' * 200 + '**bold**'
+    chunks = split(text, range(7, len(text), 7))
+    consumed = []
+
+    def iter_chunks():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    segments = parse_stream(
+        parser, iter_chunks(), lookaround=8, max_pending=64,
+    )
+    assert next(segments).text.startswith('pre `open plain a ')
+    assert len(''.join(consumed)) < 200
+    actual = serialize(parse_stream(
+        parser, chunks, lookaround=8, max_pending=64,
+    ))
+    assert get_segments(text, parser) == join_runs(actual)
@@ -0,0 +1,90 @@
+"""Test the trigger char prefilter of the compound regex"""
+
+import re
+import sys
+
+import pytest
+
+from reparser import (
+    Parser,
+    Token,
+)
+from reparser.prefilter import (
+    build_prefilter,
+)
+
+from .common import (
+    random_texts,
+    serialize,
+)
+from .test_example import (
+    get_parser as get_example_parser,
+)
+from .test_markdown import (
+    get_parser as get_markdown_parser,
+)
+
+
+def without_prefilter(parser):
+    class PlainParser(type(parser)):
+        @staticmethod
+        def build_prefilter(regex):
+            return None
+    return PlainParser(parser.tokens)
+
+
+def get_chars(prefilter):
+    return ''.join(
+        char for char in map(chr, range(256)) if prefilter.match(char)
+    )
+
+
+def get_triggers(pattern, flags=0):
+    prefilter = build_prefilter(re.compile(pattern, flags))
+    return prefilter and get_chars(prefilter)
+
+
+def test_trigger_chars():
+    assert get_triggers(r'(?<=\s)\*\*|__') == '*_'
+    assert get_triggers(r'(?:a|b)?c') == 'abc'
+    assert get_triggers(r'[x-z]+') == 'xyz'
+    assert get_triggers(r'(?P<tag>=)(?!\s)') == '='
+
+
+def test_no_prefilter():
+    assert get_triggers(r'.x') is None
+    assert get_triggers(r'\sx') is None
+    assert get_triggers(r'[^x]') is None
+    assert get_triggers(r'x?') is None
+    assert get_triggers(r'x', re.IGNORECASE) is None
+    assert get_triggers(r'(?i:x)') is None
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 11), reason='possessive repeats are new in 3.11',
+)
+def test_possessive_repeat():
+    assert get_triggers(r'a*+b') == 'ab'
+    assert get_triggers(r'a{0,2}+b') == 'ab'
+    assert get_triggers(r'a++b') == 'a'
+    for pattern in (r'a*+b', r'a{0,2}+b'):
+        parser = Parser([Token('t', pattern, is_t=True)])
+        assert serialize(parser.parse('xx b')) == [
+            ('xx ', {}), ('b', {'is_t': True}),
+        ]
+
+
+def test_parser_prefilter():
+    assert get_chars(get_markdown_parser().prefilter) == '\n\r*=[_`~'
+    assert Parser([Token('any', r'.')]).prefilter is None
+
+
+def test_prefilter_equivalence():
+    texts = random_texts(1000)
+    for parser in (get_example_parser(), get_markdown_parser()):
+        plain = without_prefilter(parser)
+        assert plain.prefilter is None
+        for text in texts:
+            assert (
+                serialize(plain.parse(text)) == serialize(parser.parse(text))
+            ), text
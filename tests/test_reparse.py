@@ -0,0 +1,82 @@
+"""Test re-parsing text after an edit"""
+
+import random
+
+from reparser.reparse import (
+    Edit,
+    parse_result,
+    reparse,
+)
+
+from .common import (
+    serialize,
+)
+from .test_example import (
+    get_parser as get_example_parser,
+)
+from .test_markdown import (
+    get_parser as get_markdown_parser,
+)
+
+
+# no links, a deleted bracket lets them span more than the lookaround
+CHARS = [
+    '*', '**', '***', '_', '__', '`', '``', '~~', '==', '\\', ' ', '  ',
+    '\n', 'a', '1', '.',
+]
+
+
+def random_text(rand, size):
+    return ''.join(rand.choice(CHARS) for _ in range(size))
+
+
+def test_reuses_segments():
+    parser = get_markdown_parser()
+    text = ''.join(
+        'word{} *a* **b** `c` [x](y) '.format(index) for index in range(50)
+    )
+    result = parse_result(parser, text)
+    assert serialize(result) == serialize(parser.parse(text))
+
+    offset = text.index('word25')
+    updated = reparse(parser, result, Edit(offset, 6, 'edit'), lookaround=8)
+    new_text = text[:offset] + 'edit' + text[offset + 6:]
+    assert updated.text == new_text
+    assert serialize(updated) == serialize(parser.parse(new_text))
+    assert updated.segments[0] is result.segments[0]
+    assert updated.segments[-1] is result.segments[-1]
+
+
+def test_closing_tag_at_end():
+    parser = get_markdown_parser()
+    text = 'pre *open ' + 'plain ' * 50
+    result = parse_result(parser, text)
+    updated = reparse(
+        parser, result, Edit(len(text), 0, 'close*'), lookaround=8,
+    )
+    assert serialize(updated) == serialize(parser.parse(text + 'close*'))
+
+
+def test_random_edits():
+    rand = random.Random(0)
+    for parser in (get_example_parser(), get_markdown_parser()):
+        for _ in range(200):
+            text = random_text(rand, rand.randint(0, 60))
+            result = parse_result(parser, text)
+            for _ in range(5):
+                offset = rand.randint(0, len(text))
+                deleted = rand.randint(0, min(len(text) - offset, 4))
+                inserted = random_text(rand, rand.randint(0, 3))
+                result = reparse(
+                    parser, result, Edit(offset, deleted, inserted),
+                    lookaround=8,
+                )
+                text = text[:offset] + inserted + text[offset + deleted:]
+                assert result.text == text
+                assert serialize(result) == serialize(parser.parse(text)), (
+                    text
+                )
+                fresh = parse_result(parser, text)
+                assert (result.positions, result.counts, result.stacks) == (
+                    fresh.positions, fresh.counts, fresh.stacks
+                )
@@ -0,0 +1,63 @@
+"""Test the precompiled resolution of single tokens"""
+
+import re
+
+from reparser import (
+    EMPTY_PARAMS,
+    MatchGroup,
+    Parser,
+    Segment,
+    SegmentFactory,
+    Token,
+)
+
+from .common import (
+    get_segments,
+)
+
+
+def get_parser():
+    return Parser([
+        Token('link', r'\[(?P<text>.+?)\]\((?P<url>.+?)\)',
+              text=MatchGroup('text'), url=MatchGroup('url', func=str.upper),
+              missing=MatchGroup('missing', func=len), kind='link'),
+        Token('br', r'\n', text='\n'),
+        Token('raw', r'@\w+', at=True),
+    ])
+
+
+def test_plan():
+    token = get_parser().tokens[0]
+    assert [key for key, _, _ in token.dynamic_params] == [
+        'text', 'url', 'missing',
+    ]
+    assert token.dynamic_params[1][1:] == ('link_url', str.upper)
+
+
+def test_resolution():
+    assert get_segments('a [b](c)\n@d', get_parser()) == [
+        ('a ', {}),
+        ('b', {'url': 'C', 'missing': 0, 'kind': 'link'}),
+        ('\n', {}),
+        ('@d', {'at': True}),
+    ]
+
+
+def test_same_as_segment_update():
+    parser = get_parser()
+    token = parser.tokens[0]
+    match = parser.regex.search('[b](c)')
+    params = dict(token.params)
+    expected = Segment(params.pop('text'), token, match, **params)
+    actual = SegmentFactory(parser).make_token_segment(
+        token, match, token.group_start, EMPTY_PARAMS,
+    )
+    assert (actual.text, actual.params) == (expected.text, expected.params)
+
+
+def test_other_regex():
+    parser = get_parser()
+    plan = parser.plans['link_start']
+    regex = re.compile('x|' + parser.tokens[0].pattern_start)
+    text, params = plan.resolve(regex.match('[b](c)'), EMPTY_PARAMS)
+    assert (text, params['url']) == ('b', 'C')
@@ -0,0 +1,124 @@
+"""Test rendering parse events into sinks"""
+
+import io
+
+import pytest
+
+from reparser import (
+    ParseStats,
+)
+from reparser.budget import (
+    Budget,
+)
+from reparser.markdown import (
+    MarkdownParser,
+)
+from reparser.sinks import (
+    HtmlSink,
+    PlainTextSink,
+    Sink,
+)
+
+from .common import (
+    CHARS,
+    random_texts,
+)
+from .data import (
+    MARKDOWN_TEXT_EXAMPLE,
+)
+from .test_example import (
+    get_parser as get_example_parser,
+)
+from .test_markdown import (
+    get_parser as get_markdown_parser,
+)
+
+
+class EventSink(Sink):
+    def __init__(self):
+        super().__init__([])
+        self.events = []
+
+    def open_style(self, token, params):
+        self.events.append(('open', token.name))
+        super().open_style(token, params)
+
+    def close_style(self, token, params):
+        self.events.append(('close', token.name))
+        super().close_style(token, params)
+
+    def segment(self, text, params):
+        self.events.append((text, dict(params)))
+
+
+def test_html():
+    sink = HtmlSink()
+    get_markdown_parser().parse_into(MARKDOWN_TEXT_EXAMPLE, sink)
+    assert sink.getvalue() == (
+        'Hello <b>bold</b> world!<br>You can <b>try </b><b><i>this</i></b>'
+        '<b> awesome</b> <a href="http://www.eff.org">link</a>.'
+    )
+
+
+def test_plain_text():
+    sink = PlainTextSink([])
+    get_markdown_parser().parse_into('a **<b>** `*c*` [x](y)', sink)
+    assert sink.getvalue() == 'a <b> *c* x'
+
+
+def test_events():
+    sink = EventSink()
+    get_markdown_parser().parse_into('a **b** c', sink)
+    assert sink.events == [
+        ('a ', {}),
+        ('open', '**'),
+        ('b', {'is_bold': True}),
+        ('close', '**'),
+        (' c', {}),
+    ]
+
+
+def test_abstract_segment():
+    with pytest.raises(TypeError):
+        Sink([])  # pylint: disable=abstract-class-instantiated
+
+
+def test_hooks():
+    parser = get_markdown_parser()
+    text = 'a **b [x](y)** `*c*`\n'
+    stats = ParseStats()
+    parser.parse_into(text, PlainTextSink([]), hooks=stats)
+    expected = ParseStats()
+    list(parser.parse(text, hooks=expected))
+    assert stats.segments == expected.segments
+    assert stats.matches == expected.matches
+    assert stats.parses == 1
+
+
+@pytest.mark.parametrize('limits', [
+    {'max_steps': 1},
+    {'max_depth': 0},
+    {'max_segments': 2},
+])
+def test_budget_fallback(limits):
+    parser = MarkdownParser(
+        get_markdown_parser().tokens, budget=Budget(**limits),
+    )
+    text = 'a **b _c_ d** e'
+    fused = HtmlSink()
+    parser.parse_into(text, fused)
+    rendered = HtmlSink()
+    rendered.write_segments(parser.parse(text))
+    assert fused.getvalue() == rendered.getvalue()
+
+
+def test_same_output_as_parse():
+    texts = random_texts(300, CHARS + ['***', '<', '&'])
+    for parser in (get_example_parser(), get_markdown_parser()):
+        for sink_type in (HtmlSink, PlainTextSink):
+            for text in texts:
+                fused = sink_type(io.StringIO())
+                parser.parse_into(text, fused)
+                rendered = sink_type([])
+                rendered.write_segments(parser.parse(text))
+                assert fused.getvalue() == rendered.getvalue(), text
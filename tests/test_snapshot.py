@@ -0,0 +1,138 @@
+"""Test the on-disk parser snapshots"""
+
+import hashlib
+import os
+import random
+import re
+import warnings
+
+import pytest
+
+from reparser import (
+    Token,
+)
+from reparser.budget import (
+    Budget,
+)
+from reparser.cache import (
+    ParseCache,
+)
+from reparser.markdown import (
+    MarkdownParser,
+)
+from reparser.snapshot import (
+    MAGIC,
+    dump_regex,
+    get_fingerprint,
+    load_parser,
+    load_regex,
+    restore_parser,
+)
+
+from .common import (
+    get_segments,
+)
+from .data import (
+    MARKDOWN_TEXT_EXAMPLE,
+    MARKDOWN_SERIALIZED_SEGMENTS_EXAMPLE,
+)
+from .test_markdown import (
+    get_parser,
+)
+
+
+def test_round_trip(tmpdir):
+    path = str(tmpdir.join('parser.snapshot'))
+    tokens = get_parser().tokens
+    built = load_parser(path, MarkdownParser, tokens)
+    assert os.path.exists(path)
+
+    cache = ParseCache()
+    budget = Budget(max_depth=8)
+    with warnings.catch_warnings():
+        # the regexes are restored from their compiled code
+        warnings.simplefilter('error')
+        loaded = load_parser(path, MarkdownParser, tokens, cache, budget)
+    assert loaded is not built
+    assert loaded.cache is cache and loaded.budget is budget
+    assert loaded.regex.pattern == built.regex.pattern
+    # regexes shared by the chars of the dispatch are restored once
+    assert len(set(map(id, loaded.dispatch.values()))) == len(
+        set(map(id, built.dispatch.values()))
+    )
+    # MatchGroup callables are the ones of the passed tokens
+    assert loaded.tokens[0] is tokens[0]
+    assert MARKDOWN_SERIALIZED_SEGMENTS_EXAMPLE == get_segments(
+        MARKDOWN_TEXT_EXAMPLE, loaded,
+    )
+    assert get_segments('**a _b', loaded) == get_segments('**a _b', built)
+
+
+def test_stale_snapshot(tmpdir):
+    path = str(tmpdir.join('parser.snapshot'))
+    load_parser(path, MarkdownParser, [Token('a', 'a', is_bold=True)])
+    with open(path, 'rb') as file:
+        snapshot = file.read()
+
+    tokens = [Token('a', 'a', is_italic=True)]
+    assert restore_parser(snapshot, MarkdownParser, tokens) is None
+    parser = load_parser(path, MarkdownParser, tokens)
+    assert get_segments('a', parser) == [('a', {'is_italic': True})]
+    with open(path, 'rb') as file:
+        assert file.read() != snapshot
+    assert restore_parser(snapshot, MarkdownParser, tokens[:0]) is None
+
+
+def test_corrupt_snapshot(tmpdir):
+    path = tmpdir.join('parser.snapshot')
+    path.write_binary(b'garbage')
+    tokens = [Token('a', 'a', is_bold=True)]
+    parser = load_parser(str(path), MarkdownParser, tokens)
+    assert get_segments('a', parser) == [('a', {'is_bold': True})]
+
+
+def test_bit_flips(tmpdir):
+    path = tmpdir.join('parser.snapshot')
+    tokens = get_parser().tokens
+    load_parser(str(path), MarkdownParser, tokens)
+    snapshot = path.read_binary()
+
+    rnd = random.Random(0)
+    for pos in rnd.sample(range(len(snapshot)), 50):
+        corrupt = bytearray(snapshot)
+        corrupt[pos] ^= 1 << rnd.randrange(8)
+        assert restore_parser(bytes(corrupt), MarkdownParser, tokens) is None
+        path.write_binary(bytes(corrupt))
+        parser = load_parser(str(path), MarkdownParser, tokens)
+        assert MARKDOWN_SERIALIZED_SEGMENTS_EXAMPLE == get_segments(
+            MARKDOWN_TEXT_EXAMPLE, parser,
+        )
+        assert path.read_binary() == snapshot
+
+
+def test_damaged_payload(tmpdir):
+    # the digest matches, unpickling fails
+    path = tmpdir.join('parser.snapshot')
+    tokens = [Token('a', 'a', is_bold=True)]
+    for payload in (
+        b'\x80\x05garbage', b'\x80\x05K\xff\x85R.', b'',
+        # a string of invalid UTF-8
+        b'\x80\x05X\x02\x00\x00\x00\xff\xfe.',
+    ):
+        path.write_binary(
+            MAGIC + get_fingerprint(MarkdownParser, tokens).encode()
+            + hashlib.sha256(payload).digest() + payload
+        )
+        parser = load_parser(str(path), MarkdownParser, tokens)
+        assert get_segments('a', parser) == [('a', {'is_bold': True})]
+
+
+def test_regex_compiled_again():
+    regex = re.compile(r'(?P<a>x)|y')
+    pattern, flags, _, groups, groupindex, indexgroup = dump_regex(regex)
+    with pytest.warns(RuntimeWarning, match='sre internals differ'):
+        loaded = load_regex(
+            (pattern, flags, None, groups, groupindex, indexgroup),
+        )
+    assert loaded.pattern == regex.pattern
+    assert loaded.match('x').lastgroup == 'a'
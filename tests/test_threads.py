@@ -0,0 +1,80 @@
+"""Test sharing one parser between threads"""
+
+import pickle
+import random
+import threading
+
+import pytest
+
+from reparser import (
+    ParseState,
+    ParseStats,
+    Parser,
+    Token,
+)
+
+from .common import (
+    random_texts,
+    serialize,
+)
+from .test_example import (
+    get_parser as get_example_parser,
+)
+from .test_markdown import (
+    get_parser as get_markdown_parser,
+)
+
+
+def get_texts(count):
+    return random_texts(count, max_length=60)
+
+
+def test_parser_is_immutable():
+    parser = get_markdown_parser()
+    with pytest.raises(AttributeError):
+        parser.regex = None
+    with pytest.raises(AttributeError):
+        del parser.tokens
+    clone = pickle.loads(pickle.dumps(Parser([Token('a', 'a')])))
+    with pytest.raises(AttributeError):
+        clone.tokens = []
+
+
+def test_parse_state():
+    state = ParseState('text')
+    assert (state.text, state.last_pos, state.hooks) == ('text', 0, None)
+    assert state.token_stack.get_params() == {}
+    assert type(ParseState('', ParseStats()).token_stack).__name__ == (
+        'ObservedTokenStack'
+    )
+
+
+@pytest.mark.parametrize('get_parser', [
+    get_example_parser, get_markdown_parser,
+])
+def test_shared_parser(get_parser):
+    parser = get_parser()
+    texts = get_texts(200)
+    expected = [serialize(parser.parse(text)) for text in texts]
+    barrier = threading.Barrier(8)
+    errors = []
+
+    def work(seed):
+        order = list(range(len(texts)))
+        random.Random(seed).shuffle(order)
+        barrier.wait()
+        for _ in range(5):
+            for index in order:
+                # interleave the generators of other threads mid-parse
+                actual = serialize(parser.parse(texts[index]))
+                if actual != expected[index]:
+                    errors.append(texts[index])
+
+    threads = [threading.Thread(target=work, args=(seed,))
+               for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
@@ -0,0 +1,94 @@
+"""Test the TokenStack"""
+
+import pickle
+
+import pytest
+
+from reparser import (
+    Token,
+    TokenStack,
+)
+
+
+def get_tokens():
+    return (
+        Token('b', 'b', 'B', is_bold=True),
+        Token('i', 'i', 'I', is_italic=True),
+        Token('u', 'u', 'U', is_underline=True),
+    )
+
+
+def test_params_follow_stack():
+    bold, italic, _ = get_tokens()
+    stack = TokenStack()
+    assert stack.get_params() == {}
+
+    stack.add_token(bold)
+    stack.add_token(italic)
+    assert stack.get_params() == {'is_bold': True, 'is_italic': True}
+
+    assert stack.remove_token(italic)
+    assert stack.get_params() == {'is_bold': True}
+    assert stack.remove_token(bold)
+    assert stack.get_params() == {}
+
+
+def test_params_snapshot_is_stable():
+    bold, italic, _ = get_tokens()
+    stack = TokenStack()
+    stack.add_token(bold)
+    snapshot = stack.get_params()
+
+    stack.add_token(italic)
+    stack.remove_token(bold)
+    assert snapshot == {'is_bold': True}
+
+
+def test_remove_unknown_token():
+    bold, italic, _ = get_tokens()
+    stack = TokenStack()
+    assert not stack.remove_token(bold)
+
+    stack.add_token(bold)
+    assert not stack.remove_token(italic)
+    assert stack.get_last_token() is bold
+
+
+def test_remove_out_of_order():
+    bold, italic, underline = get_tokens()
+    stack = TokenStack()
+    stack.add_token(bold)
+    stack.add_token(italic)
+    stack.add_token(bold)
+    stack.add_token(underline)
+
+    assert stack.remove_token(italic)
+    assert stack.get_params() == {'is_bold': True, 'is_underline': True}
+    assert stack.get_last_token() is underline
+
+    assert stack.remove_token(bold)
+    assert stack.get_params() == {'is_bold': True, 'is_underline': True}
+    assert stack.remove_token(underline)
+    assert stack.get_params() == {'is_bold': True}
+    assert stack.remove_token(bold)
+    assert stack.get_params() == {}
+    assert not stack.remove_token(bold)
+
+
+def test_params_are_read_only():
+    bold, _, _ = get_tokens()
+    stack = TokenStack()
+    stack.add_token(bold)
+    params = stack.get_params()
+
+    with pytest.raises(TypeError):
+        params['is_bold'] = False
+    with pytest.raises(TypeError):
+        params.update(is_italic=True)
+    with pytest.raises(TypeError):
+        params |= {'is_italic': True}
+
+    copy = params.copy()
+    copy['is_italic'] = True
+    assert params == {'is_bold': True}
+    assert pickle.loads(pickle.dumps(params)) == params